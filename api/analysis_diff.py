@@ -0,0 +1,62 @@
+import json
+
+# Sections diffed entry by entry. Everything else in the analysis is small and is sent whole when it changes.
+LIST_SECTIONS = ["threats", "captures"]
+
+def _key(entry):
+    return json.dumps(entry, sort_keys=True, separators=(',', ':'))
+
+def diff_entries(old, new):
+    """
+    Multiset difference of two lists of JSON-able entries.
+    An entry whose contents changed (e.g. a threat's damage) shows up as one removed and one added.
+    """
+    counts = {}
+    for e in old:
+        k = _key(e)
+        counts[k] = counts.get(k, 0) + 1
+    added = []
+    for e in new:
+        k = _key(e)
+        if counts.get(k, 0) > 0:
+            counts[k] -= 1
+        else:
+            added.append(e)
+    removed = []
+    for e in old:
+        k = _key(e)
+        if counts.get(k, 0) > 0:
+            counts[k] -= 1
+            removed.append(e)
+    return {"added": added, "removed": removed}
+
+def diff_economy(old, new):
+    """Per player slot, only the fields whose value changed. A player missing from new maps to None."""
+    # Slots are int keys when computed here but string keys once an analysis has been through JSON
+    old = {str(k): v for k, v in old.items()}
+    new = {str(k): v for k, v in new.items()}
+    changed = {}
+    for slot, stats in new.items():
+        before = old.get(slot, {})
+        fields = {k: v for k, v in stats.items() if before.get(k) != v}
+        if fields: changed[slot] = fields
+    for slot in old:
+        if slot not in new: changed[slot] = None
+    return changed
+
+def diff_analysis(old, new, since, fingerprint):
+    """
+    Structured diff between two get_full_analysis results for the same player.
+    Clients apply it to the analysis they fetched at `since` to get the one at `fingerprint`:
+    drop each removed entry, append each added one (then re-sort), merge the economy fields,
+    and replace any section listed under "changed".
+    """
+    delta = {"delta": True, "since": since, "fingerprint": fingerprint}
+    for section in LIST_SECTIONS:
+        delta[section] = diff_entries(old.get(section, []), new.get(section, []))
+    delta["economy"] = diff_economy(old.get("economy", {}), new.get("economy", {}))
+    delta["changed"] = {
+        k: v for k, v in new.items()
+        if k not in LIST_SECTIONS and k != "economy" and _key(old.get(k)) != _key(v)
+    }
+    return delta
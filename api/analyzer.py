@@ -1,14 +1,66 @@
 import json
 import os
-from game_logic import get_reachable_cells, calculate_damage
+from game_logic import get_reachable_cells, get_terrain_type
+from distance_fields import DistanceFields, CAPTURABLE_TYPES, CAPTURE_HORIZON
+from capture_planner import plan_captures
+from damage_table import DamageTable
+from attack_options import enumerate_attack_options
+from focus_fire import search_focus_fire, FOCUS_FIRE_BUDGET_MS
+from parallel_reach import compute_reachability
+from static_tables import load_static_tables
+from influence import compute_team_fields, summarize_influence, CONTESTED_MARGIN
+from transports import TransportDrops, can_carry, CARRIERS
+from luck import kill_probability
+from economy_forecast import (player_economies, forecast, unit_worths, candidate_plans, score_build_orders, starting_funds,
+                              FORECAST_TURNS, INCOME_TYPES, PRODUCTION)
+from production_threats import buildable_attackers, find_production_threats, tile_mask
 
 VERSION = "0.0.1"
 
+# How many ranked attack options get_full_analysis returns
+ATTACK_OPTION_LIMIT = 10
+# Kill chance (all immediate attackers focusing one unit) from which advice warns about losing it
+KILL_RISK_WARNING = 0.5
+# Base damage (%) from which an immediate threat counts as high, in the advice, the context and the history
+HIGH_THREAT_PCT = 50
+# How many scored build orders get_full_analysis returns
+BUILD_OPTION_LIMIT = 5
+
+def is_high_threat(threat):
+    """Whether an immediate (this turn) threat can take at least HIGH_THREAT_PCT of its victim."""
+    return threat['damage_pct'] >= HIGH_THREAT_PCT and not threat.get('next_turn')
+
+# Sections of get_full_analysis, in output order, and the other sections each one is computed from
+ANALYSIS_SECTIONS = ["economy", "forecast", "threats", "kill_risk", "captures", "capture_plan", "attack_options",
+                     "focus_fire", "influence", "advice"]
+SECTION_INPUTS = {
+    "advice": ["threats", "captures", "influence", "kill_risk", "forecast"],
+    "kill_risk": ["threats"],
+    "forecast": ["capture_plan"],
+}
+
+def section_closure(sections):
+    """The requested sections plus everything they are computed from."""
+    need = set()
+    todo = list(sections)
+    while todo:
+        s = todo.pop()
+        if s in need: continue
+        need.add(s)
+        todo.extend(SECTION_INPUTS.get(s, []))
+    return need
+
+def _load_json(source):
+    if isinstance(source, str):
+        with open(source) as f: return json.load(f)
+    return source
+
 class GameAnalyzer:
-    def __init__(self, map_file, units_file, rules_file, metadata_file=None):
-        with open(map_file) as f: self.game_map = json.load(f)
-        with open(units_file) as f: self.units = json.load(f)
-        with open(rules_file) as f: self.rules = json.load(f)
+    def __init__(self, map_file, units_file, rules_file, metadata_file=None, map_id=None):
+        # Each source may be a JSON file path or the already-loaded object
+        self.game_map = _load_json(map_file)
+        self.units = _load_json(units_file)
+        self.rules = _load_json(rules_file)
         
         self.metadata = {}
         if metadata_file:
@@ -34,6 +86,27 @@ class GameAnalyzer:
             self.all_units_pos[(x, y)] = u
             self.unit_id_to_unit[u['id']] = u
 
+        self._distance_fields = {} # target_slot -> DistanceFields
+        self._enemy_positions = {} # slot -> set of enemy (x, y)
+        self._all_blocking = set(self.all_units_pos.keys())
+        self._reachable = {} # (unit id, mode) -> reachable (x, y) set
+        self._destinations = {} # unit id -> tiles the unit can end its move on
+        self._transport_drops = {} # unit id -> {(x, y): transport} tiles the unit can be unloaded on this turn
+        self._drop_rings = TransportDrops(self.game_map, self.width, self.height, self.all_units_pos)
+        self.damage_table = DamageTable(self.rules, self.get_co_powers())
+
+        # Precomputed terrain-only distance bounds for this map, if static_tables.py has built them
+        self.map_id = map_id
+        self.static_tables = load_static_tables(map_id, self.game_map) if map_id is not None else None
+
+    def get_co_powers(self):
+        """slot -> (CO name, power state 'd2d' | 'cop' | 'scop') from the metadata."""
+        powers = {}
+        for team_data in self.metadata.get('teams', {}).values():
+            for p in team_data.get('players', []):
+                powers[p['slot']] = (p.get('co'), p.get('co_power', 'd2d'))
+        return powers
+
     def get_player_team(self, slot):
         if not self.metadata: return str(slot)
         for team_name, team_data in self.metadata.get('teams', {}).items():
@@ -45,6 +118,180 @@ class GameAnalyzer:
     def is_enemy(self, slot_a, slot_b):
         return self.get_player_team(slot_a) != self.get_player_team(slot_b)
 
+    def get_distance_fields(self, target_slot):
+        """
+        Multi-turn distance fields towards every property the target player could capture.
+        Built once per slot and shared by all of that player's capturers.
+        """
+        if target_slot not in self._distance_fields:
+            properties = []
+            for y, row in enumerate(self.game_map):
+                for x, cell in enumerate(row):
+                    if cell.get('type') in CAPTURABLE_TYPES and cell.get('player', -1) != target_slot:
+                        properties.append((x, y))
+
+            blocking = self.get_enemy_positions(target_slot)
+            origins = [(u['type'], u['position']['x'], u['position']['y'])
+                       for u in self.units_by_slot.get(target_slot, []) if u['type'] in ['infantry', 'mech']]
+            self._distance_fields[target_slot] = DistanceFields(self.game_map, self.width, self.height, self.rules, properties, blocking,
+                                                                origins=origins, lower_bound=self.movement_lower_bound)
+        return self._distance_fields[target_slot]
+
+    def movement_lower_bound(self, move_type, ax, ay, bx, by):
+        """
+        Admissible lower bound on the MP needed to move from a to b: Manhattan distance (every tile costs
+        at least 1), tightened by the map's static ALT tables when they exist.
+        """
+        bound = abs(ax - bx) + abs(ay - by)
+        if self.static_tables is not None:
+            bound = max(bound, self.static_tables.lower_bound(move_type, ax, ay, bx, by))
+        return bound
+
+    def may_reach_any(self, unit, tiles):
+        """False only when the unit provably can't end its move on any of tiles this turn."""
+        u_stats = self.rules.get("units", {}).get(unit['type'], {})
+        move, m_type = u_stats.get('move', 3), u_stats.get('type', 'foot')
+        ux, uy = unit['position']['x'], unit['position']['y']
+        for tx, ty in tiles:
+            if abs(ux - tx) + abs(uy - ty) > move: continue
+            if self.movement_lower_bound(m_type, ux, uy, tx, ty) <= move:
+                return True
+        return False
+
+    def get_attack_tiles(self, slot):
+        """Tiles a direct attacker must stand on to hit one of slot's units."""
+        tiles = set()
+        for u in self.units_by_slot.get(slot, []):
+            x, y = u['position']['x'], u['position']['y']
+            for dx, dy in [(0,1), (0,-1), (1,0), (-1,0)]:
+                if 0 <= x + dx < self.width and 0 <= y + dy < self.height:
+                    tiles.add((x + dx, y + dy))
+        return tiles
+
+    def get_enemy_positions(self, slot):
+        """Positions of every unit on a team hostile to slot (the same set object per slot, so batches can share it)."""
+        if slot not in self._enemy_positions:
+            blocking = set()
+            for other_slot, units in self.units_by_slot.items():
+                if self.is_enemy(slot, other_slot):
+                    for u in units:
+                        blocking.add((u['position']['x'], u['position']['y']))
+            self._enemy_positions[slot] = blocking
+        return self._enemy_positions[slot]
+
+    def _reach_blocking(self, unit, mode):
+        # 'move': only enemies block (how the unit really moves).
+        # 'threat': everyone blocks (the worst case analyze_threats assumes for enemy movement).
+        if mode == 'threat':
+            return self._all_blocking
+        return self.get_enemy_positions(unit['playerSlot'])
+
+    def get_reachable(self, unit, mode='move'):
+        key = (unit['id'], mode)
+        if key not in self._reachable:
+            u_stats = self.rules.get("units", {}).get(unit['type'], {})
+            self._reachable[key] = get_reachable_cells(
+                unit['position']['x'], unit['position']['y'], u_stats.get('move', 3), u_stats.get('type', 'foot'),
+                self.game_map, self.width, self.height, self._reach_blocking(unit, mode))
+        return self._reachable[key]
+
+    def prefetch_reachability(self, target_slot):
+        """
+        Run every pathfinding search the analysis will need as one batch,
+        spread across worker processes on large boards (see parallel_reach).
+        """
+        jobs = []
+        attack_tiles = self.get_attack_tiles(target_slot)
+        for slot, units in self.units_by_slot.items():
+            if slot == target_slot:
+                mode = 'move'
+            elif self.is_enemy(target_slot, slot):
+                mode = 'threat'
+            else:
+                continue
+            for u in units:
+                u_stats = self.rules.get("units", {}).get(u['type'], {})
+                # Enemy indirects threaten from where they stand, so they need no search
+                if mode == 'threat' and u_stats.get('range', [1, 1])[1] != 1: continue
+                # ...and nor do enemies that provably can't get next to any of our units
+                if mode == 'threat' and not self.may_reach_any(u, attack_tiles): continue
+                if (u['id'], mode) in self._reachable: continue
+                jobs.append(((u['id'], mode), u['position']['x'], u['position']['y'], u_stats.get('move', 3),
+                             u_stats.get('type', 'foot'), self._reach_blocking(u, mode)))
+        if jobs:
+            self._reachable.update(compute_reachability(jobs, self.game_map, self.width, self.height))
+
+    def get_destinations(self, unit):
+        """
+        Tiles the unit can end its move on: enemies block movement, and no unit may end on another unit.
+        """
+        if unit['id'] not in self._destinations:
+            ux, uy = unit['position']['x'], unit['position']['y']
+            reachable = self.get_reachable(unit, 'move')
+            self._destinations[unit['id']] = [
+                (rx, ry) for (rx, ry) in reachable
+                if (rx, ry) not in self.all_units_pos or (rx, ry) == (ux, uy)
+            ]
+        return self._destinations[unit['id']]
+
+    def get_transport_drops(self, unit):
+        """
+        Tiles the unit can be unloaded onto this turn by boarding one of its own transports:
+        walk onto the transport, the transport moves, then drops the unit next to where it stops.
+        Each transport's destinations and unload ring are computed once and shared by all its passengers.
+        Returns {(x, y): transport unit}.
+        """
+        if unit['id'] not in self._transport_drops:
+            drops = {}
+            u_stats = self.rules.get("units", {}).get(unit['type'], {})
+            move, m_type = u_stats.get('move', 3), u_stats.get('type', 'foot')
+            ux, uy = unit['position']['x'], unit['position']['y']
+            transports = [t for t in self.units_by_slot.get(unit['playerSlot'], [])
+                          if t['type'] in CARRIERS and can_carry(t['type'], unit['type'], m_type)
+                          and abs(t['position']['x'] - ux) + abs(t['position']['y'] - uy) <= move]
+            if transports:
+                reachable = self.get_reachable(unit, 'move')
+                for t in transports:
+                    if (t['position']['x'], t['position']['y']) not in reachable: continue
+                    for tile in self._drop_rings.drops(t, self.get_destinations(t), m_type):
+                        drops.setdefault(tile, t)
+            self._transport_drops[unit['id']] = drops
+        return self._transport_drops[unit['id']]
+
+    def analyze_attack_options(self, target_slot):
+        """
+        Rank every attack the target player can make this turn by value traded, counter-attacks included.
+        """
+        my_units = self.units_by_slot.get(target_slot, [])
+        enemy_positions = {}
+        for slot, units in self.units_by_slot.items():
+            if self.is_enemy(target_slot, slot):
+                for u in units:
+                    enemy_positions[(u['position']['x'], u['position']['y'])] = u
+
+        destinations = {u['id']: self.get_destinations(u) for u in my_units}
+        return enumerate_attack_options(my_units, destinations, enemy_positions, self.game_map, self.damage_table)
+
+    def plan_focus_fire(self, target_slot, budget_ms=FOCUS_FIRE_BUDGET_MS, attack_options=None, node_budget=None):
+        """
+        Search for the best ordered set of attacks this turn (kills, HP carry-over, tile conflicts).
+        Returns the best plan found within budget_ms and node_budget (see search_focus_fire).
+        """
+        if attack_options is None:
+            attack_options = self.analyze_attack_options(target_slot)
+        return search_focus_fire(attack_options, self.damage_table, self.game_map, budget_ms, node_budget=node_budget)
+
+    def analyze_influence(self, target_slot):
+        """
+        Zone-of-control summary: which share of the board each side dominates,
+        where the frontline sits and which properties are contested.
+        """
+        units_by_team = {}
+        for slot, units in self.units_by_slot.items():
+            units_by_team.setdefault(self.get_player_team(slot), []).extend(units)
+        fields = compute_team_fields(units_by_team, self.rules, self.width, self.height)
+        return summarize_influence(fields, self.get_player_team(target_slot), self.game_map, self.width, self.height, target_slot)
+
     def analyze_economy(self):
         stats = {}
         if not self.metadata: return stats
@@ -83,29 +330,27 @@ class GameAnalyzer:
         # Build set of our unit positions
         my_units = self.units_by_slot.get(target_slot, [])
         my_unit_positions = {(u['position']['x'], u['position']['y']): u for u in my_units}
-        
-        blocking_for_enemies = set(self.all_units_pos.keys()) # Enemies are blocked by everyone basically (except allies, but let's assume worst case blocking)
+        attack_tiles = self.get_attack_tiles(target_slot)
         
         for enemy in enemy_units:
             e_type = enemy['type']
             ex, ey = enemy['position']['x'], enemy['position']['y']
             
             e_stats = self.rules.get("units", {}).get(e_type, {})
-            move = e_stats.get('move', 3)
-            m_type = e_stats.get('type', 'foot')
             min_rng, max_rng = e_stats.get('range', [1,1])
             
-            # Simple Manhattan distance check first
-            # If enemy is > move + max_rng away from ANY of our units, skip
-            # (Optimization omitted for brevity, but recommended for large maps)
+            # Distance check first: skip direct attackers whose lower-bound distance
+            # (Manhattan / static tables) to every tile next to our units exceeds their move
+            if max_rng == 1 and not self.may_reach_any(enemy, attack_tiles):
+                continue
 
-            reachable = get_reachable_cells(ex, ey, move, m_type, self.game_map, self.width, self.height, blocking_for_enemies)
-            
             # For each reachable cell, check attack range
             attackable_positions = set()
             
             # If direct attacker (range 1)
             if max_rng == 1:
+                # Enemies are blocked by everyone basically (except allies, but let's assume worst case blocking)
+                reachable = self.get_reachable(enemy, 'threat')
                 for rx, ry in reachable:
                     for dx, dy in [(0,1), (0,-1), (1,0), (-1,0)]:
                         tx, ty = rx+dx, ry+dy
@@ -134,7 +379,9 @@ class GameAnalyzer:
                 # Calculate damage
                 # Need terrain of victim
                 t_cell = self.game_map[ty][tx]
-                dmg = calculate_damage(e_type, victim['type'], enemy['stats']['hp'], victim['stats']['hp'], t_cell, self.rules)
+                dmg = self.damage_table.damage(e_type, victim['type'], enemy['stats']['hp'], get_terrain_type(t_cell),
+                                               enemy['playerSlot'], target_slot)
+                pmf = self.threat_distribution(enemy, victim, target_slot)
                 
                 threats.append({
                     "attacker": {
@@ -148,49 +395,168 @@ class GameAnalyzer:
                         "id": victim['id'],
                         "pos": [tx, ty]
                     },
-                    "damage_pct": dmg
+                    "damage_pct": dmg,
+                    **self.luck_fields(pmf, victim)
+                })
+
+        # Ferried attackers: an enemy that boards its transport and is unloaded next to one of our units
+        # this turn can strike next turn. Flagged next_turn so they don't count as immediate danger.
+        direct_pairs = {(t['attacker']['id'], t['victim']['id']) for t in threats}
+        for enemy in enemy_units:
+            e_stats = self.rules.get("units", {}).get(enemy['type'], {})
+            if e_stats.get('range', [1, 1])[1] != 1: continue
+            found = {}
+            for (dx, dy), transport in self.get_transport_drops(enemy).items():
+                for ax, ay in [(dx, dy+1), (dx, dy-1), (dx+1, dy), (dx-1, dy)]:
+                    victim = my_unit_positions.get((ax, ay))
+                    if victim is None or (enemy['id'], victim['id']) in direct_pairs: continue
+                    found.setdefault(victim['id'], (victim, transport))
+            for victim, transport in found.values():
+                tx, ty = victim['position']['x'], victim['position']['y']
+                dmg = self.damage_table.damage(enemy['type'], victim['type'], enemy['stats']['hp'], get_terrain_type(self.game_map[ty][tx]),
+                                               enemy['playerSlot'], target_slot)
+                pmf = self.threat_distribution(enemy, victim, target_slot)
+                threats.append({
+                    "attacker": {
+                        "type": enemy['type'],
+                        "id": enemy['id'],
+                        "pos": [enemy['position']['x'], enemy['position']['y']],
+                        "player": enemy['playerSlot']
+                    },
+                    "victim": {
+                        "type": victim['type'],
+                        "id": victim['id'],
+                        "pos": [tx, ty]
+                    },
+                    "damage_pct": dmg,
+                    **self.luck_fields(pmf, victim),
+                    "via_transport": {"type": transport['type'], "id": transport['id']},
+                    "next_turn": True
                 })
+
+        # Latent attackers: units the enemy can build this turn and strike with on its next one
+        live_mask = tile_mask({tuple(t['victim']['pos']) for t in threats if not t.get('next_turn')}, self.width)
+        threats.extend(self.analyze_production_threats(target_slot, my_unit_positions, live_mask))
                 
         # Sort by damage descending
         threats.sort(key=lambda x: x['damage_pct'], reverse=True)
         return threats
 
-    def analyze_captures(self, target_slot):
+    def get_production_facilities(self, target_slot):
+        """
+        (owner slot, facility type, x, y, unit types it can build and afford) for every enemy base, airport and port
+        that can build this turn, plus each owner's CO cost multiplier.
+        """
+        economies = player_economies(self.game_map, self.metadata)
+        units_rules = self.rules.get("units", {})
+        multipliers = {}
+        facilities = []
+        for y, row in enumerate(self.game_map):
+            for x, cell in enumerate(row):
+                facility, owner = cell.get('type'), cell.get('player', -1)
+                if facility not in PRODUCTION or owner not in economies or not self.is_enemy(target_slot, owner): continue
+                # A facility with an opposing unit on it can't build
+                occupant = self.all_units_pos.get((x, y))
+                if occupant is not None and self.is_enemy(owner, occupant['playerSlot']): continue
+                if owner not in multipliers:
+                    co_stats = self.rules.get("co_stats", {}).get(self.get_player_co(owner), {})
+                    multipliers[owner] = co_stats.get("d2d", {}).get("cost_multiplier", 1.0)
+                types = buildable_attackers(facility, starting_funds(economies[owner]), units_rules, self.damage_table, multipliers[owner])
+                if types: facilities.append((owner, facility, x, y, types))
+        return facilities, multipliers
+
+    def analyze_production_threats(self, target_slot, victims, live_mask=0):
+        """
+        Next-turn threats from freshly built enemy units, at most one per (facility, victim): the most damaging type
+        the owner can afford. only_threat marks victims nothing already on the board can hit (live_mask).
+        """
+        if not victims: return []
+        facilities, multipliers = self.get_production_facilities(target_slot)
+        if not facilities: return []
+
+        def damage(unit_type, owner, victim):
+            vx, vy = victim['position']['x'], victim['position']['y']
+            return self.damage_table.damage(unit_type, victim['type'], 100, get_terrain_type(self.game_map[vy][vx]), owner, target_slot)
+
+        hits, exposed = find_production_threats(self.game_map, self.width, self.height, self.map_id, facilities, victims,
+                                                self.rules.get("units", {}), damage, live_mask)
+        threats = []
+        for (owner, facility, x, y, _), unit_type, victim, dmg in hits:
+            vx, vy = victim['position']['x'], victim['position']['y']
+            pmf = self.damage_table.damage_distribution(unit_type, victim['type'], 100, get_terrain_type(self.game_map[vy][vx]), owner, target_slot)
+            threats.append({
+                "attacker": {"type": unit_type, "id": None, "pos": [x, y], "player": owner},
+                "victim": {"type": victim['type'], "id": victim['id'], "pos": [vx, vy]},
+                "damage_pct": dmg,
+                **self.luck_fields(pmf, victim),
+                "via_production": {
+                    "facility": facility,
+                    "cost": round(self.damage_table.cost.get(unit_type, 0) * multipliers[owner]),
+                    "only_threat": bool(exposed >> (vy * self.width + vx) & 1)
+                },
+                "next_turn": True
+            })
+        return threats
+
+    def threat_distribution(self, enemy, victim, target_slot):
+        """Damage distribution over the luck roll for enemy hitting victim where it stands."""
+        vx, vy = victim['position']['x'], victim['position']['y']
+        return self.damage_table.damage_distribution(enemy['type'], victim['type'], enemy['stats']['hp'],
+                                                     get_terrain_type(self.game_map[vy][vx]), enemy['playerSlot'], target_slot)
+
+    def luck_fields(self, pmf, victim):
+        support = [d for d, p in enumerate(pmf) if p]
+        return {
+            "damage_range": [support[0], support[-1]],
+            "kill_probability": round(kill_probability([pmf], victim['stats']['hp']), 3)
+        }
+
+    def analyze_kill_risk(self, target_slot, threats):
+        """
+        Chance of losing each threatened unit this turn if every enemy that can reach it attacks it.
+        The attackers' luck distributions are convolved, so the cost is linear in the number of attackers.
+        """
+        attackers_by_victim = {}
+        for t in threats:
+            if t.get('next_turn'): continue
+            attackers_by_victim.setdefault(t['victim']['id'], []).append(t['attacker']['id'])
+
+        risks = []
+        for victim_id, attacker_ids in attackers_by_victim.items():
+            victim = self.unit_id_to_unit[victim_id]
+            pmfs = [self.threat_distribution(self.unit_id_to_unit[a], victim, target_slot) for a in attacker_ids]
+            risks.append({
+                "victim": {"type": victim['type'], "id": victim_id, "pos": [victim['position']['x'], victim['position']['y']], "hp": victim['stats']['hp']},
+                "attackers": attacker_ids,
+                "kill_probability": round(kill_probability(pmfs, victim['stats']['hp']), 3)
+            })
+        risks.sort(key=lambda r: (r['kill_probability'], self.damage_table.cost.get(r['victim']['type'], 0)), reverse=True)
+        return risks
+
+    def analyze_captures(self, target_slot, max_turns=CAPTURE_HORIZON):
         """
         Identify capture opportunities for the target player.
+        Properties reachable this turn have turns_to_reach 1; further ones (up to max_turns) come from the shared distance fields.
         """
         captures = []
         my_units = self.units_by_slot.get(target_slot, [])
         my_team = self.get_player_team(target_slot)
         
-        blocking = set() # Assume we can move through allies? 
-        # Actually in AWBW/AW2 you can move through allies.
-        # But for 'blocking_cells' in get_reachable_cells, we pass OBSTACLES.
-        # So we collect ENEMY units.
-        for slot, units in self.units_by_slot.items():
-            if self.is_enemy(target_slot, slot):
-                for u in units:
-                    blocking.add((u['position']['x'], u['position']['y']))
-        
+        fields = self.get_distance_fields(target_slot) if max_turns > 1 else None
+
         for u in my_units:
             if u['type'] not in ['infantry', 'mech']: continue
             
             ux, uy = u['position']['x'], u['position']['y']
-            u_stats = self.rules.get("units", {}).get(u['type'], {})
-            move = u_stats.get('move', 3)
-            m_type = u_stats.get('type', 'foot')
-            
-            reachable = get_reachable_cells(ux, uy, move, m_type, self.game_map, self.width, self.height, blocking)
+            first = len(captures)
             
-            for rx, ry in reachable:
-                # Cannot end on occupied square unless it's us
-                if (rx, ry) in self.all_units_pos and (rx, ry) != (ux, uy):
-                    continue
-                    
+            # In AWBW/AW2 you can move through allies, so only enemies block;
+            # destinations also exclude occupied squares (unless it's us)
+            for rx, ry in self.get_destinations(u):
                 cell = self.game_map[ry][rx]
                 ctype = cell.get('type')
                 
-                if ctype in ['city', 'base', 'airport', 'port', 'hq', 'lab', 'comTower']:
+                if ctype in CAPTURABLE_TYPES:
                     owner = cell.get('player', -1)
                     if owner != target_slot:
                         captures.append({
@@ -200,29 +566,139 @@ class GameAnalyzer:
                             "current_owner": owner,
                             "turns_to_reach": 1 # Immediate reach
                         })
-                        
+
+            if fields is None: continue
+            for (px, py), turns in fields.reachable_properties(u['type'], ux, uy):
+                # Turn 1 is covered exactly above (including occupied-tile rules)
+                if turns < 2 or turns > max_turns: continue
+                cell = self.game_map[py][px]
+                captures.append({
+                    "unit_id": u['id'],
+                    "pos": [px, py],
+                    "property_type": cell.get('type'),
+                    "current_owner": cell.get('player', -1),
+                    "turns_to_reach": turns
+                })
+
+            # Ferried: unloaded onto the property this turn, so the capture starts next turn
+            drops = self.get_transport_drops(u)
+            if not drops: continue
+            index = {tuple(c['pos']): i for i, c in enumerate(captures[first:], first)}
+            for (px, py), transport in drops.items():
+                cell = self.game_map[py][px]
+                if cell.get('type') not in CAPTURABLE_TYPES or cell.get('player', -1) == target_slot: continue
+                i = index.get((px, py))
+                if i is not None and captures[i]['turns_to_reach'] <= 2: continue
+                entry = {
+                    "unit_id": u['id'],
+                    "pos": [px, py],
+                    "property_type": cell.get('type'),
+                    "current_owner": cell.get('player', -1),
+                    "turns_to_reach": 2,
+                    "via_transport": {"type": transport['type'], "id": transport['id']}
+                }
+                if i is None: captures.append(entry)
+                else: captures[i] = entry
+
+        captures.sort(key=lambda c: c['turns_to_reach'])
         return captures
 
-    def generate_strategic_advice(self, target_slot, threats, captures):
+    def get_player_co(self, slot):
+        for team_data in self.metadata.get('teams', {}).values():
+            for p in team_data.get('players', []):
+                if p['slot'] == slot:
+                    return p.get('co')
+        return None
+
+    def plan_captures(self, target_slot):
+        """
+        Assign each of the target player's infantry/mechs a distinct property to capture.
+        """
+        capturers = [u for u in self.units_by_slot.get(target_slot, []) if u['type'] in ['infantry', 'mech']]
+        co_stats = self.rules.get("co_stats", {}).get(self.get_player_co(target_slot), {})
+        capture_rate = co_stats.get("d2d", {}).get("capture_rate", 1.0)
+        return plan_captures(capturers, self.get_distance_fields(target_slot), self.game_map, capture_rate)
+
+    def forecast_economy(self, target_slot, capture_plan=None, turns=FORECAST_TURNS):
+        """
+        Funds/income/army projections for every live player (the target's captures included) and the target's
+        best build orders over the same horizon.
+        """
+        if capture_plan is None: capture_plan = self.plan_captures(target_slot)
+        economies = player_economies(self.game_map, self.metadata, {target_slot: capture_plan})
+        result = {"turns": turns, "players": {slot: forecast(econ, turns) for slot, econ in economies.items()}, "build_options": []}
+        econ = economies.get(target_slot)
+        if econ is None: return result
+
+        enemies = [u for slot, units in self.units_by_slot.items() if self.is_enemy(target_slot, slot) for u in units]
+        co_stats = self.rules.get("co_stats", {}).get(self.get_player_co(target_slot), {})
+        worths = unit_worths(self.damage_table, enemies, co_stats.get("d2d", {}).get("cost_multiplier", 1.0))
+        planned = {tuple(a['target']) for a in capture_plan}
+        open_properties = sum(
+            1 for y, row in enumerate(self.game_map) for x, cell in enumerate(row)
+            if cell.get('type') in INCOME_TYPES and cell.get('player', -1) != target_slot and (x, y) not in planned
+        )
+        plans = candidate_plans(econ, worths, self.rules.get("units", {}), turns)
+        result["build_options"] = score_build_orders(econ, plans, worths, turns, open_properties)[:BUILD_OPTION_LIMIT]
+        result["plans_scored"] = len(plans)
+        return result
+
+    def generate_strategic_advice(self, target_slot, threats, captures, influence=None, kill_risk=None, economy_forecast=None):
         """
         Generate high-level strategic tips based on the analysis.
         """
         advice = []
         
         # Threat assessment
-        high_threats = [t for t in threats if t['damage_pct'] >= 50]
+        high_threats = [t for t in threats if is_high_threat(t)]
         if high_threats:
-            advice.append(f"CRITICAL: {len(high_threats)} units are in danger of taking >50% damage. Check your {high_threats[0]['victim']['type']} at {high_threats[0]['victim']['pos']}!")
+            advice.append(f"CRITICAL: {len(high_threats)} units are in danger of taking {HIGH_THREAT_PCT}%+ damage. Check your {high_threats[0]['victim']['type']} at {high_threats[0]['victim']['pos']}!")
         elif threats:
             advice.append("Units are relatively safe, but keep an eye on enemy range.")
         else:
             advice.append("No immediate threats detected. You have freedom to maneuver.")
+        if kill_risk and kill_risk[0]['kill_probability'] >= KILL_RISK_WARNING:
+            r = kill_risk[0]
+            advice.append(f"DANGER: {r['kill_probability']:.0%} chance to lose your {r['victim']['type']} at {r['victim']['pos']} ({len(r['attackers'])} enemy attackers in range).")
             
         # Capture opportunities
-        if captures:
-            props = set([c['property_type'] for c in captures])
-            advice.append(f"OPPORTUNITY: You can capture {len(captures)} properties ({', '.join(props)}) this turn.")
+        immediate = [c for c in captures if c['turns_to_reach'] == 1]
+        if immediate:
+            props = set([c['property_type'] for c in immediate])
+            advice.append(f"OPPORTUNITY: You can capture {len(immediate)} properties ({', '.join(sorted(props))}) this turn.")
+        upcoming = set(tuple(c['pos']) for c in captures if c['turns_to_reach'] > 1) - set(tuple(c['pos']) for c in immediate)
+        if upcoming:
+            advice.append(f"EXPANSION: {len(upcoming)} more properties are within {max(c['turns_to_reach'] for c in captures)} turns of your infantry.")
+        ferried = set(tuple(c['pos']) for c in captures if c.get('via_transport'))
+        if ferried:
+            advice.append(f"TRANSPORT: Loading infantry into your transports puts {len(ferried)} properties in capture range next turn.")
+        dropped = [t for t in threats if t.get('via_transport')]
+        if dropped:
+            advice.append(f"WARNING: Enemy transports can drop attackers next to {len(set(t['victim']['id'] for t in dropped))} of your units for a strike next turn.")
+        built = [t for t in threats if t.get('via_production')]
+        if built:
+            exposed = set(t['victim']['id'] for t in built if t['via_production']['only_threat'])
+            t = built[0]
+            advice.append(f"PRODUCTION: Units the enemy can build now reach {len(set(t['victim']['id'] for t in built))} of your units next turn"
+                          f" ({len(exposed)} out of reach of everything already on the board), e.g. a {t['attacker']['type']} from the"
+                          f" {t['via_production']['facility']} at {t['attacker']['pos']} hits your {t['victim']['type']} for {t['damage_pct']}%.")
             
+        # Production
+        options = (economy_forecast or {}).get('build_options')
+        if options and options[0]['first_turn']:
+            best = options[0]
+            plan = " + ".join(best['first_turn']) + (", then the same every turn you can afford it" if best['repeats'] else ", then save")
+            advice.append(f"BUILD: {plan} scores best over {economy_forecast['turns']} turns of the {economy_forecast.get('plans_scored', len(options))} build orders compared.")
+
+        # Zone of control
+        if influence:
+            lost = [c for c in influence['contested_properties'] if c['owner'] == target_slot and c['margin'] < -CONTESTED_MARGIN]
+            if lost:
+                advice.append(f"WARNING: The enemy controls the area around {len(lost)} of your properties (e.g. {lost[0]['property_type']} at {lost[0]['pos']}).")
+            front = influence.get('frontline')
+            if front:
+                advice.append(f"FRONTLINE: Forces meet around {front['center']} (x {front['x_range'][0]}-{front['x_range'][1]}, y {front['y_range'][0]}-{front['y_range'][1]}).")
+
         # Economy check
         econ = self.analyze_economy()
         my_stats = econ.get(target_slot) or econ.get(str(target_slot))
@@ -246,15 +722,39 @@ class GameAnalyzer:
                 
         return advice
 
-    def get_full_analysis(self, target_slot):
-        threats = self.analyze_threats(target_slot)
-        captures = self.analyze_captures(target_slot)
-        advice = self.generate_strategic_advice(target_slot, threats, captures)
-        
-        return {
-            "economy": self.analyze_economy(),
-            "threats": threats,
-            "captures": captures,
-            "advice": advice
-        }
+    def get_full_analysis(self, target_slot, sections=None, focus_fire_nodes=None):
+        """
+        Every analysis section for one player, or only the listed ones (and only the work they need).
+        focus_fire_nodes: cap the focus-fire search by expanded nodes instead of wall-clock time, for output that
+        doesn't depend on machine speed.
+        """
+        need = section_closure(sections) if sections is not None else set(ANALYSIS_SECTIONS)
+        out = {}
+        if need & {"threats", "captures", "attack_options", "focus_fire"}:
+            self.prefetch_reachability(target_slot)
+        if "economy" in need: out["economy"] = self.analyze_economy()
+        if "threats" in need: out["threats"] = self.analyze_threats(target_slot)
+        if "captures" in need: out["captures"] = self.analyze_captures(target_slot)
+        if "capture_plan" in need: out["capture_plan"] = self.plan_captures(target_slot)
+        if need & {"attack_options", "focus_fire"}:
+            attack_options = self.analyze_attack_options(target_slot)
+            if "focus_fire" in need:
+                if focus_fire_nodes is None:
+                    out["focus_fire"] = self.plan_focus_fire(target_slot, attack_options=attack_options)
+                else:
+                    out["focus_fire"] = self.plan_focus_fire(target_slot, None, attack_options, focus_fire_nodes)
+            # Options are ranked, so the first one seen per (attacker, victim) is its best tile
+            best_attacks = {}
+            for o in attack_options:
+                best_attacks.setdefault((o['attacker']['id'], o['victim']['id']), o)
+            out["attack_options"] = list(best_attacks.values())[:ATTACK_OPTION_LIMIT]
+        if "influence" in need: out["influence"] = self.analyze_influence(target_slot)
+        if "kill_risk" in need: out["kill_risk"] = self.analyze_kill_risk(target_slot, out["threats"])
+        if "forecast" in need: out["forecast"] = self.forecast_economy(target_slot, out["capture_plan"])
+        if "advice" in need:
+            out["advice"] = self.generate_strategic_advice(target_slot, out["threats"], out["captures"], out["influence"],
+                                                           out["kill_risk"], out["forecast"])
+
+        wanted = need if sections is None else set(sections)
+        return {s: out[s] for s in ANALYSIS_SECTIONS if s in wanted}
 
@@ -0,0 +1,81 @@
+from game_logic import get_terrain_type
+
+NEIGHBOURS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+def enumerate_attack_options(attackers, destinations, enemy_positions, game_map, table):
+    """
+    Every (attacker, destination, victim) attack available to one player, with counter-attacks.
+    attackers: the player's unit dicts.
+    destinations: unit id -> list of (x, y) tiles the unit can end its move on.
+    enemy_positions: (x, y) -> enemy unit dict.
+    table: DamageTable for the current rules (and the players' COs, looked up by each unit's playerSlot).
+    Returns options sorted by value traded (funds of damage dealt minus funds of damage taken).
+
+    Damage dealt does not depend on where the attacker stands, so it is computed once per (attacker, victim).
+    Counter damage only depends on the attacker's tile terrain, so it is computed once per terrain type
+    and shared by every destination with that terrain.
+    """
+    options = []
+    for u in attackers:
+        a_type = u['type']
+        a_hp = u['stats']['hp']
+        a_slot = u.get('playerSlot')
+        a_cost = table.cost.get(a_type, 0)
+        min_rng, max_rng = table.range.get(a_type, [1, 1])
+        if max_rng == 0: continue
+        ux, uy = u['position']['x'], u['position']['y']
+
+        # victim pos -> list of tiles the attack can be made from
+        strikes = {}
+        if max_rng == 1:
+            for (rx, ry) in destinations.get(u['id'], []):
+                for dx, dy in NEIGHBOURS:
+                    t = (rx + dx, ry + dy)
+                    if t in enemy_positions:
+                        strikes.setdefault(t, []).append((rx, ry))
+        else:
+            # Indirects fire from where they stand (no move + fire)
+            for dy in range(-max_rng, max_rng + 1):
+                for dx in range(-max_rng, max_rng + 1):
+                    if min_rng <= abs(dx) + abs(dy) <= max_rng:
+                        t = (ux + dx, uy + dy)
+                        if t in enemy_positions:
+                            strikes.setdefault(t, []).append((ux, uy))
+
+        for (vx, vy), tiles in strikes.items():
+            victim = enemy_positions[(vx, vy)]
+            v_type = victim['type']
+            v_hp = victim['stats']['hp']
+            v_slot = victim.get('playerSlot')
+            v_cost = table.cost.get(v_type, 0)
+
+            dealt = table.damage(a_type, v_type, a_hp, get_terrain_type(game_map[vy][vx]), a_slot, v_slot)
+            if dealt <= 0: continue
+            dealt = min(dealt, v_hp)
+            v_hp_after = v_hp - dealt
+            dealt_value = dealt * v_cost / 100.0
+
+            counters = max_rng == 1 and v_hp_after > 0 and table.can_counter(v_type, a_type)
+            counter_by_terrain = {}
+            for (fx, fy) in tiles:
+                counter = 0
+                if counters:
+                    t_type = get_terrain_type(game_map[fy][fx])
+                    if t_type not in counter_by_terrain:
+                        # Post-hit HP is passed on the 0-10 scale so low HP isn't misread as displayed HP
+                        raw = table.damage(v_type, a_type, v_hp_after / 10.0, t_type, v_slot, a_slot)
+                        counter_by_terrain[t_type] = min(raw, a_hp)
+                    counter = counter_by_terrain[t_type]
+
+                options.append({
+                    "attacker": {"type": a_type, "id": u['id'], "pos": [ux, uy], "hp": a_hp, "player": a_slot},
+                    "from": [fx, fy],
+                    "victim": {"type": v_type, "id": victim['id'], "pos": [vx, vy], "hp": v_hp, "player": v_slot},
+                    "damage_pct": dealt,
+                    "counter_pct": counter,
+                    "kills": v_hp_after <= 0,
+                    "value": round(dealt_value - counter * a_cost / 100.0, 1)
+                })
+
+    options.sort(key=lambda o: (o['value'], -o['counter_pct']), reverse=True)
+    return options
@@ -0,0 +1,161 @@
+"""
+Offline batch analysis of saved snapshots (see snapshots.py), for tuning advice thresholds over many game states.
+
+Inputs are snapshot JSON files, directories of them (searched recursively) and .zip/.tar/.tar.gz archives of them.
+Each snapshot is analyzed for every live player on a process pool and written as one JSON line:
+    {"source": ..., "game_id": ..., "fingerprint": ..., "analyses": {slot: get_full_analysis}}
+or {"source": ..., "error": ...} when it could not be read or analyzed. Lines come out in completion order.
+
+Memory stays bounded: inputs are listed lazily, and at most --max-pending snapshots are read but not yet written.
+Workers get small chunks of work (--chunk-size) and load rules.json once each.
+
+--sections computes only the listed sections and what they are built from, so leaving out focus_fire (the most
+expensive one) skips the search entirely. The focus-fire search stops after --focus-fire-nodes expanded nodes rather
+than after a wall-clock budget, so the same inputs always give the same output.
+
+Usage:
+    python api/batch_analyze.py <path> [<path> ...] [-o results.jsonl] [--workers N] [--sections economy,advice]
+"""
+import os
+import sys
+import json
+import time
+import tarfile
+import zipfile
+import argparse
+import threading
+import multiprocessing
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+CHUNK_SIZE = 8
+MAX_PENDING = 256
+PROGRESS_SECONDS = 5.0
+# Focus-fire search budget per player, in expanded nodes
+FOCUS_FIRE_NODES = 2000
+
+_rules = None
+_sections = None
+_focus_fire_nodes = FOCUS_FIRE_NODES
+
+def _init_worker(sections, focus_fire_nodes):
+    global _rules, _sections, _focus_fire_nodes
+    # The pool already uses every core; pool workers can't start reachability pools of their own
+    import parallel_reach
+    parallel_reach.REACH_WORKERS = 0
+    with open(RULES_PATH) as f: _rules = json.load(f)
+    _sections = sections
+    _focus_fire_nodes = focus_fire_nodes
+
+def iter_inputs(paths):
+    """
+    Yields (source name, loader) per snapshot. Directories and zip archives only yield a path/member name and the
+    worker reads it; tar members have to be read in order, so their bytes are read here.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(".json"):
+                        yield os.path.join(root, name), ("file", os.path.join(root, name))
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as z:
+                for name in z.namelist():
+                    if name.endswith(".json"):
+                        yield f"{path}:{name}", ("zip", path, name)
+        elif tarfile.is_tarfile(path):
+            with tarfile.open(path) as t:
+                for member in t:
+                    if member.isfile() and member.name.endswith(".json"):
+                        yield f"{path}:{member.name}", ("bytes", t.extractfile(member).read())
+        else:
+            yield path, ("file", path)
+
+def _load(loader):
+    kind = loader[0]
+    if kind == "file":
+        with open(loader[1], "rb") as f: return json.loads(f.read())
+    if kind == "zip":
+        with zipfile.ZipFile(loader[1]) as z: return json.loads(z.read(loader[2]))
+    return json.loads(loader[1])
+
+def analyze_one(task):
+    """Worker: one snapshot -> (failed, its JSONL line)."""
+    source, loader = task
+    try:
+        import response_cache
+        from snapshots import compute_analyses
+        snapshot = _load(loader)
+        analyses = compute_analyses(snapshot, _rules, sections=_sections, focus_fire_nodes=_focus_fire_nodes)
+        result = {"source": source, "game_id": snapshot.get('game_id'),
+                  "fingerprint": response_cache.snapshot_fingerprint(snapshot), "analyses": analyses}
+    except Exception as e:
+        return True, json.dumps({"source": source, "error": f"{type(e).__name__}: {e}"})
+    return False, json.dumps(result, separators=(',', ':'))
+
+class Progress:
+    def __init__(self, stream=sys.stderr, every=PROGRESS_SECONDS):
+        self.stream = stream
+        self.every = every
+        self.start = self.last = time.perf_counter()
+        self.done = 0
+        self.errors = 0
+
+    def update(self, error):
+        self.done += 1
+        self.errors += error
+        now = time.perf_counter()
+        if now - self.last >= self.every:
+            self.last = now
+            self.report(now)
+
+    def report(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.start
+        rate = self.done / elapsed * 60 if elapsed > 0 else 0.0
+        print(f"[batch] {self.done} snapshots ({self.errors} errors), {elapsed:.0f} s, {rate:.0f}/min", file=self.stream)
+
+def run(paths, out, workers=None, chunk_size=CHUNK_SIZE, max_pending=MAX_PENDING, sections=None, progress=None,
+        focus_fire_nodes=FOCUS_FIRE_NODES):
+    """Analyze every snapshot under paths, writing JSONL lines to out. Returns the Progress counters."""
+    progress = progress or Progress()
+    # imap pulls tasks from a feeder thread as fast as it can; the semaphore holds it back until results are written.
+    # A chunk is only sent once it is full, so at least one chunk's worth must be allowed.
+    pending = threading.Semaphore(max(max_pending, chunk_size))
+    def tasks():
+        for task in iter_inputs(paths):
+            pending.acquire()
+            yield task
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(sections, focus_fire_nodes)) as pool:
+        for failed, line in pool.imap_unordered(analyze_one, tasks(), chunksize=chunk_size):
+            out.write(line + "\n")
+            pending.release()
+            progress.update(failed)
+    progress.report()
+    return progress
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run get_full_analysis over saved snapshots on a process pool.")
+    parser.add_argument("paths", nargs="+", help="snapshot files, directories, or .zip/.tar(.gz) archives")
+    parser.add_argument("-o", "--output", help="JSONL file to write (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING, help="snapshots read but not yet written")
+    parser.add_argument("--sections", help="comma-separated analysis sections to compute, e.g. economy,threats,advice")
+    parser.add_argument("--focus-fire-nodes", type=int, default=FOCUS_FIRE_NODES,
+                        help=f"focus-fire search budget per player in expanded nodes (default: {FOCUS_FIRE_NODES})")
+    args = parser.parse_args()
+    sections = [s.strip() for s in args.sections.split(",")] if args.sections else None
+    if sections:
+        from analyzer import ANALYSIS_SECTIONS
+        unknown = [s for s in sections if s not in ANALYSIS_SECTIONS]
+        if unknown: parser.error(f"unknown sections: {', '.join(unknown)} (known: {', '.join(ANALYSIS_SECTIONS)})")
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        progress = run(args.paths, out, args.workers, args.chunk_size, args.max_pending, sections,
+                       focus_fire_nodes=args.focus_fire_nodes)
+    finally:
+        if args.output: out.close()
+    sys.exit(1 if progress.errors and progress.errors == progress.done else 0)
@@ -0,0 +1,22 @@
+"""
+Builds the ready-to-load artifacts the API reads at cold start instead of compiling them per instance.
+Run after changing MOVE_COSTS or the terrain tables:
+
+    python api/build_artifacts.py
+"""
+import json
+
+from game_logic import COMPILED_TABLES_PATH, compile_tile_move_costs, move_costs_fingerprint
+
+def build_compiled_tables(path=COMPILED_TABLES_PATH):
+    artifact = {
+        "move_costs": move_costs_fingerprint(),
+        "tile_move_costs": compile_tile_move_costs()
+    }
+    with open(path, "w") as f:
+        json.dump(artifact, f, indent=1, sort_keys=True)
+    return artifact
+
+if __name__ == '__main__':
+    build_compiled_tables()
+    print(f"wrote {COMPILED_TABLES_PATH}")
@@ -0,0 +1,131 @@
+import math
+
+CAPTURE_POINTS = 20
+UNREACHABLE = 10 ** 6
+
+def capture_turns(hp, capture_rate=1.0):
+    """
+    Turns a capturer needs on the tile to take a full-strength property.
+    hp: 0-10 (or 0-100). Each turn removes displayed HP (scaled by the CO's capture rate) from 20 points.
+    """
+    d_hp = math.ceil(hp if hp <= 10 else hp / 10)
+    per_turn = math.floor(d_hp * capture_rate)
+    if per_turn <= 0: return None
+    return math.ceil(CAPTURE_POINTS / per_turn)
+
+def solve_assignment(cost):
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials).
+    cost: list of n rows, each of m columns, n <= m.
+    Returns a list where result[i] is the column assigned to row i.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    INF = float('inf')
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1) # p[j] = row matched to column j (1-based, 0 = free)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = INF
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - ui0 - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0: break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0: break
+
+    result = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]: result[p[j] - 1] = j - 1
+    return result
+
+def plan_captures(capturers, fields, game_map, capture_rate=1.0):
+    """
+    Gives each capturer a distinct property, minimising the total turns until all captures complete.
+    capturers: unit dicts (infantry/mech) belonging to one player.
+    fields: DistanceFields for that player.
+    Returns a list of assignments sorted by total_turns.
+    """
+    if not capturers: return []
+
+    # Batch the matrix by movement class: each class reads its shared fields once per property column.
+    by_class = {}
+    for row, u in enumerate(capturers):
+        by_class.setdefault(fields.movement_class(u['type']), []).append(row)
+
+    properties = fields.properties
+    n = len(capturers)
+    reach = [[None] * len(properties) for _ in range(n)]
+    for rows in by_class.values():
+        class_fields = fields.fields_for(capturers[rows[0]]['type'])
+        idxs = [capturers[r]['position']['y'] * fields.width + capturers[r]['position']['x'] for r in rows]
+        for col, prop in enumerate(properties):
+            field = class_fields.get(prop)
+            if field is None: continue # out of range for every capturer of this class
+            for r, idx in zip(rows, idxs):
+                reach[r][col] = field.get(idx)
+
+    cap_turns = [capture_turns(u['stats']['hp'], capture_rate) for u in capturers]
+
+    # Only keep columns someone can actually reach; keeps the solve at n x (reachable properties).
+    cols = [c for c in range(len(properties)) if any(reach[r][c] is not None for r in range(n))]
+    if not cols: return []
+
+    cost = []
+    for r in range(n):
+        ct = cap_turns[r]
+        cost.append([UNREACHABLE if reach[r][c] is None or ct is None else reach[r][c] + ct - 1 for c in cols])
+
+    if n <= len(cols):
+        pairs = list(enumerate(solve_assignment(cost)))
+    else:
+        transposed = [list(col) for col in zip(*cost)]
+        pairs = [(r, c) for c, r in enumerate(solve_assignment(transposed))]
+
+    plan = []
+    for r, c in pairs:
+        if c < 0 or cost[r][c] >= UNREACHABLE: continue
+        u = capturers[r]
+        px, py = properties[cols[c]]
+        cell = game_map[py][px]
+        plan.append({
+            "unit_id": u['id'],
+            "unit_type": u['type'],
+            "pos": [u['position']['x'], u['position']['y']],
+            "target": [px, py],
+            "property_type": cell.get('type'),
+            "current_owner": cell.get('player', -1),
+            "turns_to_reach": reach[r][cols[c]],
+            "capture_turns": cap_turns[r],
+            "total_turns": cost[r][c]
+        })
+    plan.sort(key=lambda a: a['total_turns'])
+    return plan
@@ -1,20 +1,139 @@
 import json
 import math
+import hashlib
+import threading
+from collections import OrderedDict
 
-try:
-    from ascii_renderer import render_ascii_map
-except ImportError:
-    def render_ascii_map(m, u): return "(ASCII Map Renderer Missing)"
+from parallel_reach import compute_reachability
 
 try:
-    from analyzer import GameAnalyzer
+    from ascii_renderer import render_terrain_rows, overlay_units
 except ImportError:
-    GameAnalyzer = None
+    render_terrain_rows = overlay_units = None
+
+def _load_json(source):
+    if isinstance(source, str):
+        with open(source) as f: return json.load(f)
+    return source
+
+# Most of the context is the same from one chat turn to the next, so it is built from named fragments, each
+# memoized on exactly what it depends on: nothing (fixed text), the players' metadata, the rules, the set of unit
+# types, or the map and its ownership (the ASCII terrain, which units are then drawn over).
+# Unit-dependent parts (unit positions, unit lists, analysis) are rendered every time.
+FRAGMENT_CACHE_SIZE = 64 # entries per fragment
+
+CRITICAL_RULES = "\n".join([
+    "CRITICAL RULES:",
+    "- CO Powers ONLY charge via combat damage dealt/taken. Do not suggest 'waiting' to charge.",
+    "- Sami's capture bonus (+50%) applies ONLY when capturing. Her infantry move normally otherwise.",
+    "- Bases produce ground units. Airports produce air units. Ports produce naval units.",
+    "- Distances are Manhattan (|x1-x2| + |y1-y2|). Units CANNOT move beyond their Move stat.",
+])
+
+MAP_LEGEND = "\n".join([
+    "## Tactical Map (ASCII)",
+    "Legend: (.)Plain (^)Mtn (T)Forest (~)Sea/River (=)Road (C)City (B)Base (A)Airport (P)Port (H)HQ",
+    "Owner Case: UPPER=Owned, lower=Neutral",
+])
+
+_fragments = {} # fragment name -> OrderedDict of key -> rendered text
+_fragment_stats = {} # fragment name -> [hits, misses]
+_fragment_lock = threading.Lock()
+
+def fragment(name, key, render):
+    """render() memoized per (name, key); the least recently used keys of each fragment are dropped."""
+    with _fragment_lock:
+        cache = _fragments.setdefault(name, OrderedDict())
+        stats = _fragment_stats.setdefault(name, [0, 0])
+        if key in cache:
+            cache.move_to_end(key)
+            stats[0] += 1
+            return cache[key]
+        stats[1] += 1
+    text = render()
+    with _fragment_lock:
+        cache[key] = text
+        while len(cache) > FRAGMENT_CACHE_SIZE: cache.popitem(last=False)
+    return text
+
+def fragment_stats():
+    with _fragment_lock:
+        return {name: {"hits": h, "misses": m, "entries": len(_fragments.get(name, ()))} for name, (h, m) in _fragment_stats.items()}
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(',', ':')).encode()).hexdigest()[:16]
 
-def generate_context(map_file, units_file, rules_file, teams_data=None, target_slot=None):
-    with open(map_file) as f: game_map = json.load(f)
-    with open(units_file) as f: units = json.load(f)
-    with open(rules_file) as f: rules = json.load(f)
+_rules_version = None # (rules object, digest)
+
+def rules_version(rules):
+    """Digest of the rules contents, computed once per rules object."""
+    global _rules_version
+    if _rules_version is None or _rules_version[0] is not rules:
+        _rules_version = (rules, _digest(rules))
+    return _rules_version[1]
+
+def _render_intro(target_slot, target_identity, slot_to_meta, current_turn):
+    lines = []
+    if target_slot is not None:
+        lines.append(f"SYSTEM: You are the Wars Oracle advising {target_identity}.")
+        lines.append("IMPORTANT: Focus on the PLAYER NAME (e.g. ridiculotron), not just the CO (e.g. Eagle), as duplicates exist.")
+        if slot_to_meta[target_slot]['status'] == "ELIMINATED":
+             lines.append("NOTE: This player is ELIMINATED. Advice should focus on observation or team support if applicable.")
+        elif target_identity.startswith(current_turn):
+            lines.append("It is YOUR turn. You can move and produce units now.")
+        else:
+            funds = slot_to_meta[target_slot]['funds']
+            lines.append(f"It is NOT your turn. You have {funds}G stored.")
+            lines.append(f"Current turn: {current_turn}.")
+    else:
+        lines.append(f"SYSTEM: You are the Wars Oracle. Analyze this game state. Current Turn: {current_turn}")
+    return "\n".join(lines)
+
+def _render_team_status(teams_data, target_slot):
+    lines = ["## Team Status"]
+    eliminated_players = []
+    
+    for team_name, team_data in teams_data["teams"].items():
+        lines.append(f"### Team {team_name}")
+        for p in team_data["players"]:
+            if p.get("eliminated"):
+                eliminated_players.append(f"{p['username']} ({p['co']})")
+                continue
+                
+            turn_marker = "◀ CURRENT TURN" if p.get("is_turn") else ""
+            marker = "⭐ YOU" if p["slot"] == target_slot else ""
+            stats = p.get("live_stats", {})
+            val = stats.get("unit_value", 0)
+            
+            power = {"cop": ", CO Power active", "scop": ", Super CO Power active"}.get(p.get("co_power"), "")
+            lines.append(f"- {p['username']} ({p['co']}{power}): Funds {p.get('funds',0)}G | Income {p.get('income',0)}G | Value {val} {marker} {turn_marker}")
+    
+    if eliminated_players:
+        lines.append("")
+        lines.append(f"Graveyard (Eliminated): {', '.join(eliminated_players)}")
+    return "\n".join(lines)
+
+def _render_unit_stats(rules, active_unit_types):
+    lines = ["## Relevant Unit Stats (Reference)"]
+    for u in sorted(active_unit_types):
+        stats = rules.get("units", {}).get(u)
+        if stats:
+            lines.append(f"- {u}: Cost {stats['cost']}G | Move {stats['move']} ({stats['type']}) | Range {stats['range']}")
+    return "\n".join(lines)
+
+def render_map(game_map, units_by_player, map_id, ownership):
+    if render_terrain_rows is None: return "(ASCII Map Renderer Missing)"
+    if map_id is None:
+        terrain = render_terrain_rows(game_map)
+    else:
+        terrain = fragment("terrain", (map_id, _digest(ownership)), lambda: render_terrain_rows(game_map))
+    return overlay_units(terrain, units_by_player)
+
+def generate_context(map_file, units_file, rules_file, teams_data=None, target_slot=None, map_id=None, analyzer=None, analysis=None):
+    # Each source may be a JSON file path or the already-loaded object
+    game_map = _load_json(map_file)
+    units = _load_json(units_file)
+    rules = _load_json(rules_file)
     
     if isinstance(teams_data, str):
         try:
@@ -49,54 +168,17 @@ def generate_context(map_file, units_file, rules_file, teams_data=None, target_s
     width = len(game_map[0])
     current_turn = teams_data.get('current_turn_username', 'Unknown')
     
+    # Everything the intro and team status read from the metadata (ownership isn't, and it is the bulky part)
+    meta_key = (_digest([teams_data.get('game_id'), teams_data["teams"], current_turn]), target_slot)
+
     context = []
-    if target_slot is not None:
-        context.append(f"SYSTEM: You are the Wars Oracle advising {target_identity}.")
-        context.append("IMPORTANT: Focus on the PLAYER NAME (e.g. ridiculotron), not just the CO (e.g. Eagle), as duplicates exist.")
-        if slot_to_meta[target_slot]['status'] == "ELIMINATED":
-             context.append("NOTE: This player is ELIMINATED. Advice should focus on observation or team support if applicable.")
-        elif target_identity.startswith(current_turn):
-            context.append("It is YOUR turn. You can move and produce units now.")
-        else:
-            funds = slot_to_meta[target_slot]['funds']
-            context.append(f"It is NOT your turn. You have {funds}G stored.")
-            context.append(f"Current turn: {current_turn}.")
-    else:
-        context.append(f"SYSTEM: You are the Wars Oracle. Analyze this game state. Current Turn: {current_turn}")
-    
-    context.append("CRITICAL RULES:")
-    context.append("- CO Powers ONLY charge via combat damage dealt/taken. Do not suggest 'waiting' to charge.")
-    context.append("- Sami's capture bonus (+50%) applies ONLY when capturing. Her infantry move normally otherwise.")
-    context.append("- Bases produce ground units. Airports produce air units. Ports produce naval units.")
-    context.append("- Distances are Manhattan (|x1-x2| + |y1-y2|). Units CANNOT move beyond their Move stat.")
-    
+    context.append(fragment("intro", meta_key, lambda: _render_intro(target_slot, target_identity, slot_to_meta, current_turn)))
+    context.append(CRITICAL_RULES)
     context.append("")
     context.append(f"# Game Context (ID: {teams_data.get('game_id', '?')})")
     context.append(f"Map Size: {width}x{height} | Current Turn: {current_turn}")
     context.append("")
-
-    context.append("## Team Status")
-    
-    eliminated_players = []
-    
-    for team_name, team_data in teams_data["teams"].items():
-        context.append(f"### Team {team_name}")
-        for p in team_data["players"]:
-            if p.get("eliminated"):
-                eliminated_players.append(f"{p['username']} ({p['co']})")
-                continue
-                
-            turn_marker = "◀ CURRENT TURN" if p.get("is_turn") else ""
-            marker = "⭐ YOU" if p["slot"] == target_slot else ""
-            stats = p.get("live_stats", {})
-            val = stats.get("unit_value", 0)
-            
-            context.append(f"- {p['username']} ({p['co']}): Funds {p.get('funds',0)}G | Income {p.get('income',0)}G | Value {val} {marker} {turn_marker}")
-    
-    if eliminated_players:
-        context.append("")
-        context.append(f"Graveyard (Eliminated): {', '.join(eliminated_players)}")
-        
+    context.append(fragment("team_status", meta_key, lambda: _render_team_status(teams_data, target_slot)))
     context.append("")
     
     units_by_player = {}
@@ -122,11 +204,9 @@ def generate_context(map_file, units_file, rules_file, teams_data=None, target_s
         units_by_player[u_slot].append(u)
         active_unit_types.add(u['type'])
 
-    context.append("## Tactical Map (ASCII)")
-    context.append("Legend: (.)Plain (^)Mtn (T)Forest (~)Sea/River (=)Road (C)City (B)Base (A)Airport (P)Port (H)HQ")
-    context.append("Owner Case: UPPER=Owned, lower=Neutral")
+    context.append(MAP_LEGEND)
     context.append("```")
-    context.append(render_ascii_map(game_map, units_by_player))
+    context.append(render_map(game_map, units_by_player, map_id, teams_data.get('ownership', {})))
     context.append("```")
     context.append("")
     
@@ -143,11 +223,8 @@ def generate_context(map_file, units_file, rules_file, teams_data=None, target_s
             context.append(f"- {utype} @ ({x},{y}) HP:{hp}")
         context.append("")
 
-    context.append("## Relevant Unit Stats (Reference)")
-    for u in active_unit_types:
-        stats = rules.get("units", {}).get(u)
-        if stats:
-            context.append(f"- {u}: Cost {stats['cost']}G | Move {stats['move']} ({stats['type']}) | Range {stats['range']}")
+    types_key = frozenset(active_unit_types)
+    context.append(fragment("unit_stats", (rules_version(rules), types_key), lambda: _render_unit_stats(rules, types_key)))
 
     # --- TACTICAL ANALYSIS (Pre-computed Valid Moves) ---
     if target_slot is not None and target_slot in units_by_player:
@@ -155,10 +232,18 @@ def generate_context(map_file, units_file, rules_file, teams_data=None, target_s
         context.append("## Valid Moves & Threats (Engine Verified)")
         context.append("Use this data to avoid hallucinating impossible moves.")
         
-        # New Analyzer Integration
-        if GameAnalyzer:
-            analyzer = GameAnalyzer(map_file, units_file, rules_file, teams_data)
+        # New Analyzer Integration (imported here so building a context without a target stays light)
+        # A caller that already has an analyzer for this snapshot can pass it in to share its caches, or the
+        # get_full_analysis it already computed for target_slot, so the context describes that very analysis
+        if analysis is None and analyzer is None:
+            try:
+                from analyzer import GameAnalyzer
+                analyzer = GameAnalyzer(game_map, units, rules, teams_data, map_id=map_id)
+            except ImportError:
+                analyzer = None
+        if analysis is None and analyzer:
             analysis = analyzer.get_full_analysis(target_slot)
+        if analysis is not None:
             
             # --- Strategic Summary ---
             context.append("### Strategic Summary")
@@ -178,13 +263,83 @@ def generate_context(map_file, units_file, rules_file, teams_data=None, target_s
                 status = "AHEAD" if diff > 5000 else "BEHIND" if diff < -5000 else "EVEN"
                 context.append(f"- Material Status: {status} ({diff:+} value)")
             
+            influence = analysis.get('influence') or {}
+            control = influence.get('control')
+            if control:
+                context.append(f"- Board Control: You {control['mine']:.0%} | Enemy {control['enemy']:.0%} | Contested {control['contested']:.0%}")
+            front = influence.get('frontline')
+            if front:
+                context.append(f"- Frontline: around {tuple(front['center'])}, x {front['x_range'][0]}-{front['x_range'][1]}, y {front['y_range'][0]}-{front['y_range'][1]}")
+            contested = influence.get('contested_properties', [])
+            if contested:
+                listed = ", ".join(f"{c['property_type']}@({c['pos'][0]},{c['pos'][1]}) {c['margin']:+.2f}" for c in contested[:5])
+                context.append(f"- Contested Properties (control margin, - = enemy): {listed}")
+
             # Threats High Level
+            from analyzer import is_high_threat
             threats = analysis.get('threats', [])
-            high_risk = [t for t in threats if t['damage_pct'] > 50]
+            high_risk = [t for t in threats if is_high_threat(t)]
             if high_risk:
                  context.append(f"- IMMEDIATE DANGER: {len(high_risk)} units at high risk.")
+            at_risk = [r for r in analysis.get('kill_risk', []) if r['kill_probability'] > 0]
+            if at_risk:
+                listed = ", ".join(f"{r['victim']['type']}@({r['victim']['pos'][0]},{r['victim']['pos'][1]}) {r['kill_probability']:.0%} ({len(r['attackers'])} attackers)" for r in at_risk[:5])
+                context.append(f"- Kill Risk (all attackers focus, luck included): {listed}")
+            dropped = [t for t in threats if t.get('via_transport')]
+            if dropped:
+                listed = ", ".join(f"{t['attacker']['type']} via {t['via_transport']['type']} -> {t['victim']['type']}@({t['victim']['pos'][0]},{t['victim']['pos'][1]})" for t in dropped[:5])
+                context.append(f"- Transport Drops (enemy can strike next turn): {listed}")
+            built = [t for t in threats if t.get('via_production')]
+            if built:
+                listed = ", ".join(f"{t['attacker']['type']} from {t['via_production']['facility']}@({t['attacker']['pos'][0]},{t['attacker']['pos'][1]}) -> {t['victim']['type']}@({t['victim']['pos'][0]},{t['victim']['pos'][1]}) {t['damage_pct']}%" + (" (only threat)" if t['via_production']['only_threat'] else "") for t in built[:5])
+                context.append(f"- Production Threats (units the enemy can build now, striking next turn): {listed}")
             
             context.append("")
+
+            # --- Best Attacks (counter-attacks included) ---
+            attack_options = analysis.get('attack_options', [])
+            if attack_options:
+                context.append("### Best Attacks (Value Traded, Counters Included)")
+                for o in attack_options:
+                    fx, fy = o['from']
+                    vx, vy = o['victim']['pos']
+                    kill = " KILL" if o['kills'] else ""
+                    context.append(f"- {o['attacker']['type']} from ({fx},{fy}) hits {o['victim']['type']}@({vx},{vy}): deals {o['damage_pct']}%{kill}, takes {o['counter_pct']}% back ({o['value']:+}G)")
+                context.append("")
+
+            # --- Focus Fire (ordered attack plan) ---
+            focus_fire = analysis.get('focus_fire') or {}
+            if focus_fire.get('steps'):
+                context.append(f"### Focus Fire Plan (Attack In This Order, {len(focus_fire['kills'])} Kills)")
+                for i, step in enumerate(focus_fire['steps'], 1):
+                    fx, fy = step['from']
+                    vx, vy = step['victim']['pos']
+                    kill = " KILL" if step['kills'] else ""
+                    context.append(f"{i}. {step['attacker']['type']} @ {tuple(step['attacker']['pos'])} from ({fx},{fy}) hits {step['victim']['type']}@({vx},{vy}) for {step['damage_pct']}%{kill}")
+                context.append("")
+
+            # --- Build Options (economy forecast) ---
+            forecast = analysis.get('forecast') or {}
+            if forecast.get('build_options'):
+                context.append(f"### Build Options (Scored Over {forecast['turns']} Turns)")
+                for o in forecast['build_options'][:3]:
+                    units = " + ".join(o['first_turn']) or "nothing (save)"
+                    follow = "repeat each turn" if o['repeats'] else "then save"
+                    context.append(f"- {units}, {follow}: score {o['score']}, {o['funds_end']}G left, army value {o['army_value_end']}G")
+                mine = forecast['players'].get(target_slot) or forecast['players'].get(str(target_slot))
+                if mine:
+                    context.append(f"- Without building: {mine[-1]['funds']}G by turn {mine[-1]['turn']} (income {mine[-1]['income']}G/turn)")
+                context.append("")
+
+            # --- Capture Plan (one distinct property per capturer) ---
+            capture_plan = analysis.get('capture_plan', [])
+            if capture_plan:
+                context.append("### Capture Plan (Assigned Targets)")
+                for a in capture_plan:
+                    ux, uy = a['pos']
+                    px, py = a['target']
+                    context.append(f"- {a['unit_type']} @ ({ux},{uy}) -> {a['property_type']} @ ({px},{py}): reach in {a['turns_to_reach']} turn(s), captured after {a['total_turns']}")
+                context.append("")
             
             # --- Unit Specifics ---
             # We can reuse the loop but now use Analyzer's data structure if we wanted,
@@ -194,18 +349,23 @@ def generate_context(map_file, units_file, rules_file, teams_data=None, target_s
         # ... (keep existing per-unit loop for valid moves) ...
         my_units = units_by_player[target_slot]
 
+        # All searches go out as one batch (parallel on big boards)
+        # We treat ENEMY units as blocking (cannot pass through)
+        reach_jobs = []
+        for u in my_units:
+            u_stats = rules.get("units", {}).get(u['type'], {})
+            reach_jobs.append((u['id'], u['position']['x'], u['position']['y'], u_stats.get('move', 3), u_stats.get('type', 'foot'), enemy_blocking_pos))
+        reach_by_unit = compute_reachability(reach_jobs, game_map, width, height)
+
         for u in my_units:
             utype = u['type']
             start_x, start_y = u['position']['x'], u['position']['y']
             u_stats = rules.get("units", {}).get(utype, {})
-            move_pts = u_stats.get('move', 3)
-            move_type = u_stats.get('type', 'foot')
             min_rng, max_rng = u_stats.get('range', [1,1])
             
-            # Calculate Reachable Cells
-            # We treat ENEMY units as blocking (cannot pass through)
+            # Reachable Cells (from the batch above)
             # We treat ALL units as blocking destination (cannot end on top)
-            reachable = get_reachable_cells(start_x, start_y, move_pts, move_type, game_map, width, height, blocking_cells=enemy_blocking_pos)
+            reachable = reach_by_unit[u['id']]
             
             # Filter destinations: Cannot end on ANY unit (unless it's the unit itself)
             valid_destinations = [
@@ -0,0 +1,167 @@
+import math
+
+from luck import LUCK_MAX, damage_pmf
+
+# Every CO power (COP or SCOP) gives +10% attack and defense on top of its own effects
+POWER_BONUS = 10
+POWERS = ["d2d", "cop", "scop"]
+
+# Unit class -> the co_stats d2d key that overrides attack for that class
+CLASS_ATTACK_KEYS = {"foot": "infantry_attack", "air": "air_attack", "naval": "naval_attack"}
+CLASS_DEFENSE_KEYS = {"foot": "infantry_defense", "air": "air_defense", "naval": "naval_defense"}
+
+def unit_class(unit_type, u_stats):
+    if unit_type in ("infantry", "mech"): return "foot"
+    move_type = u_stats.get('type', 'ground')
+    if move_type == "air": return "air"
+    if move_type in ("ship", "transport"): return "naval"
+    return "ground"
+
+def co_modifiers(co, power, units):
+    """
+    Attack and defense percentages (100 = neutral) per unit type for one CO in one power state.
+    Returns (attack, defense, defense_vs_indirect), each unit type -> percent.
+    The most specific d2d key wins: unit class (infantry/air/naval), then direct/indirect, then the general value.
+    """
+    d2d = co.get("d2d", {}) if co else {}
+    active = co.get(power, {}) if co and power != "d2d" else {}
+    atk_bonus = active.get("attack_bonus", POWER_BONUS) if power != "d2d" else 0
+    def_bonus = active.get("defense_bonus", POWER_BONUS) if power != "d2d" else 0
+
+    attack, defense, defense_vs_indirect = {}, {}, {}
+    for t, s in units.items():
+        cls = unit_class(t, s)
+        direct = s.get('range', [1, 1])[1] <= 1
+        atk = d2d.get("attack", 100)
+        atk = d2d.get("direct_attack" if direct else "indirect_attack", atk)
+        atk = d2d.get(CLASS_ATTACK_KEYS.get(cls), atk)
+        dfn = d2d.get(CLASS_DEFENSE_KEYS.get(cls), d2d.get("defense", 100))
+        attack[t] = atk + atk_bonus
+        defense[t] = dfn + def_bonus
+        defense_vs_indirect[t] = d2d.get("defense_vs_indirect", dfn) + def_bonus
+    return attack, defense, defense_vs_indirect
+
+_compiled = None # (rules object, {(co name, power): modifiers})
+
+def compile_co_tables(rules):
+    """Modifiers for every CO and power in rules.json, compiled once per rules object."""
+    global _compiled
+    if _compiled is None or _compiled[0] is not rules:
+        units = rules.get("units", {})
+        tables = {
+            (name, power): co_modifiers(co, power, units)
+            for name, co in rules.get("co_stats", {}).items() for power in POWERS
+        }
+        _compiled = (rules, tables)
+    return _compiled[1]
+
+class DamageTable:
+    """
+    calculate_damage with every rules lookup done once up front.
+    The matchup, terrain-defense and air-unit lookups become flat dict reads keyed by plain strings,
+    and the arithmetic matches calculate_damage step for step so results are identical.
+
+    CO modifiers: co_powers maps player slot -> (CO name, power state). For each (attacker slot, defender slot)
+    pair the CO attack and defense modifiers are folded into one matchup matrix (base * atk/100 * (200-def)/100),
+    so damage() stays a table lookup. Without slots (or for unknown COs) the plain matchups are used.
+
+    Luck: damage_distribution() gives the probability of every damage outcome over the luck roll. The roll is added
+    after the CO attack modifier, so only the defender's modifier scales it. Distributions are cached per
+    (matchup, attacker displayed HP, terrain) and shared across requests on the same table.
+    """
+    def __init__(self, rules, co_powers=None):
+        self.rules = rules
+        units = rules.get("units", {})
+        self.base = {a: dict(row) for a, row in rules.get("matchups", {}).items()}
+        self.cost = {t: s.get('cost', 0) for t, s in units.items()}
+        self.range = {t: s.get('range', [1, 1]) for t, s in units.items()}
+        self.terrain_stars = dict(rules.get("terrain_defense", {}))
+        self.is_air = {t: s.get('type', 'ground') == 'air' for t, s in units.items()}
+        self._defense = {} # (defender_type, terrain_type) -> defense factor
+
+        co_tables = compile_co_tables(rules)
+        self.co_powers = dict(co_powers or {})
+        self._slot_modifiers = {slot: co_tables.get(tuple(state)) for slot, state in self.co_powers.items()}
+        self._pairs = {(None, None): self.base} # (attacker slot, defender slot) -> matchup matrix
+        self._by_modifiers = {} # (id of attacker modifiers, id of defender modifiers) -> matrix, shared by equal COs
+        co_stats = rules.get("co_stats", {})
+        self._luck_max = {
+            slot: co_stats.get(state[0], {}).get("d2d", {}).get("luck_max", LUCK_MAX) for slot, state in self.co_powers.items()
+        }
+        self._distributions = {} # (types, displayed hp, terrain, slots) -> pmf
+
+    def matchups(self, attacker_slot=None, defender_slot=None):
+        """The CO-adjusted matchup matrix for one pair of slots, compiled on first use."""
+        key = (attacker_slot, defender_slot)
+        matrix = self._pairs.get(key)
+        if matrix is None:
+            a_mod = self._slot_modifiers.get(attacker_slot)
+            d_mod = self._slot_modifiers.get(defender_slot)
+            mkey = (id(a_mod), id(d_mod))
+            matrix = self._by_modifiers.get(mkey)
+            if matrix is None:
+                matrix = self._compile_pair(a_mod, d_mod)
+                self._by_modifiers[mkey] = matrix
+            self._pairs[key] = matrix
+        return matrix
+
+    def _compile_pair(self, a_mod, d_mod):
+        if a_mod is None and d_mod is None: return self.base
+        matrix = {}
+        for a, row in self.base.items():
+            atk = a_mod[0].get(a, 100) if a_mod else 100
+            indirect = self.range.get(a, [1, 1])[1] > 1
+            out = {}
+            for d, base_dmg in row.items():
+                dfn = (d_mod[2] if indirect else d_mod[1]).get(d, 100) if d_mod else 100
+                out[d] = base_dmg * atk / 100 * (200 - dfn) / 100
+            matrix[a] = out
+        return matrix
+
+    def defense_factor(self, defender_type, terrain_type):
+        key = (defender_type, terrain_type)
+        factor = self._defense.get(key)
+        if factor is None:
+            stars = 0 if self.is_air.get(defender_type) else self.terrain_stars.get(terrain_type, 0)
+            factor = (100 - (stars * 10)) / 100.0
+            self._defense[key] = factor
+        return factor
+
+    def damage(self, attacker_type, defender_type, attacker_hp, terrain_type, attacker_slot=None, defender_slot=None):
+        """
+        Same result as calculate_damage (plus CO modifiers when slots are given);
+        terrain_type is already normalised via get_terrain_type.
+        """
+        base_dmg = self.matchups(attacker_slot, defender_slot).get(attacker_type, {}).get(defender_type, 0)
+        if base_dmg == 0: return 0
+        a_hp = attacker_hp if attacker_hp <= 10 else attacker_hp / 10
+        attack_power = base_dmg * math.ceil(a_hp) / 10.0
+        return round(attack_power * self.defense_factor(defender_type, terrain_type), 1)
+
+    def luck_scale(self, attacker_type, defender_type, defender_slot=None):
+        """The defender's CO defense multiplier, (200 - def) / 100, which is all that scales the luck roll."""
+        d_mod = self._slot_modifiers.get(defender_slot)
+        if d_mod is None: return 1.0
+        indirect = self.range.get(attacker_type, [1, 1])[1] > 1
+        return (200 - (d_mod[2] if indirect else d_mod[1]).get(defender_type, 100)) / 100
+
+    def damage_distribution(self, attacker_type, defender_type, attacker_hp, terrain_type, attacker_slot=None, defender_slot=None):
+        """
+        Probability of each damage outcome (list index = HP points removed, 0-100) over the attacker's luck roll.
+        The no-luck end of the distribution is damage() truncated to whole points.
+        """
+        a_hp = math.ceil(attacker_hp if attacker_hp <= 10 else attacker_hp / 10)
+        key = (attacker_type, defender_type, a_hp, terrain_type, attacker_slot, defender_slot)
+        pmf = self._distributions.get(key)
+        if pmf is None:
+            base_dmg = self.matchups(attacker_slot, defender_slot).get(attacker_type, {}).get(defender_type, 0)
+            pmf = damage_pmf(
+                base_dmg, self.luck_scale(attacker_type, defender_type, defender_slot), a_hp,
+                self.defense_factor(defender_type, terrain_type), self._luck_max.get(attacker_slot, LUCK_MAX)
+            )
+            self._distributions[key] = pmf
+        return pmf
+
+    def can_counter(self, defender_type, attacker_type):
+        """Only direct units counter, and only if they can damage the attacker at all."""
+        return self.range.get(defender_type, [1, 1])[1] == 1 and self.base.get(defender_type, {}).get(attacker_type, 0) > 0
@@ -0,0 +1,369 @@
+"""
+Differential check of the optimized analysis engines against reference_engine.py on random boards.
+
+Every case is a random map (all terrain types, owned and neutral properties), random units, perturbed rules
+(matchups, moves, ranges, terrain defense) and random teams. Each engine's output is compared with the reference's
+as a multiset of canonical JSON entries, so ordering differences between equal entries don't count.
+
+Engines:
+    reach        game_logic.get_reachable_cells
+    reach_grid   parallel_reach.reachable_on_grid over a compiled cost grid
+    reach_batch  parallel_reach.compute_reachability (serial)
+    damage       DamageTable.damage (no CO modifiers)
+    threats      GameAnalyzer.analyze_threats, immediate threats only, luck fields ignored
+    threats_batch  the same after prefetch_reachability, as get_full_analysis runs it
+    captures     GameAnalyzer.analyze_captures, properties reachable this turn without a transport
+    capture_turns  GameAnalyzer.get_distance_fields, turns from each capturer to each property (turns_to_reach > 1)
+    capture_plan   GameAnalyzer.plan_captures, compared by capturers assigned and total turns (ties between equally
+                   good plans may pick different properties) and checked for distinct units and targets
+
+The timing columns compare whole calls. The analyzer's threats also compute luck distributions, ferried and
+production threats, and its captures look at transport drops; the reference does none of that, and on boards this
+small its pathfinding shortcuts barely pay. So threats and captures show below 1x here: that is extra output, not a
+slower engine. threats_batch also pays for prefetch_reachability covering every unit and mode, which
+get_full_analysis shares between sections. Use --min-size/--max-size for larger boards.
+
+A mismatch is shrunk (units removed, map cropped, tiles flattened to plain) while it still fails, written to
+--out-dir and the run exits 1. Case i of seed s is always the same board, so --seed and --only reproduce a run;
+--replay re-checks a written case.
+
+Usage:
+    python api/differential.py [--cases 200] [--seed 0] [--engines threats,captures] [--out-dir differential-failures]
+    python api/differential.py --replay differential-failures/threats-0-17.json
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+
+import reference_engine as ref
+from game_logic import get_reachable_cells, get_terrain_type, compile_cost_grid
+from parallel_reach import reachable_on_grid, compute_reachability
+from damage_table import DamageTable
+from analyzer import GameAnalyzer
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+TERRAIN = ["plain"] * 8 + ["road"] * 3 + ["forest", "wood", "mountain", "river", "sea", "sea", "beach", "shoal", "reef",
+           "bridge", "pipe"]
+PROPERTIES = ["city", "base", "airport", "port", "hq", "lab", "comTower"]
+MIN_SIZE = 3
+MAX_SIZE = 18
+MAX_UNITS = 50
+# Predicate evaluations spent shrinking one failure
+SHRINK_BUDGET = 400
+
+# Random cases
+
+def random_rules(rng, base_rules):
+    """The real unit roster with perturbed numbers. No co_stats, so every CO is neutral."""
+    units = {}
+    for t, s in base_rules['units'].items():
+        s = dict(s)
+        s['move'] = max(0, s['move'] + rng.randint(-2, 2))
+        if s['range'][1] > 1 or rng.random() < 0.1:
+            lo = rng.randint(1, 3)
+            s['range'] = [lo, lo + rng.randint(0, 4)]
+        units[t] = s
+    matchups = {}
+    for a, row in base_rules['matchups'].items():
+        matchups[a] = {d: (0 if rng.random() < 0.1 else max(0, v + rng.randint(-30, 30))) for d, v in row.items()}
+    terrain = {t: rng.randint(0, 4) for t in base_rules['terrain_defense']}
+    if rng.random() < 0.5: terrain['wood'] = rng.randint(0, 4)
+    return {"units": units, "terrain_defense": terrain, "matchups": matchups}
+
+def random_case(seed, index, base_rules, min_size=MIN_SIZE, max_size=MAX_SIZE):
+    rng = random.Random(f"{seed}:{index}")
+    width, height = rng.randint(min_size, max_size), rng.randint(min_size, max_size)
+    n_players = rng.randint(2, 4)
+    slots = list(range(n_players))
+
+    game_map = []
+    for _ in range(height):
+        row = []
+        for _ in range(width):
+            if rng.random() < 0.15:
+                cell = {"type": rng.choice(PROPERTIES)}
+                if rng.random() < 0.6: cell['player'] = rng.choice(slots)
+            else:
+                cell = {"type": rng.choice(TERRAIN)}
+            row.append(cell)
+        game_map.append(row)
+
+    # Teams: usually one per player, sometimes allies, sometimes no metadata at all
+    metadata = {}
+    if rng.random() < 0.9:
+        teams = {}
+        for slot in slots:
+            team = f"team{rng.randint(0, n_players - 1) if rng.random() < 0.3 else slot}"
+            teams.setdefault(team, {"players": []})['players'].append(
+                {"id": slot, "username": f"player{slot}", "co": "Neutral", "slot": slot, "funds": 0, "income": 0})
+        metadata = {"teams": teams}
+
+    types = list(base_rules['units'])
+    cells = [(x, y) for y in range(height) for x in range(width)]
+    rng.shuffle(cells)
+    units = []
+    for i, (x, y) in enumerate(cells[:rng.randint(1, min(MAX_UNITS, len(cells) // 2 + 1))]):
+        units.append({"id": 1000 + i, "type": rng.choice(types), "playerSlot": rng.choice(slots),
+                      "position": {"x": x, "y": y}, "stats": {"hp": rng.randint(1, 100)}})
+    return {"map": game_map, "units": units, "rules": random_rules(rng, base_rules), "metadata": metadata,
+            "seed": f"{seed}:{index}"}
+
+# Engines: name -> (reference, optimized), each taking a case and returning canonical output
+
+def _canonical(entries):
+    return sorted(json.dumps(e, sort_keys=True) for e in entries)
+
+def _size(case):
+    return len(case['map'][0]), len(case['map'])
+
+def _reach_jobs(case):
+    """One search per unit, half of them with every other unit blocking (threat mode), half with none."""
+    rules = case['rules']['units']
+    every = {(u['position']['x'], u['position']['y']) for u in case['units']}
+    jobs = []
+    for i, u in enumerate(case['units']):
+        s = rules.get(u['type'], {})
+        blocking = every - {(u['position']['x'], u['position']['y'])} if i % 2 else set()
+        jobs.append((u['id'], u['position']['x'], u['position']['y'], s.get('move', 3), s.get('type', 'foot'), blocking))
+    return jobs
+
+def _reach_output(results):
+    return _canonical([[key, sorted(cells)] for key, cells in results])
+
+def reach_reference(case):
+    w, h = _size(case)
+    return _reach_output((k, ref.get_reachable_cells(x, y, mp, m, case['map'], w, h, b)) for k, x, y, mp, m, b in _reach_jobs(case))
+
+def reach_new(case):
+    w, h = _size(case)
+    return _reach_output((k, get_reachable_cells(x, y, mp, m, case['map'], w, h, b)) for k, x, y, mp, m, b in _reach_jobs(case))
+
+def reach_grid_new(case):
+    w, h = _size(case)
+    grids = {}
+    out = []
+    for k, x, y, mp, m, b in _reach_jobs(case):
+        if m not in grids: grids[m] = compile_cost_grid(case['map'], m, w, h)
+        out.append((k, reachable_on_grid(x, y, mp, grids[m], w, h, {by * w + bx for bx, by in b})))
+    return _reach_output(out)
+
+def reach_batch_new(case):
+    w, h = _size(case)
+    return _reach_output(compute_reachability(_reach_jobs(case), case['map'], w, h, workers=0).items())
+
+def _damage_pairs(case):
+    """Every unit against every other unit, standing on its own tile."""
+    for a in case['units']:
+        for d in case['units']:
+            if a is not d: yield a, d, case['map'][d['position']['y']][d['position']['x']]
+
+def damage_reference(case):
+    return _canonical([a['id'], d['id'], ref.calculate_damage(a['type'], d['type'], a['stats']['hp'], d['stats']['hp'], cell, case['rules'])]
+                      for a, d, cell in _damage_pairs(case))
+
+def damage_new(case):
+    table = DamageTable(case['rules'], {s: ("Neutral", "d2d") for s in _slots(case)})
+    return _canonical([a['id'], d['id'], table.damage(a['type'], d['type'], a['stats']['hp'], get_terrain_type(cell), a['playerSlot'], d['playerSlot'])]
+                      for a, d, cell in _damage_pairs(case))
+
+def _slots(case):
+    return sorted({u['playerSlot'] for u in case['units']})
+
+def _analyzer(case):
+    return GameAnalyzer(case['map'], case['units'], case['rules'], case['metadata'] or None)
+
+def threats_reference(case):
+    return {slot: _canonical(ref.analyze_threats(case['map'], case['units'], case['rules'], case['metadata'], slot)) for slot in _slots(case)}
+
+def _threat_projection(threats):
+    return _canonical({k: t[k] for k in ("attacker", "victim", "damage_pct")} for t in threats if not t.get('next_turn'))
+
+def threats_new(case):
+    analyzer = _analyzer(case)
+    return {slot: _threat_projection(analyzer.analyze_threats(slot)) for slot in _slots(case)}
+
+def threats_batch_new(case):
+    out = {}
+    for slot in _slots(case):
+        # A fresh analyzer per slot, as the API builds one per request
+        analyzer = _analyzer(case)
+        analyzer.prefetch_reachability(slot)
+        out[slot] = _threat_projection(analyzer.analyze_threats(slot))
+    return out
+
+def captures_reference(case):
+    return {slot: _canonical(ref.analyze_captures(case['map'], case['units'], case['rules'], case['metadata'], slot)) for slot in _slots(case)}
+
+def captures_new(case):
+    analyzer = _analyzer(case)
+    return {slot: _canonical(c for c in analyzer.analyze_captures(slot, max_turns=1) if c['turns_to_reach'] == 1 and 'via_transport' not in c)
+            for slot in _slots(case)}
+
+def capture_turns_reference(case):
+    return {slot: _canonical([uid, list(p), t] for (uid, p), t in
+                             ref.capture_turns_to_reach(case['map'], case['units'], case['rules'], case['metadata'], slot).items())
+            for slot in _slots(case)}
+
+def capture_turns_new(case):
+    analyzer = _analyzer(case)
+    out = {}
+    for slot in _slots(case):
+        fields = analyzer.get_distance_fields(slot)
+        out[slot] = _canonical([u['id'], list(p), t] for u in analyzer.units_by_slot.get(slot, []) if u['type'] in ['infantry', 'mech']
+                               for p, t in fields.reachable_properties(u['type'], u['position']['x'], u['position']['y']))
+    return out
+
+def capture_plan_reference(case):
+    out = {}
+    for slot in _slots(case):
+        assigned, total = ref.best_capture_assignment(case['map'], case['units'], case['rules'], case['metadata'], slot)
+        out[slot] = {"assigned": assigned, "total_turns": total, "distinct": True}
+    return out
+
+def capture_plan_new(case):
+    analyzer = _analyzer(case)
+    out = {}
+    for slot in _slots(case):
+        plan = analyzer.plan_captures(slot)
+        distinct = len({a['unit_id'] for a in plan}) == len({tuple(a['target']) for a in plan}) == len(plan)
+        out[slot] = {"assigned": len(plan), "total_turns": sum(a['total_turns'] for a in plan), "distinct": distinct}
+    return out
+
+ENGINES = {
+    "reach": (reach_reference, reach_new),
+    "reach_grid": (reach_reference, reach_grid_new),
+    "reach_batch": (reach_reference, reach_batch_new),
+    "damage": (damage_reference, damage_new),
+    "threats": (threats_reference, threats_new),
+    "threats_batch": (threats_reference, threats_batch_new),
+    "captures": (captures_reference, captures_new),
+    "capture_turns": (capture_turns_reference, capture_turns_new),
+    "capture_plan": (capture_plan_reference, capture_plan_new),
+}
+
+def _run(fn, case):
+    try:
+        return fn(case)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+def check(engine, case):
+    """(reference output, new output, reference seconds, new seconds)."""
+    reference, new = ENGINES[engine]
+    start = time.perf_counter()
+    expected = _run(reference, case)
+    mid = time.perf_counter()
+    got = _run(new, case)
+    return expected, got, mid - start, time.perf_counter() - mid
+
+def fails(engine, case):
+    expected, got, _, _ = check(engine, case)
+    return expected != got
+
+# Shrinking
+
+def _crop(case, x0, y0, x1, y1):
+    out = dict(case)
+    out['map'] = [row[x0:x1] for row in case['map'][y0:y1]]
+    out['units'] = []
+    for u in case['units']:
+        x, y = u['position']['x'], u['position']['y']
+        if x0 <= x < x1 and y0 <= y < y1:
+            u = copy.deepcopy(u)
+            u['position'] = {"x": x - x0, "y": y - y0}
+            out['units'].append(u)
+    return out
+
+def _candidates(case):
+    """Smaller variants of case, biggest cuts first."""
+    w, h = _size(case)
+    if w > 1: yield _crop(case, 0, 0, w - 1, h); yield _crop(case, 1, 0, w, h)
+    if h > 1: yield _crop(case, 0, 0, w, h - 1); yield _crop(case, 0, 1, w, h)
+    for i in range(len(case['units'])):
+        yield dict(case, units=case['units'][:i] + case['units'][i + 1:])
+    for y, row in enumerate(case['map']):
+        for x, cell in enumerate(row):
+            if cell != {"type": "plain"}:
+                game_map = [list(r) for r in case['map']]
+                game_map[y][x] = {"type": "plain"}
+                yield dict(case, map=game_map)
+
+def shrink(engine, case, budget=SHRINK_BUDGET):
+    """Greedy: keep taking the first smaller variant that still fails until none does (or the budget runs out)."""
+    progress = True
+    while progress and budget > 0:
+        progress = False
+        for candidate in _candidates(case):
+            budget -= 1
+            if candidate['units'] and fails(engine, candidate):
+                case, progress = candidate, True
+                break
+            if budget <= 0: break
+    return case
+
+def write_failure(out_dir, engine, case):
+    os.makedirs(out_dir, exist_ok=True)
+    expected, got, _, _ = check(engine, case)
+    path = os.path.join(out_dir, f"{engine}-{case['seed'].replace(':', '-')}.json")
+    with open(path, "w") as f:
+        json.dump({"engine": engine, "case": case, "reference": expected, "new": got}, f, indent=1)
+    return path
+
+# Runner
+
+def run(engines, cases, seed=0, min_size=MIN_SIZE, max_size=MAX_SIZE, out_dir="differential-failures", only=None, stream=sys.stdout):
+    """Checks every engine on every case. Returns {engine: stats} and the written failure paths."""
+    with open(RULES_PATH) as f: base_rules = json.load(f)
+    stats = {e: {"cases": 0, "mismatches": 0, "reference_s": 0.0, "new_s": 0.0} for e in engines}
+    failures = []
+    for i in ([only] if only is not None else range(cases)):
+        case = random_case(seed, i, base_rules, min_size, max_size)
+        for engine in engines:
+            expected, got, ref_s, new_s = check(engine, case)
+            s = stats[engine]
+            s['cases'] += 1
+            s['reference_s'] += ref_s
+            s['new_s'] += new_s
+            if expected != got:
+                s['mismatches'] += 1
+                path = write_failure(out_dir, engine, shrink(engine, case))
+                failures.append(path)
+                print(f"[differential] {engine} mismatch on case {case['seed']} -> {path}", file=stream)
+
+    print(f"{'engine':<14} {'cases':>6} {'mismatch':>9} {'ref ms':>9} {'new ms':>9} {'speedup':>8}", file=stream)
+    for engine, s in stats.items():
+        speedup = s['reference_s'] / s['new_s'] if s['new_s'] else 0.0
+        print(f"{engine:<14} {s['cases']:>6} {s['mismatches']:>9} {s['reference_s'] * 1000:>9.1f} {s['new_s'] * 1000:>9.1f} {speedup:>7.2f}x", file=stream)
+    return stats, failures
+
+def replay(path, stream=sys.stdout):
+    with open(path) as f: dump = json.load(f)
+    expected, got, _, _ = check(dump['engine'], dump['case'])
+    print(json.dumps({"engine": dump['engine'], "match": expected == got, "reference": expected, "new": got}, indent=1), file=stream)
+    return expected == got
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the optimized analysis engines with reference_engine.py on random boards.")
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--seed", default="0")
+    parser.add_argument("--only", type=int, help="run just this case index")
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"comma-separated subset of {', '.join(ENGINES)}")
+    parser.add_argument("--min-size", type=int, default=MIN_SIZE)
+    parser.add_argument("--max-size", type=int, default=MAX_SIZE)
+    parser.add_argument("--out-dir", default="differential-failures", help="where shrunk failing cases are written")
+    parser.add_argument("--replay", help="re-check a written failure file")
+    args = parser.parse_args()
+
+    if args.replay:
+        sys.exit(0 if replay(args.replay) else 1)
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+    _, failures = run(engines, args.cases, args.seed, args.min_size, args.max_size, args.out_dir, args.only)
+    sys.exit(1 if failures else 0)
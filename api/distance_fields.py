@@ -0,0 +1,120 @@
+from game_logic import compile_cost_grid
+
+CAPTURABLE_TYPES = ['city', 'base', 'airport', 'port', 'hq', 'lab', 'comTower']
+
+# How many turns ahead capture planning looks.
+CAPTURE_HORIZON = 5
+
+def reverse_turn_field(target_x, target_y, cost_grid, width, height, move_points, max_turns, blocking_idx=None):
+    """
+    Turns needed to walk from any cell to (target_x, target_y), searched backwards from the target.
+    Returns a dict of cell index -> turns (1 = arrives this turn). Cells further than max_turns are absent.
+
+    Labels are (turns, MP spent in the first turn) compared lexicographically, which is exact for
+    multi-turn movement: a cell that leaves MP unused at the end of a turn pays for it here.
+    Labels are packed into one int (turns * (move_points + 1) + spent) and drained with a bucket queue
+    since all costs are small integers.
+    """
+    if blocking_idx is None: blocking_idx = set()
+    stride = move_points + 1
+    limit = (max_turns + 1) * stride
+    target = target_y * width + target_x
+
+    best = {target: stride} # turns=1, nothing spent yet
+    buckets = [[] for _ in range(limit)]
+    buckets[stride].append(target)
+    turns = {}
+
+    for key in range(stride, limit):
+        bucket = buckets[key]
+        while bucket:
+            idx = bucket.pop()
+            if idx in turns or best[idx] != key: continue
+            t, spent = divmod(key, stride)
+            turns[idx] = t
+
+            # A neighbour stepping onto idx pays idx's entry cost.
+            step = cost_grid[idx]
+            if step > move_points or idx in blocking_idx: continue
+            if spent + step <= move_points:
+                nkey = key + step
+            else:
+                nkey = (t + 1) * stride + step
+            if nkey >= limit: continue
+
+            x, y = idx % width, idx // width
+            for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                if 0 <= nx < width and 0 <= ny < height:
+                    n = ny * width + nx
+                    if nkey < best.get(n, limit):
+                        best[n] = nkey
+                        buckets[nkey].append(n)
+    return turns
+
+class DistanceFields:
+    """
+    Shared multi-turn distance fields from every capturable property, one set per movement class.
+    A movement class is (move type, move points), so all infantry share one set and all mechs another.
+    Any unit of that class reads its turns to any property as a dict lookup.
+
+    If origins [(unit_type, x, y)] and a lower_bound(move_type, ax, ay, bx, by) are given, properties that no origin
+    of the class can possibly reach within max_turns get no field at all (turns >= bound / move points).
+    """
+    def __init__(self, grid, width, height, rules, properties, blocking_cells=None, max_turns=CAPTURE_HORIZON,
+                 origins=None, lower_bound=None):
+        self.grid = grid
+        self.width = width
+        self.height = height
+        self.rules = rules
+        self.max_turns = max_turns
+        self.blocking_idx = {y * width + x for (x, y) in (blocking_cells or set())}
+        # Properties under an enemy unit can't be captured until it leaves, so they seed no field.
+        self.properties = [p for p in properties if p[1] * width + p[0] not in self.blocking_idx]
+
+        self.origins = origins
+        self.lower_bound = lower_bound
+
+        self._cost_grids = {} # move_type -> flat cost grid
+        self._fields = {} # (move_type, move_points) -> {(px, py): {cell_idx: turns}}
+
+    def movement_class(self, unit_type):
+        u_stats = self.rules.get("units", {}).get(unit_type, {})
+        return u_stats.get('type', 'foot'), u_stats.get('move', 3)
+
+    def fields_for(self, unit_type):
+        m_class = self.movement_class(unit_type)
+        if m_class not in self._fields:
+            move_type, move_points = m_class
+            if move_type not in self._cost_grids:
+                self._cost_grids[move_type] = compile_cost_grid(self.grid, move_type, self.width, self.height)
+            cost_grid = self._cost_grids[move_type]
+            properties = self.properties
+            if self.origins is not None and self.lower_bound is not None:
+                budget = self.max_turns * move_points
+                starts = [(x, y) for (t, x, y) in self.origins if self.movement_class(t) == m_class]
+                properties = [
+                    (px, py) for (px, py) in properties
+                    if any(abs(x - px) + abs(y - py) <= budget and self.lower_bound(move_type, x, y, px, py) <= budget
+                           for (x, y) in starts)
+                ]
+            self._fields[m_class] = {
+                (px, py): reverse_turn_field(px, py, cost_grid, self.width, self.height, move_points, self.max_turns, self.blocking_idx)
+                for (px, py) in properties
+            }
+        return self._fields[m_class]
+
+    def turns_to(self, unit_type, x, y, px, py):
+        """Turns for a unit of this type at (x, y) to reach property (px, py), or None if beyond the horizon."""
+        field = self.fields_for(unit_type).get((px, py))
+        if field is None: return None
+        return field.get(y * self.width + x)
+
+    def reachable_properties(self, unit_type, x, y):
+        """List of ((px, py), turns) for every property this unit can reach within the horizon."""
+        idx = y * self.width + x
+        found = []
+        for prop, field in self.fields_for(unit_type).items():
+            t = field.get(idx)
+            if t is not None:
+                found.append((prop, t))
+        return found
@@ -0,0 +1,211 @@
+"""
+Economy forecasting and build-order scoring.
+
+Each player's economy is read from the board: properties that pay income (their count comes from the map's
+ownership), production facilities, funds, income and army value from the metadata. A capture plan
+(capture_planner.plan_captures) moves property income from the old owner to the capturer from the turn after each
+capture completes.
+
+Build orders are scored in batch: the candidate plans are laid out as per-turn columns (cost, worth, capture
+value) and the funds/army recurrence is stepped one turn at a time across every plan at once, so scoring a few
+hundred plans is a handful of list passes per turn rather than a simulation per plan.
+
+Turn 0 is the player's next build opportunity: now if it is their turn, otherwise their next turn after income.
+"""
+from itertools import combinations_with_replacement
+
+from damage_table import unit_class
+
+FORECAST_TURNS = 5
+INCOME_TYPES = {"city", "base", "airport", "port", "hq"}
+# Facility -> unit classes it builds
+PRODUCTION = {"base": ("foot", "ground"), "airport": ("air",), "port": ("naval",)}
+DEFAULT_PROPERTY_INCOME = 1000
+
+# Funds still unspent at the horizon count for this fraction of their face value: they are only worth something
+# once spent, and later. Units are always worth at least half their cost, so spending beats hoarding.
+FUNDS_WEIGHT = 0.5
+# Turns between building a capturer and it completing a capture (walk out, then two turns on the property).
+BUILD_CAPTURE_DELAY = 3
+# Candidate unit types (best worth per cost first) and builds per turn considered when generating plans.
+CANDIDATE_TYPES = 8
+MAX_BUILDS_PER_TURN = 4
+PLAN_LIMIT = 600
+
+def player_economies(game_map, metadata, capture_plans=None):
+    """
+    slot -> economy for every player still in the game.
+    capture_plans: slot -> plan_captures output for the players whose captures should be projected.
+    """
+    economies = {}
+    for team in metadata.get('teams', {}).values():
+        for p in team['players']:
+            if p.get('eliminated'): continue
+            economies[p['slot']] = {
+                "slot": p['slot'],
+                "co": p.get('co'),
+                "is_turn": bool(p.get('is_turn')),
+                "funds": p.get('funds', 0),
+                "income": p.get('income', 0),
+                "army_value": p.get('live_stats', {}).get('unit_value', 0),
+                "properties": 0,
+                "facilities": {f: 0 for f in PRODUCTION},
+                "income_changes": {}, # turn -> income delta from that turn on
+            }
+
+    for row in game_map:
+        for cell in row:
+            owner = cell.get('player', -1)
+            econ = economies.get(owner)
+            if econ is None: continue
+            t = cell.get('type')
+            if t in INCOME_TYPES: econ['properties'] += 1
+            if t in econ['facilities']: econ['facilities'][t] += 1
+
+    # Per-property income is inferred from what the player actually earns, which folds in game settings
+    for econ in economies.values():
+        econ['property_income'] = econ['income'] / econ['properties'] if econ['properties'] and econ['income'] else DEFAULT_PROPERTY_INCOME
+
+    for slot, plan in (capture_plans or {}).items():
+        econ = economies.get(slot)
+        if econ is None: continue
+        for a in plan:
+            if a['property_type'] not in INCOME_TYPES: continue
+            turn = a['total_turns'] + 1
+            changes = econ['income_changes']
+            changes[turn] = changes.get(turn, 0) + econ['property_income']
+            loser = economies.get(a.get('current_owner', -1))
+            if loser is not None and loser is not econ:
+                lost = loser['income_changes']
+                lost[turn] = lost.get(turn, 0) - loser['property_income']
+    return economies
+
+def income_schedule(econ, turns=FORECAST_TURNS):
+    """Income received at the start of each turn 1..turns (index 0 is turn 1)."""
+    income = econ['income']
+    schedule = []
+    for t in range(1, turns + 1):
+        income += econ['income_changes'].get(t, 0)
+        schedule.append(max(0, round(income)))
+    return schedule
+
+def starting_funds(econ):
+    return econ['funds'] if econ['is_turn'] else econ['funds'] + econ['income']
+
+def forecast(econ, turns=FORECAST_TURNS):
+    """Funds, income and army value per turn if the player builds nothing."""
+    funds = starting_funds(econ)
+    rows = [{"turn": 0, "funds": funds, "income": econ['income'], "army_value": econ['army_value']}]
+    for t, income in enumerate(income_schedule(econ, turns), 1):
+        funds += income
+        rows.append({"turn": t, "funds": funds, "income": income, "army_value": econ['army_value']})
+    return rows
+
+def unit_worths(table, enemy_units, cost_multiplier=1.0):
+    """
+    unit type -> (build cost, worth) for every unit type.
+    Worth scales the cost by how well the type hits the enemy army: the value-weighted share of an enemy unit one
+    full-HP attack removes, relative to the best type's. A type that can't hurt the enemy at all keeps half its cost.
+    """
+    enemy_value = {}
+    for u in enemy_units:
+        enemy_value[u['type']] = enemy_value.get(u['type'], 0) + table.cost.get(u['type'], 0) * u['stats']['hp'] / 100
+    total = sum(enemy_value.values())
+    effectiveness = {}
+    for t in table.cost:
+        row = table.base.get(t, {})
+        effectiveness[t] = sum(v * min(row.get(e, 0), 100) / 100 for e, v in enemy_value.items()) / total if total else 0.0
+    best = max(effectiveness.values(), default=0.0)
+    return {
+        t: (round(cost * cost_multiplier), cost * (0.5 + 0.5 * (effectiveness[t] / best if best else 1.0)))
+        for t, cost in table.cost.items()
+    }
+
+def buildable_types(econ, units_rules):
+    """unit type -> facility that builds it, for the facilities this player owns."""
+    out = {}
+    for t, s in units_rules.items():
+        cls = unit_class(t, s)
+        for facility, classes in PRODUCTION.items():
+            if cls in classes and econ['facilities'][facility] > 0: out[t] = facility
+    return out
+
+def candidate_plans(econ, worths, units_rules, turns=FORECAST_TURNS, limit=PLAN_LIMIT):
+    """
+    Build orders as tuples of per-turn unit lists: every affordable turn-0 purchase (facility counts respected) over
+    the best candidate types, each either repeated every turn or followed by saving.
+    """
+    facility_of = buildable_types(econ, units_rules)
+    if not facility_of: return [tuple(() for _ in range(turns))]
+    ranked = sorted(facility_of, key=lambda t: worths[t][1] / max(worths[t][0], 1), reverse=True)
+    types = ranked[:CANDIDATE_TYPES]
+    if "infantry" in facility_of and "infantry" not in types: types[-1] = "infantry"
+
+    funds = starting_funds(econ)
+    slots = min(MAX_BUILDS_PER_TURN, sum(econ['facilities'].values()))
+    purchases = [()]
+    for n in range(1, slots + 1):
+        for combo in combinations_with_replacement(types, n):
+            if sum(worths[t][0] for t in combo) > funds: continue
+            used = {}
+            for t in combo: used[facility_of[t]] = used.get(facility_of[t], 0) + 1
+            if any(c > econ['facilities'][f] for f, c in used.items()): continue
+            purchases.append(combo)
+
+    plans = []
+    for combo in purchases:
+        plans.append((combo,) + tuple(() for _ in range(turns - 1)))
+        if combo: plans.append((combo,) * turns)
+        if len(plans) >= limit: break
+    return plans
+
+def score_build_orders(econ, plans, worths, turns=FORECAST_TURNS, open_properties=0):
+    """
+    Scores every plan at once. A turn's builds are skipped when the plan can't afford them by then.
+    Score = worth of the units built by the horizon + their average worth on the board over it (earlier is better)
+    + FUNDS_WEIGHT * funds left at the end + income from captures by the foot units built (up to open_properties
+    of them, each capturing BUILD_CAPTURE_DELAY turns after it is built).
+    Returns one result per plan, best first.
+    """
+    n = len(plans)
+    incomes = income_schedule(econ, turns)
+    prop_income = econ['property_income']
+    # Per-turn columns: cost, worth and number of foot units of each plan's builds
+    cost = [[sum(worths[u][0] for u in plan[t]) for plan in plans] for t in range(turns)]
+    worth = [[sum(worths[u][1] for u in plan[t]) for plan in plans] for t in range(turns)]
+    foot = [[sum(1 for u in plan[t] if u in ("infantry", "mech")) for plan in plans] for t in range(turns)]
+
+    funds = [starting_funds(econ)] * n
+    built_worth = [0.0] * n
+    presence = [0.0] * n
+    captured = [0] * n
+    capture_value = [0.0] * n
+    built = [[] for _ in range(n)]
+    for t in range(turns):
+        ok = [c <= f for c, f in zip(cost[t], funds)]
+        funds = [f - c if k else f for f, c, k in zip(funds, cost[t], ok)]
+        built_worth = [b + w if k else b for b, w, k in zip(built_worth, worth[t], ok)]
+        # Each capturer pays out for the turns left once its capture lands
+        payout = prop_income * max(0, turns - t - BUILD_CAPTURE_DELAY)
+        if payout:
+            new = [min(c + (f if k else 0), open_properties) for c, f, k in zip(captured, foot[t], ok)]
+            capture_value = [v + (m - c) * payout for v, m, c in zip(capture_value, new, captured)]
+            captured = new
+        presence = [p + b for p, b in zip(presence, built_worth)]
+        funds = [f + incomes[t] for f in funds]
+        for i in range(n):
+            if ok[i] and plans[i][t]: built[i].append((t, plans[i][t]))
+
+    results = []
+    for i in range(n):
+        score = built_worth[i] + presence[i] / turns + FUNDS_WEIGHT * funds[i] + capture_value[i]
+        results.append({
+            "first_turn": list(plans[i][0]),
+            "repeats": len(built[i]) > 1,
+            "builds": [{"turn": t, "units": list(units)} for t, units in built[i]],
+            "funds_end": funds[i],
+            "army_value_end": econ['army_value'] + sum(worths[u][0] for _, units in built[i] for u in units),
+            "score": round(score)
+        })
+    results.sort(key=lambda r: r['score'], reverse=True)
+    return results
@@ -1,15 +1,16 @@
-import requests
 import re
 import json
 
-def fetch_game_metadata(game_id):
+from fetch_scheduler import INTERACTIVE, fetch_text, FetchRejected, FetchDropped
+
+def fetch_game_metadata(game_id, priority=INTERACTIVE):
     """
     Scrapes public game page for Player Info (Team, CO, Funds, Income) and Property Ownership.
     Returns a structure compatible with 'teams.json' but enriched.
     """
     url = f"https://awbw.amarriner.com/game.php?games_id={game_id}"
     try:
-        html = requests.get(url).text
+        html = fetch_text(url, priority)
         
         # 1. Extract playersInfo JSON
         m_info = re.search(r"(let|var|const)\s+playersInfo\s*=\s*(\{[\s\S]*?\});", html)
@@ -17,6 +18,10 @@ def fetch_game_metadata(game_id):
         m_bld = re.search(r"(let|var|const)\s+playersBuildings\s*=\s*(\{[\s\S]*?\});", html)
         m_turn = re.search(r"(let|var|const)\s+currentTurn\s*=\s*(\d+);", html)
         current_turn_pid = int(m_turn.group(2)) if m_turn else None
+        # Game day: the page script's day variable, else the "Day N" header
+        m_day = (re.search(r"(?:let|var|const)\s+(?:gameDay|currentDay|day)\s*=\s*(\d+);", html)
+                 or re.search(r">\s*Day\s*(\d+)\s*<", html))
+        day = int(m_day.group(1)) if m_day else None
         
         if not m_info: return None
         
@@ -59,6 +64,8 @@ def fetch_game_metadata(game_id):
                 co_image = f"https://awbw.amarriner.com/{co_image}"
                 
             eliminated = (p.get('players_eliminated', 'N') == 'Y')
+            # players_co_power_on: 'Y' = CO Power, 'S' = Super CO Power, 'N' = none
+            co_power = {'Y': 'cop', 'S': 'scop'}.get(p.get('players_co_power_on', 'N'), 'd2d')
             
             # If eliminated, stats might be stale or should be zeroed?
             # Actually, eliminated players might still have units on board in some edge cases (zombies),
@@ -70,6 +77,7 @@ def fetch_game_metadata(game_id):
                 "id": int(pid),
                 "username": p.get('users_username', 'Unknown'),
                 "co": p.get('co_name', 'Unknown'),
+                "co_power": co_power,
                 "co_image_url": co_image,
                 "slot": i,
                 "funds": int(p.get('players_funds', 0)),
@@ -88,9 +96,11 @@ def fetch_game_metadata(game_id):
             "game_id": game_id, 
             "teams": teams, 
             "ownership": ownership_map,
-            "current_turn_username": current_turn_username
+            "current_turn_username": current_turn_username,
+            "day": day
         }
         
+    except (FetchRejected, FetchDropped): raise
     except Exception as e:
         print(f"Error scraping metadata: {e}")
         return None
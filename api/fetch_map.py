@@ -1,10 +1,18 @@
-import requests
 import re
 
-def fetch_awbw_map(map_id):
+from fetch_scheduler import INTERACTIVE, fetch_text, FetchRejected, FetchDropped
+
+def fetch_awbw_map(map_id, priority=INTERACTIVE):
     url = f"https://awbw.amarriner.com/text_map.php?maps_id={map_id}"
     try:
-        r = requests.get(url)
-        matches = re.findall(r'((?:\d+,){10,}\d+)', r.text)
+        text = fetch_text(url, priority)
+        matches = re.findall(r'((?:\d+,){10,}\d+)', text)
         return "\n".join(matches) if matches else None
+    except (FetchRejected, FetchDropped): raise
     except: return None
+
+def fetch_map_id(game_id, priority=INTERACTIVE):
+    url = f"https://awbw.amarriner.com/game.php?games_id={game_id}"
+    html = fetch_text(url, priority)
+    m_map = re.search(r"maps_id=(\d+)", html)
+    return int(m_map.group(1)) if m_map else None
@@ -0,0 +1,168 @@
+"""
+Central scheduler for every request to AWBW.
+
+Each upstream host gets a token bucket (HOST_RATE requests/second, bursts up to HOST_BURST). Callers wait in one of
+three bounded FIFO queues and are served strictly by priority: interactive (a user is waiting), then prewarm
+(turn events, the watcher), then batch (bulk sweeps). Batch requests also leave BATCH_RESERVE tokens in the bucket,
+so an interactive request that arrives while a sweep runs flat out still finds a token waiting.
+
+A request that can't be served before its deadline is dropped (FetchDropped) instead of going out late, and a full
+queue rejects new requests immediately (FetchRejected). Identical GETs within COALESCE_SECONDS share one response,
+which matters because metadata, units and map id are all scraped from the same game page.
+
+The budget is per process: separate serverless instances don't coordinate.
+"""
+import os
+import time
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+
+INTERACTIVE = 0
+PREWARM = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PREWARM: "prewarm", BATCH: "batch"}
+
+HOST_RATE = float(os.environ.get("WARS_ORACLE_FETCH_RATE", "4"))
+HOST_BURST = float(os.environ.get("WARS_ORACLE_FETCH_BURST", "8"))
+BATCH_RESERVE = 2
+
+QUEUE_LIMITS = {INTERACTIVE: 32, PREWARM: 64, BATCH: 256}
+DEFAULT_DEADLINES = {INTERACTIVE: 10.0, PREWARM: 60.0, BATCH: 300.0} # seconds spent queued + fetching
+REQUEST_TIMEOUT = 20.0
+COALESCE_SECONDS = 2.0
+
+class FetchRejected(Exception):
+    """The queue for this priority is full."""
+
+class FetchDropped(Exception):
+    """The request's deadline passed before it could be sent."""
+
+class _Ticket:
+    __slots__ = ("priority", "deadline")
+    def __init__(self, priority, deadline):
+        self.priority = priority
+        self.deadline = deadline
+
+class HostScheduler:
+    """Token bucket plus priority queues for one host. Requests run on the caller's thread once admitted."""
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+        self.queues = {p: deque() for p in QUEUE_LIMITS}
+        self.stats = {"sent": 0, "dropped": 0, "rejected": 0}
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _head(self):
+        """The ticket that gets the next token: the oldest one at the highest non-empty priority."""
+        for p in sorted(self.queues):
+            if self.queues[p]: return self.queues[p][0]
+        return None
+
+    def acquire(self, priority, deadline):
+        """Blocks until this caller may send one request. Raises FetchRejected or FetchDropped."""
+        with self.cond:
+            queue = self.queues[priority]
+            if len(queue) >= QUEUE_LIMITS[priority]:
+                self.stats["rejected"] += 1
+                raise FetchRejected(f"{PRIORITY_NAMES[priority]} queue full")
+            ticket = _Ticket(priority, deadline)
+            queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= deadline:
+                        self.stats["dropped"] += 1
+                        raise FetchDropped(f"{PRIORITY_NAMES[priority]} request missed its deadline")
+                    need = 1 + (BATCH_RESERVE if priority == BATCH else 0)
+                    if self._head() is ticket and self.tokens >= need:
+                        self.tokens -= 1
+                        self.stats["sent"] += 1
+                        return
+                    if self._head() is ticket:
+                        wait = (need - self.tokens) / self.rate
+                    else:
+                        wait = deadline - now # woken by notify_all when the queue moves
+                    self.cond.wait(min(wait, deadline - now))
+            finally:
+                if ticket in queue: queue.remove(ticket)
+                self.cond.notify_all()
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+_recent = {} # url -> (monotonic time, text)
+_inflight = {} # url -> threading.Event for a GET already on the wire
+_recent_lock = threading.Lock()
+
+def scheduler_for(host):
+    with _schedulers_lock:
+        if host not in _schedulers: _schedulers[host] = HostScheduler()
+        return _schedulers[host]
+
+def fetch_text(url, priority=INTERACTIVE, deadline=None):
+    """
+    GET url through the scheduler and return the body text (like requests.get(url).text).
+    deadline is an absolute time.monotonic() value; defaults to DEFAULT_DEADLINES[priority] from now.
+    """
+    if deadline is None: deadline = time.monotonic() + DEFAULT_DEADLINES[priority]
+
+    # Coalesce: reuse a fresh response, or wait for an identical request that is already on the wire.
+    # Only admitted requests count as on the wire, so an interactive caller never waits behind a queued batch one.
+    while True:
+        text = _recent_text(url)
+        if text is not None: return text
+        with _recent_lock:
+            pending = _inflight.get(url)
+        if pending is None: break
+        if not pending.wait(max(0.0, deadline - time.monotonic())):
+            raise FetchDropped(f"{PRIORITY_NAMES[priority]} request missed its deadline")
+
+    scheduler_for(urlsplit(url).netloc).acquire(priority, deadline)
+    with _recent_lock:
+        hit = _recent.get(url)
+        if hit and time.monotonic() - hit[0] <= COALESCE_SECONDS: return hit[1]
+        pending = threading.Event()
+        _inflight.setdefault(url, pending)
+    try:
+        timeout = max(1.0, min(REQUEST_TIMEOUT, deadline - time.monotonic()))
+        text = requests.get(url, timeout=timeout).text
+        with _recent_lock:
+            _recent[url] = (time.monotonic(), text)
+            # Keep the coalescing table small
+            cutoff = time.monotonic() - COALESCE_SECONDS
+            for stale in [u for u, (t, _) in _recent.items() if t < cutoff]: del _recent[stale]
+        return text
+    finally:
+        with _recent_lock:
+            if _inflight.get(url) is pending: del _inflight[url]
+        pending.set()
+
+def _recent_text(url):
+    with _recent_lock:
+        hit = _recent.get(url)
+    if hit and time.monotonic() - hit[0] <= COALESCE_SECONDS: return hit[1]
+    return None
+
+def scheduler_stats():
+    """Per-host token level, queue depths and counters."""
+    with _schedulers_lock:
+        hosts = dict(_schedulers)
+    report = {}
+    for host, s in hosts.items():
+        with s.cond:
+            s._refill(time.monotonic())
+            report[host] = {
+                "tokens": round(s.tokens, 2),
+                "queued": {PRIORITY_NAMES[p]: len(q) for p, q in s.queues.items()},
+                **s.stats
+            }
+    return report
@@ -0,0 +1,163 @@
+import time
+from game_logic import get_terrain_type
+
+# Default wall-clock budget for one search
+FOCUS_FIRE_BUDGET_MS = 150
+
+# Extra credit for removing a unit outright, as a fraction of its cost.
+# A dead unit can't hit back next turn; a damaged one still can.
+KILL_BONUS = 0.5
+
+class _OutOfBudget(Exception):
+    pass
+
+def search_focus_fire(options, table, game_map, budget_ms=FOCUS_FIRE_BUDGET_MS, kill_bonus=KILL_BONUS, node_budget=None):
+    """
+    Best ordered sequence of attacks for one player's turn.
+    options: the full (unsorted is fine) output of enumerate_attack_options.
+    Each attacker acts at most once, no two attackers may end on the same tile,
+    and every attack sees the victim's HP left by the attacks before it (which changes counters and kills).
+
+    Depth-first branch-and-bound over attack sequences:
+    - children are tried best-first, so the first dive is the greedy plan;
+    - attacks that lose value on their own (a softening hit that eats a big counter) are still tried, since a later
+      kill can pay for them; only the bound decides what to skip;
+    - a branch is cut when its value plus the most the unused attackers could still add can't beat the best plan.
+      That bound counts each victim's kill bonus once whenever the unused attackers together can deal its remaining
+      HP, not only when one hit would kill it, so plans that soften a target first are never cut;
+    - a state (attackers used, tiles taken, victim HP) reached again with no more value is skipped.
+    Returns the best plan found before budget_ms runs out or node_budget nodes have been expanded (None = no limit);
+    'complete' says whether the search finished. With budget_ms=None only the node budget applies, and the result
+    no longer depends on machine speed or load.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000.0 if budget_ms is not None else float('inf')
+
+    att_index, vic_index = {}, {}
+    attackers, victims = [], []
+    moves = [] # attacker index -> {victim index: [from tiles]}
+    for o in options:
+        a_id, v_id = o['attacker']['id'], o['victim']['id']
+        if a_id not in att_index:
+            att_index[a_id] = len(attackers)
+            attackers.append(o['attacker'])
+            moves.append({})
+        if v_id not in vic_index:
+            vic_index[v_id] = len(victims)
+            victims.append(o['victim'])
+        moves[att_index[a_id]].setdefault(vic_index[v_id], []).append(tuple(o['from']))
+
+    if not attackers:
+        return {"steps": [], "value": 0, "kills": [], "complete": True, "nodes": 0}
+
+    # Everything that doesn't depend on the order of attacks is looked up once here.
+    att_hp = [a['hp'] for a in attackers]
+    att_cost = [table.cost.get(a['type'], 0) for a in attackers]
+    direct = [table.range.get(a['type'], [1, 1])[1] == 1 for a in attackers]
+    vic_cost = [table.cost.get(v['type'], 0) for v in victims]
+    start_hp = tuple(v['hp'] for v in victims)
+    dealt = [
+        {vi: table.damage(attackers[ai]['type'], victims[vi]['type'], att_hp[ai],
+                          get_terrain_type(game_map[victims[vi]['pos'][1]][victims[vi]['pos'][0]]),
+                          attackers[ai].get('player'), victims[vi].get('player'))
+         for vi in moves[ai]}
+        for ai in range(len(attackers))
+    ]
+    counter_cache = {}
+
+    def counter(ai, vi, tile, hp_after):
+        if not direct[ai] or hp_after <= 0: return 0
+        key = (ai, vi, get_terrain_type(game_map[tile[1]][tile[0]]), hp_after)
+        c = counter_cache.get(key)
+        if c is None:
+            a_type, v_type = attackers[ai]['type'], victims[vi]['type']
+            c = 0
+            if table.can_counter(v_type, a_type):
+                c = min(table.damage(v_type, a_type, hp_after / 10.0, key[2], victims[vi].get('player'), attackers[ai].get('player')), att_hp[ai])
+            counter_cache[key] = c
+        return c
+
+    def bound(used, hps):
+        # Each unused attacker adds at most its best damage at current HP (HP only goes down), and each victim's
+        # kill bonus is paid at most once, only if the unused attackers together can deal its remaining HP.
+        total = 0
+        pooled = [0] * len(victims)
+        for ai in range(len(attackers)):
+            if used & (1 << ai): continue
+            best = 0
+            for vi, d in dealt[ai].items():
+                h = hps[vi]
+                if h <= 0: continue
+                pooled[vi] += d
+                gain = min(d, h) * vic_cost[vi] / 100.0
+                if gain > best: best = gain
+            total += best
+        for vi, d in enumerate(pooled):
+            if d > 0 and d >= hps[vi]: total += kill_bonus * vic_cost[vi]
+        return total
+
+    best = {"value": 0, "steps": []}
+    memo = {}
+    steps = []
+    nodes = 0
+
+    def dfs(used, taken, hps, value):
+        nonlocal nodes
+        if (node_budget is not None and nodes >= node_budget) or time.perf_counter() > deadline:
+            raise _OutOfBudget()
+        nodes += 1
+
+        if value > best["value"]:
+            best["value"] = value
+            best["steps"] = list(steps)
+
+        key = (used, taken, hps)
+        if memo.get(key, float('-inf')) >= value: return
+        memo[key] = value
+        if value + bound(used, hps) <= best["value"]: return
+
+        children = []
+        for ai in range(len(attackers)):
+            if used & (1 << ai): continue
+            for vi, tiles in moves[ai].items():
+                h = hps[vi]
+                if h <= 0: continue
+                d = min(dealt[ai][vi], h)
+                if d <= 0: continue
+                h_after = h - d
+                gain = d * vic_cost[vi] / 100.0
+                if h_after <= 0: gain += kill_bonus * vic_cost[vi]
+                for tile in tiles:
+                    if tile in taken: continue
+                    c = counter(ai, vi, tile, h_after)
+                    children.append((gain - c * att_cost[ai] / 100.0, ai, vi, tile, d, c))
+
+        children.sort(key=lambda ch: ch[0], reverse=True)
+        for delta, ai, vi, tile, d, c in children:
+            new_hps = hps[:vi] + (round(hps[vi] - d, 1),) + hps[vi + 1:]
+            steps.append((ai, vi, tile, d, c, new_hps[vi] <= 0))
+            dfs(used | (1 << ai), taken | {tile}, new_hps, value + delta)
+            steps.pop()
+
+    complete = True
+    try:
+        dfs(0, frozenset(), start_hp, 0)
+    except _OutOfBudget:
+        complete = False
+
+    plan_steps = []
+    for ai, vi, tile, d, c, kills in best["steps"]:
+        plan_steps.append({
+            "attacker": attackers[ai],
+            "from": list(tile),
+            "victim": victims[vi],
+            "damage_pct": d,
+            "counter_pct": c,
+            "kills": kills
+        })
+    return {
+        "steps": plan_steps,
+        "value": round(best["value"], 1),
+        "kills": [s["victim"]["id"] for s in plan_steps if s["kills"]],
+        "complete": complete,
+        "nodes": nodes
+    }
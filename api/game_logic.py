@@ -1,5 +1,7 @@
 from collections import deque
 import math
+import os
+import json
 
 # Terrain Movement Costs (Standard AWBW/AW2)
 # 1 = Normal, 99 = Impassable (for pathfinding context)
@@ -66,6 +68,55 @@ def get_terrain_type(cell):
         return t
     return TERRAIN_MAP.get(cell, 'plain')
 
+# Raw map tile types (as produced by map_converter) that get_terrain_type knows about
+TILE_TYPES = ["plain", "mountain", "forest", "wood", "river", "sea", "beach", "shoal", "reef", "bridge", "road",
+              "city", "base", "airport", "port", "hq", "lab", "comTower"]
+
+COMPILED_TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled_tables.json")
+
+def compile_tile_move_costs():
+    """move_type -> raw tile type -> cost, with get_terrain_type's normalisation already applied."""
+    return {
+        m: {t: costs.get(get_terrain_type({'type': t}), 1) for t in TILE_TYPES}
+        for m, costs in MOVE_COSTS.items()
+    }
+
+def move_costs_fingerprint():
+    return json.dumps(MOVE_COSTS, sort_keys=True)
+
+_tile_move_costs = None
+
+def get_tile_move_costs():
+    """
+    Per-tile-type movement costs, loaded from the packaged compiled_tables.json artifact
+    (see build_artifacts.py) when it matches the current MOVE_COSTS, otherwise compiled here.
+    """
+    global _tile_move_costs
+    if _tile_move_costs is None:
+        try:
+            with open(COMPILED_TABLES_PATH) as f: artifact = json.load(f)
+            if artifact.get("move_costs") != move_costs_fingerprint():
+                raise ValueError("stale compiled_tables.json")
+            _tile_move_costs = artifact["tile_move_costs"]
+        except (OSError, ValueError, KeyError):
+            _tile_move_costs = compile_tile_move_costs()
+    return _tile_move_costs
+
+def compile_cost_grid(grid, move_type, width, height):
+    """
+    Flattens the terrain into a row-major list of entry costs for one movement class.
+    Cell (x, y) lives at index y * width + x.
+    """
+    costs = MOVE_COSTS.get(move_type, MOVE_COSTS['foot'])
+    tile_costs = get_tile_move_costs().get(move_type if move_type in MOVE_COSTS else 'foot')
+    out = []
+    for y in range(height):
+        for cell in grid[y][:width]:
+            # Known tile types are a single dict read; anything else takes the general path
+            cost = tile_costs.get(cell.get('type', 'plain')) if isinstance(cell, dict) else None
+            out.append(cost if cost is not None else costs.get(get_terrain_type(cell), 1))
+    return out
+
 def get_reachable_cells(start_x, start_y, move_points, move_type, grid, width, height, blocking_cells=None):
     """
     Returns a set of (x, y) tuples reachable by the unit.
@@ -149,9 +200,7 @@ def calculate_damage(attacker_type, defender_type, attacker_hp, defender_hp, def
     if defender_unit_type == "air":
         terrain_stars = 0
         
-    # CO Modifier application (Simplified)
-    # Ideally, we pass in the attacker/defender CO objects.
-    # For now, let's just use base damage as requested, or maybe we can update the signature later.
+    # No CO modifiers here: DamageTable (damage_table.py) compiles them per CO and power state.
     
     # Attack Power
     attack_power = base_dmg * math.ceil(a_hp) / 10.0 # Standard is Ceil(HP) for offense
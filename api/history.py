@@ -0,0 +1,250 @@
+"""
+Local archive of per-turn game history in SQLite.
+
+One row per (game, turn, player slot) with economy figures, unit count and value, property count and a summary
+of that player's threats and captures. A turn is one player's turn on one day, numbered
+(day - 1) * players + turn owner's slot + 1, so a round the archive never saw leaves a gap instead of merging two
+days. Later snapshots of the same turn overwrite its rows, so each row ends up holding the last state seen in that
+turn. A game whose first archived snapshot has no day (the scrape did not find it, or it was saved before the day
+was scraped) is numbered by counting turn-owner changes instead. Each game keeps the scheme it started with, so the
+two numberings never mix: a game numbered by day skips snapshots without one.
+
+Rows are written by the watcher and the turn-event prewarm when WARS_ORACLE_HISTORY_DB is set, or in bulk from
+saved snapshot files (see snapshots.py):
+    python api/history.py ingest <snapshot.json> [...]
+    python api/history.py user <username> [--game GAME_ID]
+    python api/history.py co [<co name>]
+    python api/history.py game <game_id>
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+from analyzer import is_high_threat
+
+HISTORY_DB = os.environ.get("WARS_ORACLE_HISTORY_DB")
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    game_id INTEGER NOT NULL,
+    turn INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    recorded_at REAL NOT NULL,
+    fingerprint TEXT,
+    turn_owner TEXT,
+    username TEXT COLLATE NOCASE,
+    co TEXT,
+    co_power TEXT,
+    eliminated INTEGER NOT NULL DEFAULT 0,
+    funds INTEGER,
+    income INTEGER,
+    unit_count INTEGER,
+    unit_value INTEGER,
+    property_count INTEGER,
+    threat_count INTEGER,
+    high_threat_count INTEGER,
+    max_kill_probability REAL,
+    capture_count INTEGER,
+    immediate_capture_count INTEGER,
+    PRIMARY KEY (game_id, turn, slot)
+);
+CREATE TABLE IF NOT EXISTS games (
+    game_id INTEGER PRIMARY KEY,
+    numbering TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_by_user ON turns (username, game_id, turn);
+CREATE INDEX IF NOT EXISTS turns_by_co ON turns (co, game_id);
+"""
+
+COLUMNS = [
+    "game_id", "turn", "slot", "recorded_at", "fingerprint", "turn_owner", "username", "co", "co_power", "eliminated",
+    "funds", "income", "unit_count", "unit_value", "property_count",
+    "threat_count", "high_threat_count", "max_kill_probability", "capture_count", "immediate_capture_count",
+]
+INSERT = f"INSERT OR REPLACE INTO turns ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def connect(path=None):
+    """Open (and create if needed) the archive. Pass ':memory:' for a throwaway one."""
+    conn = sqlite3.connect(path or HISTORY_DB)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def snapshot_rows(snapshot, analyses, turn, fingerprint=None, recorded_at=None):
+    """Rows for every player in one snapshot. analyses: slot -> get_full_analysis (eliminated players have none)."""
+    metadata = snapshot['metadata']
+    if recorded_at is None: recorded_at = time.time()
+    unit_counts = {}
+    for u in snapshot['units']:
+        unit_counts[u.get('playerSlot')] = unit_counts.get(u.get('playerSlot'), 0) + 1
+    property_counts = {}
+    for slot in metadata.get('ownership', {}).values():
+        property_counts[slot] = property_counts.get(slot, 0) + 1
+
+    rows = []
+    for team in metadata['teams'].values():
+        for p in team['players']:
+            slot = p['slot']
+            analysis = analyses.get(slot) or analyses.get(str(slot))
+            threats = captures = risks = None
+            if analysis is not None:
+                threats = [t for t in analysis.get('threats', []) if not t.get('next_turn')]
+                captures = analysis.get('captures', [])
+                risks = analysis.get('kill_risk', [])
+            rows.append((
+                snapshot['game_id'], turn, slot, recorded_at, fingerprint, metadata.get('current_turn_username'),
+                p['username'], p['co'], p.get('co_power', 'd2d'), int(bool(p.get('eliminated'))),
+                p.get('funds', 0), p.get('income', 0), unit_counts.get(slot, 0),
+                p.get('live_stats', {}).get('unit_value', 0), property_counts.get(slot, 0),
+                None if threats is None else len(threats),
+                None if threats is None else sum(1 for t in threats if is_high_threat(t)),
+                None if risks is None else max((r['kill_probability'] for r in risks), default=0.0),
+                None if captures is None else len(captures),
+                None if captures is None else sum(1 for c in captures if c['turns_to_reach'] == 1),
+            ))
+    return rows
+
+def turn_number(metadata):
+    """(day - 1) * players + turn owner's slot + 1, or None if the day or the turn owner is unknown."""
+    day = metadata.get('day')
+    players = [p for team in metadata.get('teams', {}).values() for p in team.get('players', [])]
+    owner = next((p['slot'] for p in players if p.get('is_turn')), None)
+    if day is None or owner is None: return None
+    return (day - 1) * len(players) + owner + 1
+
+def ingest(conn, items):
+    """
+    Bulk insert, in one transaction. items: iterable of (snapshot, analyses, fingerprint), oldest first per game.
+    A snapshot identical to the game's latest archived one is skipped, as is one without a day in a game numbered by
+    day. Returns the number of rows written.
+    """
+    last = {} # game_id -> [turn, turn owner, fingerprint, numbering] of the latest archived snapshot
+    games = [] # (game_id, numbering) of games archived for the first time
+    rows = []
+    for snapshot, analyses, fingerprint in items:
+        game_id = snapshot['game_id']
+        if game_id not in last:
+            row = conn.execute(
+                "SELECT turn, turn_owner, fingerprint FROM turns WHERE game_id = ? ORDER BY turn DESC LIMIT 1", (game_id,)
+            ).fetchone()
+            scheme = conn.execute("SELECT numbering FROM games WHERE game_id = ?", (game_id,)).fetchone()
+            # Games archived before the scheme was stored were counted by turn owner
+            numbering = scheme[0] if scheme else ("owner" if row else None)
+            last[game_id] = list(row) + [numbering] if row else [0, None, None, numbering]
+        turn, owner, previous, numbering = last[game_id]
+        if fingerprint is not None and fingerprint == previous: continue
+        current_owner = snapshot['metadata'].get('current_turn_username')
+        numbered = turn_number(snapshot['metadata'])
+        if numbering is None:
+            numbering = "day" if numbered is not None else "owner"
+            games.append((game_id, numbering))
+        if numbering == "day":
+            if numbered is None:
+                print(f"[history] game {game_id}: snapshot without a day skipped (game numbered by day)")
+                continue
+            turn = numbered
+        elif current_owner != owner or turn == 0: turn += 1
+        last[game_id] = [turn, current_owner, fingerprint, numbering]
+        rows.extend(snapshot_rows(snapshot, analyses, turn, fingerprint))
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO games (game_id, numbering) VALUES (?, ?)", games)
+        conn.executemany(INSERT, rows)
+    return len(rows)
+
+def record(snapshot, analyses, fingerprint):
+    """Archive one freshly computed snapshot if WARS_ORACLE_HISTORY_DB is set. Never raises: a database error or a
+    malformed snapshot is logged and the snapshot is left out."""
+    if not HISTORY_DB: return
+    try:
+        conn = connect()
+        try:
+            ingest(conn, [(snapshot, analyses, fingerprint)])
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[history] game {snapshot.get('game_id')}: {e!r}")
+
+# Queries
+
+def game_history(conn, game_id):
+    rows = conn.execute("SELECT * FROM turns WHERE game_id = ? ORDER BY turn, slot", (game_id,))
+    return [dict(r) for r in rows]
+
+def unit_value_trend(conn, username, game_id=None):
+    """One entry per archived turn for a player (case-insensitive username), across games unless game_id is given."""
+    sql = ("SELECT game_id, turn, recorded_at, co, funds, income, unit_count, unit_value, property_count "
+           "FROM turns WHERE username = ?")
+    params = [username]
+    if game_id is not None:
+        sql += " AND game_id = ?"
+        params.append(game_id)
+    return [dict(r) for r in conn.execute(sql + " ORDER BY game_id, turn", params)]
+
+def co_summary(conn, co=None):
+    """Cross-game aggregates per CO: players, games, turns, averages and eliminations."""
+    sql = """
+        SELECT co,
+               COUNT(DISTINCT game_id) AS games,
+               COUNT(DISTINCT game_id || ':' || slot) AS players,
+               COUNT(*) AS turns,
+               ROUND(AVG(income), 1) AS avg_income,
+               ROUND(AVG(unit_value), 1) AS avg_unit_value,
+               MAX(unit_value) AS max_unit_value,
+               ROUND(AVG(threat_count), 2) AS avg_threats,
+               ROUND(AVG(capture_count), 2) AS avg_captures,
+               COUNT(DISTINCT CASE WHEN eliminated THEN game_id || ':' || slot END) AS eliminations
+        FROM turns
+    """
+    params = []
+    if co is not None:
+        sql += " WHERE co = ?"
+        params.append(co)
+    sql += " GROUP BY co ORDER BY games DESC, co"
+    return [dict(r) for r in conn.execute(sql, params)]
+
+def _ingest_files(conn, paths):
+    import response_cache
+    from snapshots import read_snapshot_file, compute_analyses
+    with open(RULES_PATH) as f: rules = json.load(f)
+    def items():
+        for path in paths:
+            snapshot = read_snapshot_file(path)
+            yield snapshot, compute_analyses(snapshot, rules), response_cache.snapshot_fingerprint(snapshot)
+    return ingest(conn, items())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-turn game history archive.")
+    parser.add_argument("--db", default=HISTORY_DB, help="archive path (default: $WARS_ORACLE_HISTORY_DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="analyze saved snapshot files and archive them (oldest first)")
+    p.add_argument("paths", nargs="+")
+    p = sub.add_parser("user", help="a player's unit value trend")
+    p.add_argument("username")
+    p.add_argument("--game", type=int)
+    p = sub.add_parser("co", help="cross-game stats per CO")
+    p.add_argument("co", nargs="?")
+    p = sub.add_parser("game", help="every archived row of one game")
+    p.add_argument("game_id", type=int)
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("no archive: pass --db or set WARS_ORACLE_HISTORY_DB")
+
+    conn = connect(args.db)
+    start = time.perf_counter()
+    if args.command == "ingest":
+        result = {"rows": _ingest_files(conn, args.paths)}
+    elif args.command == "user":
+        result = unit_value_trend(conn, args.username, args.game)
+    elif args.command == "co":
+        result = co_summary(conn, args.co)
+    else:
+        result = game_history(conn, args.game_id)
+    json.dump(result, sys.stdout, indent=1)
+    print(f"\n[history] {args.command}: {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
@@ -1,75 +1,192 @@
-from flask import Flask, jsonify, Response, request, send_file
+import time
+_import_start = time.perf_counter()
+
+from flask import Flask, jsonify, Response, request
+import importlib
 import sys
 import os
+import json
+import hmac
+import threading
+
+# Milliseconds spent on each startup step (module imports, rules load), in the order they happened.
+# Served by /api/debug/startup so cold-start regressions show up.
+STARTUP_TIMINGS = {"import flask": round((time.perf_counter() - _import_start) * 1000, 2)}
 
 # Add current directory to path so we can import local modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(current_dir)
-
-from map_converter import parse_map_csv
-from unit_converter import fetch_units
-from context_generator import generate_context
-from fetch_map import fetch_awbw_map
-from fetch_game_metadata import fetch_game_metadata
-from analyzer import GameAnalyzer
-import requests
-import re
-import json
-import os
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+
+RULES_PATH = os.path.join(current_dir, "rules.json")
+
+# Shared secret the turn relay sends in X-Turn-Event-Token. Unset = the turn-event route is disabled.
+TURN_EVENT_TOKEN = os.environ.get("WARS_ORACLE_TURN_EVENT_TOKEN")
+# Token the /api/debug/ routes expect in X-Debug-Token. Unset = the debug routes are disabled.
+DEBUG_TOKEN = os.environ.get("WARS_ORACLE_DEBUG_TOKEN")
 
 app = Flask(__name__)
-TMP_DIR = "/tmp"
+
+def lazy_import(name):
+    """
+    Local modules (and `requests`, which the scrapers pull in) load on first use instead of at cold start.
+    The first import of each one is timed into STARTUP_TIMINGS.
+    """
+    if name in sys.modules: return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    STARTUP_TIMINGS[f"import {name}"] = round((time.perf_counter() - start) * 1000, 2)
+    return module
+
+_rules = None
 
 def get_rules():
-    with open("rules.json") as f: return json.load(f)
+    """rules.json, parsed once per instance."""
+    global _rules
+    if _rules is None:
+        start = time.perf_counter()
+        with open(RULES_PATH) as f: _rules = json.load(f)
+        STARTUP_TIMINGS["load rules"] = round((time.perf_counter() - start) * 1000, 2)
+    return _rules
+
+def resolve_target_slot(metadata, player_id=None, username=None):
+    target_slot = None
+    if player_id:
+        for team in metadata['teams'].values():
+            for p in team['players']:
+                if str(p['id']) == str(player_id): target_slot = p['slot']; break
+    elif username:
+        for team in metadata['teams'].values():
+            for p in team['players']:
+                if p['username'].lower() == username.lower(): target_slot = p['slot']; break
+    return target_slot
+
+_prewarming = set()
+_prewarm_lock = threading.Lock()
+
+def prewarm_game(game_id):
+    """
+    Scrape one snapshot and compute analysis and context for every live player, then publish them to the
+    response cache together. Runs inside the request: a serverless instance is frozen once it has responded.
+    Returns (fingerprint, None) or (None, (error message, status)); (None, None) if another request is already
+    prewarming this game.
+    """
+    with _prewarm_lock:
+        if game_id in _prewarming: return None, None
+        _prewarming.add(game_id)
+    response_cache = lazy_import("response_cache")
+    snapshots = lazy_import("snapshots")
+    try:
+        snapshot, error = snapshots.load_snapshot(game_id, lazy_import("fetch_scheduler").PREWARM)
+        if error:
+            print(f"[turn-event] game {game_id}: {error[0]}")
+            return None, error
+        analyses, contexts = snapshots.compute_results(snapshot, get_rules())
+        fingerprint = response_cache.snapshot_fingerprint(snapshot)
+        response_cache.publish(game_id, fingerprint, snapshot['metadata'], analyses, contexts)
+        lazy_import("history").record(snapshot, analyses, fingerprint)
+        return fingerprint, None
+    except Exception as e:
+        print(f"[turn-event] game {game_id}: prewarm failed: {e}")
+        return None, (f"prewarm failed: {e}", 500)
+    finally:
+        with _prewarm_lock:
+            _prewarming.discard(game_id)
+
+def cached_result(game_id, kind, player_id, username):
+    """
+    A warm analysis/context for the requested player as (value, snapshot fingerprint, slot), or None.
+    Only entries something keeps current (turn events, the watcher) are served without scraping; results stored by
+    on-demand requests are only reused once a fresh scrape shows the board unchanged (see snapshot_result).
+    ?fresh=1 always misses.
+    """
+    if request.args.get('fresh'): return None
+    response_cache = lazy_import("response_cache")
+    entry = response_cache.get_game(game_id)
+    if entry is None or not entry.get('kept_fresh'): return None
+    slot = resolve_target_slot(entry['metadata'], player_id, username)
+    value = entry[kind].get(slot)
+    if value is None: return None
+    return value, entry['fingerprint'], slot
+
+def snapshot_result(game_id, fingerprint, kind, slot):
+    """The cached result computed from exactly this snapshot, if any (never with ?fresh=1)."""
+    if request.args.get('fresh'): return None
+    return lazy_import("response_cache").find_result(game_id, fingerprint, kind, slot)
+
+def analysis_response(game_id, analysis, fingerprint, slot):
+    """
+    The full analysis, or with ?since=<fingerprint> of an analysis this instance still remembers, a diff against it.
+    Either way the X-Snapshot-Fingerprint header names the snapshot to pass as `since` next time.
+    """
+    since = request.args.get('since')
+    if since:
+        previous = lazy_import("response_cache").find_analysis(game_id, since, slot)
+        if previous is not None:
+            delta = lazy_import("analysis_diff").diff_analysis(previous, analysis, since, fingerprint)
+            return encoded_response(game_id, fingerprint, "analysis", slot, delta, cacheable=False)
+    return encoded_response(game_id, fingerprint, "analysis", slot, analysis)
+
+def encoded_response(game_id, fingerprint, kind, slot, value, cacheable=True):
+    """
+    value in the format and content encoding the client asked for (see response_encoding.py).
+    Bodies of full results are encoded once per snapshot and served from response_cache after that.
+    """
+    response_encoding = lazy_import("response_encoding")
+    fmt = "text" if kind == "context" else response_encoding.negotiate_format(request.headers.get('Accept'), request.args.get('format'))
+    encoding = response_encoding.negotiate_encoding(request.headers.get('Accept-Encoding'))
+    response_cache = lazy_import("response_cache")
+    key = (game_id, fingerprint, kind, slot, fmt, encoding)
+    encoded = response_cache.get_encoded(key) if cacheable else None
+    if encoded is None:
+        encoded = response_encoding.encode(value, fmt, encoding)
+        if cacheable: response_cache.store_encoded(key, encoded)
+    body, content_encoding = encoded
+
+    mimetype = "text/plain; charset=utf-8" if fmt == "text" else response_encoding.MIME_TYPES[fmt]
+    response = Response(body, content_type=mimetype)
+    if content_encoding: response.headers['Content-Encoding'] = content_encoding
+    response.headers['Vary'] = 'Accept-Encoding' if fmt == "text" else 'Accept, Accept-Encoding'
+    response.headers['X-Snapshot-Fingerprint'] = fingerprint
+    return response
 
 @app.route('/api/game/<int:game_id>/context', methods=['GET'])
 def get_context(game_id):
     try:
         player_id = request.args.get('player_id')
         username = request.args.get('username')
-        
-        game_url = f"https://awbw.amarriner.com/game.php?games_id={game_id}"
-        html = requests.get(game_url).text
-        m_map = re.search(r"maps_id=(\d+)", html)
-        if not m_map: return jsonify({"error": "Could not determine Map ID"}), 404
-        map_id = int(m_map.group(1))
-        
-        raw_map = fetch_awbw_map(map_id)
-        if not raw_map: return jsonify({"error": "Could not fetch map data"}), 500
-            
-        metadata = fetch_game_metadata(game_id)
-        ownership = metadata.get('ownership', {})
-        game_map = parse_map_csv(raw_map, ownership)
-        units = fetch_units(game_id)
-        
-        target_slot = None
-        if player_id:
-            for team in metadata['teams'].values():
-                for p in team['players']:
-                    if str(p['id']) == str(player_id): target_slot = p['slot']; break
-        elif username:
-            for team in metadata['teams'].values():
-                for p in team['players']:
-                    if p['username'].lower() == username.lower(): target_slot = p['slot']; break
-        
-        map_path = os.path.join(TMP_DIR, "map.json")
-        units_path = os.path.join(TMP_DIR, "units.json")
-        rules_path = "rules.json"
-        
-        with open(map_path, "w") as f: json.dump(game_map, f)
-        with open(units_path, "w") as f: json.dump(units, f)
-        
-        context_text = generate_context(map_path, units_path, rules_path, metadata, target_slot)
-        
-        return Response(context_text, mimetype='text/plain')
+
+        cached = cached_result(game_id, "context", player_id, username)
+        if cached: return encoded_response(game_id, cached[1], "context", cached[2], cached[0])
+
+        snapshots = lazy_import("snapshots")
+        snapshot, error = snapshots.load_snapshot(game_id)
+        if error: return jsonify({"error": error[0]}), error[1]
+        metadata = snapshot['metadata']
+        target_slot = resolve_target_slot(metadata, player_id, username)
+
+        response_cache = lazy_import("response_cache")
+        fingerprint = response_cache.snapshot_fingerprint(snapshot)
+        context_text = snapshot_result(game_id, fingerprint, "context", target_slot)
+        if context_text is not None: return encoded_response(game_id, fingerprint, "context", target_slot, context_text)
+
+        # Reuse this snapshot's cached analysis if there is one, so context and /analysis agree
+        analysis = snapshot_result(game_id, fingerprint, "analysis", target_slot) if target_slot is not None else None
+        analyzer = snapshots.checkout_analyzer(snapshot, get_rules(), fingerprint)
+        generate_context = lazy_import("context_generator").generate_context
+        context_text = generate_context(snapshot['map'], snapshot['units'], get_rules(), metadata, target_slot,
+                                        map_id=snapshot['map_id'], analyzer=analyzer, analysis=analysis)
+        snapshots.retain_analyzer(game_id, fingerprint, analyzer)
+        response_cache.store_result(game_id, fingerprint, metadata, "context", target_slot, context_text)
+
+        return encoded_response(game_id, fingerprint, "context", target_slot, context_text)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/game/<int:game_id>/players', methods=['GET'])
 def get_players(game_id):
     try:
-        metadata = fetch_game_metadata(game_id)
+        metadata = lazy_import("fetch_game_metadata").fetch_game_metadata(game_id)
         if not metadata: return jsonify({"error": "Could not fetch metadata"}), 500
         players = []
         for team_name, team_data in metadata['teams'].items():
@@ -100,52 +217,101 @@ def get_analysis(game_id):
     try:
         player_id = request.args.get('player_id')
         username = request.args.get('username')
-        
-        game_url = f"https://awbw.amarriner.com/game.php?games_id={game_id}"
-        html = requests.get(game_url).text
-        m_map = re.search(r"maps_id=(\d+)", html)
-        if not m_map: return jsonify({"error": "Could not determine Map ID"}), 404
-        map_id = int(m_map.group(1))
-        
-        raw_map = fetch_awbw_map(map_id)
-        if not raw_map: return jsonify({"error": "Could not fetch map data"}), 500
-            
-        metadata = fetch_game_metadata(game_id)
-        ownership = metadata.get('ownership', {})
-        game_map = parse_map_csv(raw_map, ownership)
-        units = fetch_units(game_id)
-        
-        target_slot = None
-        if player_id:
-            for team in metadata['teams'].values():
-                for p in team['players']:
-                    if str(p['id']) == str(player_id): target_slot = p['slot']; break
-        elif username:
-            for team in metadata['teams'].values():
-                for p in team['players']:
-                    if p['username'].lower() == username.lower(): target_slot = p['slot']; break
-                    
+
+        cached = cached_result(game_id, "analysis", player_id, username)
+        if cached: return analysis_response(game_id, *cached)
+
+        snapshots = lazy_import("snapshots")
+        snapshot, error = snapshots.load_snapshot(game_id)
+        if error: return jsonify({"error": error[0]}), error[1]
+        metadata = snapshot['metadata']
+        target_slot = resolve_target_slot(metadata, player_id, username)
+
         if target_slot is None:
              return jsonify({"error": "Could not identify target player slot"}), 400
 
-        map_path = os.path.join(TMP_DIR, "map.json")
-        units_path = os.path.join(TMP_DIR, "units.json")
-        rules_path = "rules.json"
-        
-        with open(map_path, "w") as f: json.dump(game_map, f)
-        with open(units_path, "w") as f: json.dump(units, f)
-        
-        # Initialize Analyzer
-        analyzer = GameAnalyzer(map_path, units_path, rules_path, metadata)
+        # The analyzer of an earlier request on the same board already has its pathfinding done
+        response_cache = lazy_import("response_cache")
+        fingerprint = response_cache.snapshot_fingerprint(snapshot)
+        analysis = snapshot_result(game_id, fingerprint, "analysis", target_slot)
+        if analysis is not None: return analysis_response(game_id, analysis, fingerprint, target_slot)
+
+        analyzer = snapshots.checkout_analyzer(snapshot, get_rules(), fingerprint)
         analysis = analyzer.get_full_analysis(target_slot)
-        
-        return jsonify(analysis)
+        snapshots.retain_analyzer(game_id, fingerprint, analyzer)
+        response_cache.store_result(game_id, fingerprint, metadata, "analysis", target_slot, analysis)
+
+        return analysis_response(game_id, analysis, fingerprint, target_slot)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/game/<int:game_id>/turn-event', methods=['POST'])
+def post_turn_event(game_id):
+    """
+    Called by turn-relay when a NextTurn arrives. The body (the relay's NextTurn payload) is optional and only logged.
+    Drops the game's cached results and recomputes them before responding (the relay doesn't wait for the answer).
+    Disabled unless WARS_ORACLE_TURN_EVENT_TOKEN is set, since every call costs AWBW scrapes.
+    """
+    if not TURN_EVENT_TOKEN:
+        return jsonify({"error": "Turn events are disabled (WARS_ORACLE_TURN_EVENT_TOKEN is not set)"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Turn-Event-Token', ''), TURN_EVENT_TOKEN):
+        return jsonify({"error": "Invalid turn event token"}), 403
+    payload = request.get_json(silent=True) or {}
+    if payload:
+        print(f"[turn-event] game {game_id}: day {payload.get('day')} next pid {payload.get('nextPId')}")
+
+    lazy_import("response_cache").invalidate(game_id)
+    lazy_import("snapshots").discard_analyzer(game_id)
+    fingerprint, error = prewarm_game(game_id)
+    if error: return jsonify({"game_id": game_id, "error": error[0]}), error[1]
+    if fingerprint is None: return jsonify({"game_id": game_id, "prewarm": "already running"}), 202
+    return jsonify({"game_id": game_id, "prewarm": "done", "fingerprint": fingerprint})
+
+@app.route('/api/game/<int:game_id>/history', methods=['GET'])
+def get_history(game_id):
+    """Archived per-turn rows for a game, or with ?username= that player's trend in this game."""
+    history = lazy_import("history")
+    if not history.HISTORY_DB: return jsonify({"error": "History archive is not enabled"}), 404
+    conn = history.connect()
+    try:
+        username = request.args.get('username')
+        if username: return jsonify(history.unit_value_trend(conn, username, game_id))
+        return jsonify(history.game_history(conn, game_id))
+    finally:
+        conn.close()
+
+def debug_denied():
+    """Error response for a debug route, or None if the request carries the debug token."""
+    if not DEBUG_TOKEN:
+        return jsonify({"error": "Debug routes are disabled (WARS_ORACLE_DEBUG_TOKEN is not set)"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Debug-Token', ''), DEBUG_TOKEN):
+        return jsonify({"error": "Invalid debug token"}), 403
+    return None
+
+@app.route('/api/debug/startup', methods=['GET'])
+def get_startup_report():
+    return debug_denied() or jsonify({"timings_ms": STARTUP_TIMINGS})
+
+@app.route('/api/debug/fetch', methods=['GET'])
+def get_fetch_report():
+    return debug_denied() or jsonify({"hosts": lazy_import("fetch_scheduler").scheduler_stats()})
+
+@app.route('/api/debug/fragments', methods=['GET'])
+def get_fragment_report():
+    return debug_denied() or jsonify({"fragments": lazy_import("context_generator").fragment_stats()})
+
+@app.route('/api/debug/residency', methods=['GET'])
+def get_residency_report():
+    return debug_denied() or jsonify(lazy_import("residency").residency_stats())
+
 @app.route('/')
 def index():
-    return jsonify({"status": "Wars Oracle API Running", "endpoints": ["/api/game/<id>/analysis", "/api/game/<id>/context"]})
+    return jsonify({"status": "Wars Oracle API Running", "endpoints": ["/api/game/<id>/analysis", "/api/game/<id>/context", "/api/game/<id>/turn-event"]})
+
+# Whole module, Flask included
+STARTUP_TIMINGS["import index"] = round((time.perf_counter() - _import_start) * 1000, 2)
+if os.environ.get("WARS_ORACLE_IMPORT_REPORT"):
+    print(f"[startup] {json.dumps(STARTUP_TIMINGS)}")
 
 if __name__ == '__main__':
     app.run(port=5328)
@@ -0,0 +1,154 @@
+import threading
+from collections import OrderedDict
+
+from distance_fields import CAPTURABLE_TYPES
+
+# Influence halves every this many tiles
+INFLUENCE_HALF_LIFE = 3.0
+
+# Reach (move + range) that counts as weight 1.0; faster/longer-ranged units project more.
+REACH_NORM = 6.0
+
+# A tile is contested when neither side holds more than this share of the influence on it...
+CONTESTED_MARGIN = 0.2
+# ...and both sides have at least this fraction of the strongest influence on the board there.
+PRESENCE_MIN = 0.05
+
+# Boards whose team fields are kept: every player's analysis of a snapshot (and the watcher, prewarm and on-demand
+# requests for it) shares one computation
+FIELD_CACHE_SIZE = 8
+
+_fields = OrderedDict() # (width, height, half life, per-team weighted points) -> team fields
+_fields_lock = threading.Lock()
+
+def smooth_points(points, width, height, decay):
+    """
+    Row-major field of sum_p weight_p * decay^(|x - x_p| + |y - y_p|) for points {(x, y): weight}.
+    The kernel is separable, so this is a pass along the rows then a pass down the columns. Units are sparse, so the
+    row pass adds a slice of the 1D kernel per point instead of sweeping every row; the column pass runs its two
+    sweeps over whole rows at once.
+    """
+    # kernel[width - 1 + d] = decay^|d|
+    kernel = [decay ** abs(d) for d in range(1 - width, width)]
+    rows = [None] * height
+    for (x, y), weight in points.items():
+        taps = kernel[width - 1 - x:2 * width - 1 - x]
+        row = rows[y]
+        rows[y] = [weight * k for k in taps] if row is None else [r + weight * k for r, k in zip(row, taps)]
+    # out[y] = sum_r decay^|y - r| * rows[r]: a sweep down (r <= y), then one up (r > y)
+    zero = [0.0] * width
+    down = []
+    acc = zero
+    for row in rows:
+        acc = [decay * a for a in acc] if row is None else [v + decay * a for v, a in zip(row, acc)]
+        down.append(acc)
+    out = [0.0] * (width * height)
+    acc = zero
+    for y in range(height - 1, -1, -1):
+        out[y * width:(y + 1) * width] = [d + decay * a for d, a in zip(down[y], acc)]
+        row = rows[y]
+        acc = [decay * a for a in acc] if row is None else [v + decay * a for v, a in zip(row, acc)]
+    return out
+
+def unit_weight(unit, rules):
+    """Unit value (cost scaled by HP) weighted by how far it projects force: move + max range."""
+    u_stats = rules.get("units", {}).get(unit['type'], {})
+    min_rng, max_rng = u_stats.get('range', [1, 1])
+    # Indirects can't move and fire, so their reach is just their range
+    reach = max_rng if max_rng > 1 else u_stats.get('move', 3) + max_rng
+    hp = unit['stats']['hp']
+    hp_frac = hp / 100.0 if hp > 10 else hp / 10.0
+    return u_stats.get('cost', 0) * hp_frac * (reach / REACH_NORM)
+
+def compute_team_fields(units_by_team, rules, width, height, half_life=INFLUENCE_HALF_LIFE):
+    """team -> row-major influence field. Memoized on the weighted unit positions; don't modify the fields."""
+    points_by_team = {}
+    for team, units in units_by_team.items():
+        points = points_by_team[team] = {}
+        for u in units:
+            x, y = u['position']['x'], u['position']['y']
+            if 0 <= x < width and 0 <= y < height:
+                points[x, y] = points.get((x, y), 0.0) + unit_weight(u, rules)
+    key = (width, height, half_life, tuple((team, tuple(sorted(points.items()))) for team, points in points_by_team.items()))
+    with _fields_lock:
+        if key in _fields:
+            _fields.move_to_end(key)
+            return _fields[key]
+    decay = 0.5 ** (1.0 / half_life)
+    fields = {team: smooth_points(points, width, height, decay) for team, points in points_by_team.items()}
+    with _fields_lock:
+        _fields[key] = fields
+        while len(_fields) > FIELD_CACHE_SIZE: _fields.popitem(last=False)
+    return fields
+
+def summarize_influence(fields, my_team, game_map, width, height, target_slot):
+    """
+    Frontline and contested-property summary for one team.
+    """
+    mine = fields.get(my_team) or [0.0] * (width * height)
+    enemy_fields = [f for team, f in fields.items() if team != my_team]
+    if len(enemy_fields) == 1:
+        enemy = enemy_fields[0]
+    elif enemy_fields:
+        enemy = list(map(max, *enemy_fields))
+    else:
+        enemy = [0.0] * (width * height)
+
+    peak = max(max(mine, default=0), max(enemy, default=0))
+    if peak <= 0:
+        return {"control": {"mine": 0, "enemy": 0, "contested": 0}, "frontline": None, "contested_properties": []}
+    presence = peak * PRESENCE_MIN
+
+    mine_cells = enemy_cells = 0
+    front = []
+    for idx, (m, e) in enumerate(zip(mine, enemy)):
+        # Only a tile where both sides are present can be contested; otherwise the present side holds it
+        if m < presence:
+            if e >= presence: enemy_cells += 1
+        elif e < presence:
+            mine_cells += 1
+        elif abs(m - e) <= CONTESTED_MARGIN * (m + e):
+            front.append(idx)
+        elif m > e:
+            mine_cells += 1
+        else:
+            enemy_cells += 1
+
+    frontline = None
+    if front:
+        xs = [i % width for i in front]
+        ys = [i // width for i in front]
+        frontline = {
+            "cells": len(front),
+            "center": [round(sum(xs) / len(xs)), round(sum(ys) / len(ys))],
+            "x_range": [min(xs), max(xs)],
+            "y_range": [min(ys), max(ys)]
+        }
+
+    contested = []
+    for y, row in enumerate(game_map):
+        for x, cell in enumerate(row):
+            if cell.get('type') not in CAPTURABLE_TYPES: continue
+            idx = y * width + x
+            m, e = mine[idx], enemy[idx]
+            if m < presence or e < presence: continue
+            margin = (m - e) / (m + e)
+            if abs(margin) <= CONTESTED_MARGIN or (cell.get('player', -1) == target_slot and margin < 0):
+                contested.append({
+                    "pos": [x, y],
+                    "property_type": cell.get('type'),
+                    "owner": cell.get('player', -1),
+                    "margin": round(margin, 2)
+                })
+    contested.sort(key=lambda c: c['margin'])
+
+    total = width * height
+    return {
+        "control": {
+            "mine": round(mine_cells / total, 2),
+            "enemy": round(enemy_cells / total, 2),
+            "contested": round(len(front) / total, 2)
+        },
+        "frontline": frontline,
+        "contested_properties": contested
+    }
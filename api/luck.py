@@ -0,0 +1,65 @@
+"""
+Damage as a distribution over the luck roll.
+
+Every attack adds a uniform luck roll of 0..luck_max to the attacker's base damage before HP and defense scale it
+(luck_max is 9 unless the CO changes it, e.g. Nell). A distribution is a probability mass function stored as a
+list indexed by damage in HP points (0-100, a displayed HP is 10 points), so combining attackers is a convolution
+of short arrays rather than an enumeration of every roll combination.
+"""
+import math
+
+LUCK_MAX = 9
+MAX_HP = 100
+
+def damage_pmf(base, luck_scale, attacker_hp, terrain_factor, luck_max=LUCK_MAX):
+    """
+    pmf[d] = probability the hit removes d HP points.
+    base: CO-adjusted base damage; luck_scale: the defender's CO defense multiplier applied to the luck roll.
+    attacker_hp: 0-10 (or 0-100), scaled by displayed HP like the base damage.
+    """
+    pmf = [0.0] * (MAX_HP + 1)
+    if base == 0:
+        pmf[0] = 1.0
+        return pmf
+    a_hp = attacker_hp if attacker_hp <= 10 else attacker_hp / 10
+    scale = math.ceil(a_hp) / 10.0 * terrain_factor
+    p = 1.0 / (luck_max + 1)
+    for roll in range(luck_max + 1):
+        # Damage is truncated to whole HP points; the epsilon keeps 64.99999... from dropping a point
+        d = int((base + roll * luck_scale) * scale + 1e-9)
+        pmf[min(max(d, 0), MAX_HP)] += p
+    return pmf
+
+def convolve(p, q, cap=MAX_HP):
+    """Distribution of the sum of two independent hits, with everything at or above cap lumped into cap."""
+    out = [0.0] * (cap + 1)
+    q_support = [(j, qj) for j, qj in enumerate(q) if qj]
+    for i, pi in enumerate(p):
+        if not pi: continue
+        for j, qj in q_support:
+            out[min(i + j, cap)] += pi * qj
+    return out
+
+def kill_probability(pmfs, hp):
+    """Probability that the hits together remove at least hp points (every attacker hits the same victim)."""
+    hp = int(math.ceil(hp))
+    if hp <= 0: return 1.0
+    total = [1.0] + [0.0] * hp
+    for pmf in pmfs:
+        total = convolve(total, pmf, cap=hp)
+    return total[hp]
+
+def summarize(pmf, victim_hp):
+    """min/max damage, kill chance and the victim's displayed HP afterwards (displayed HP -> probability)."""
+    support = [d for d, p in enumerate(pmf) if p]
+    remaining = {}
+    for d in support:
+        left = max(0, victim_hp - d)
+        shown = math.ceil(left / 10)
+        remaining[shown] = remaining.get(shown, 0.0) + pmf[d]
+    return {
+        "min": support[0],
+        "max": support[-1],
+        "kill_probability": round(sum(pmf[d] for d in support if d >= victim_hp), 3),
+        "remaining_hp": {k: round(v, 3) for k, v in sorted(remaining.items())}
+    }
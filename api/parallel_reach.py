@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import deque, OrderedDict
+
+from game_logic import MOVE_COSTS, compile_cost_grid
+
+# Worker processes for reachability (0 = always serial). Off by default: serverless instances are usually single-core.
+REACH_WORKERS = int(os.environ.get("WARS_ORACLE_REACH_WORKERS", "0"))
+
+# Below this many pathfinding jobs, pool overhead outweighs the gain and we stay serial.
+PARALLEL_MIN_JOBS = int(os.environ.get("WARS_ORACLE_PARALLEL_MIN_JOBS", "60"))
+
+# Pools kept alive at once, one per (map cost grids, worker count); the least recently used one is retired
+REACH_POOLS = max(1, int(os.environ.get("WARS_ORACLE_REACH_POOLS", "2")))
+
+_pools = OrderedDict() # key -> {"pool", "users": requests submitting to it, "retired": evicted, shut down when unused}
+_pools_lock = threading.Lock()
+
+# Set in each worker by _init_worker: move_type -> bytes cost grid, plus map size
+_grids = None
+_width = 0
+_height = 0
+
+def compile_cost_grids(grid, width, height, move_types):
+    """One compact bytes grid per movement type (costs are all < 256)."""
+    return {m: bytes(min(c, 255) for c in compile_cost_grid(grid, m, width, height)) for m in move_types}
+
+def reachable_on_grid(start_x, start_y, move_points, cost_grid, width, height, blocking_idx):
+    """
+    get_reachable_cells over a compiled cost grid. Returns the same set of (x, y).
+    blocking_idx: set of flat indices (y * width + x) that can't be entered.
+    """
+    start = start_y * width + start_x
+    best = {start: move_points}
+    queue = deque([start])
+    while queue:
+        idx = queue.popleft()
+        mp = best[idx]
+        x, y = idx % width, idx // width
+        for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+            if 0 <= nx < width and 0 <= ny < height:
+                n = ny * width + nx
+                if n in blocking_idx: continue
+                left = mp - cost_grid[n]
+                if left >= 0 and left > best.get(n, -1):
+                    best[n] = left
+                    queue.append(n)
+    return {(idx % width, idx // width) for idx in best}
+
+def _init_worker(grids, width, height):
+    global _grids, _width, _height
+    _grids, _width, _height = grids, width, height
+
+def _run_chunk(blocking_idx, jobs):
+    return [(key, reachable_on_grid(x, y, mp, _grids[m], _width, _height, blocking_idx)) for key, x, y, mp, m in jobs]
+
+def _acquire_pool(grids, width, height, workers):
+    """
+    Workers receive the cost grids once, at start-up, and are reused for as long as their map stays among the
+    REACH_POOLS most recent ones, so requests alternating between two games don't respawn workers each time.
+    Every _acquire_pool must be paired with _release_pool: an evicted pool is only shut down once nobody submits to it.
+    """
+    # Imported here: multiprocessing is slow to import and serial requests never need it
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    key = (width, height, workers, tuple(sorted((m, hash(g)) for m, g in grids.items())))
+    idle = []
+    with _pools_lock:
+        slot = _pools.get(key)
+        if slot is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(grids, width, height))
+            slot = _pools[key] = {"pool": pool, "users": 0, "retired": False}
+        _pools.move_to_end(key)
+        slot['users'] += 1
+        while len(_pools) > REACH_POOLS:
+            _, old = _pools.popitem(last=False)
+            old['retired'] = True
+            if old['users'] == 0: idle.append(old['pool'])
+    for pool in idle: pool.shutdown(wait=False)
+    return slot
+
+def _release_pool(slot):
+    with _pools_lock:
+        slot['users'] -= 1
+        idle = slot['retired'] and slot['users'] == 0
+    if idle: slot['pool'].shutdown(wait=False)
+
+def compute_reachability(jobs, grid, width, height, workers=None):
+    """
+    Reachable cells for many units at once.
+    jobs: list of (key, x, y, move_points, move_type, blocking_cells). Jobs sharing one blocking_cells object
+          are shipped together so each blocking set is sent once per chunk.
+    Returns {key: set of (x, y)}, identical whether run serially or on the pool.
+    """
+    if workers is None: workers = REACH_WORKERS
+    parallel = workers > 1 and len(jobs) >= PARALLEL_MIN_JOBS
+    # The pool keeps every movement type so it survives requests that need different ones on the same map
+    move_types = {j[4] for j in jobs}
+    if parallel: move_types |= set(MOVE_COSTS)
+    grids = compile_cost_grids(grid, width, height, move_types)
+
+    # Group by blocking set identity (callers pass the same set object for one side)
+    groups = {}
+    for key, x, y, mp, m, blocking in jobs:
+        if id(blocking) not in groups:
+            groups[id(blocking)] = ({by * width + bx for (bx, by) in blocking}, [])
+        groups[id(blocking)][1].append((key, x, y, mp, m))
+
+    results = {}
+    if not parallel:
+        for blocking_idx, group in groups.values():
+            for key, x, y, mp, m in group:
+                results[key] = reachable_on_grid(x, y, mp, grids[m], width, height, blocking_idx)
+        return results
+
+    slot = _acquire_pool(grids, width, height, workers)
+    try:
+        futures = []
+        for blocking_idx, group in groups.values():
+            chunk = max(1, len(group) // (workers * 2))
+            for i in range(0, len(group), chunk):
+                futures.append(slot['pool'].submit(_run_chunk, blocking_idx, group[i:i + chunk]))
+        for f in futures:
+            for key, cells in f.result():
+                results[key] = cells
+    finally:
+        _release_pool(slot)
+    return results
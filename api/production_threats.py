@@ -0,0 +1,109 @@
+"""
+Latent threats: units an enemy can build at its bases, airports and ports, and what they could hit on their
+first move.
+
+A unit built on the enemy's turn acts on its next one, so these are next-turn threats like ferried attackers. Which
+types are buildable comes from the owner's funds at their next build (see economy_forecast.starting_funds) and their
+CO's cost multiplier; a facility an opposing unit stands on can't build.
+
+Coverage only depends on terrain: the tiles a unit fresh out of (x, y) can attack with a given move, movement type
+and range. It is computed once per (map, facility tile, movement profile) and kept across turns and requests, as
+an int bitmask (bit y * width + x). Other units are ignored, so coverage is the enemy's best case. Combining dozens
+of hypothetical attackers with our unit positions and with the live threats is then bitwise AND/OR on those masks;
+only tiles that survive the AND are looked at one by one.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from game_logic import get_reachable_cells
+from damage_table import unit_class
+from economy_forecast import PRODUCTION
+
+COVERAGE_CACHE_SIZE = int(os.environ.get("WARS_ORACLE_COVERAGE_CACHE_SIZE", "4096"))
+
+_coverage = OrderedDict() # (map_id, width, height, x, y, move, move type, min range, max range) -> bitmask
+_coverage_lock = threading.Lock()
+
+def tile_mask(tiles, width):
+    mask = 0
+    for x, y in tiles:
+        mask |= 1 << (y * width + x)
+    return mask
+
+def iter_tiles(mask, width):
+    """(x, y) of every set bit, lowest index first."""
+    while mask:
+        low = mask & -mask
+        idx = low.bit_length() - 1
+        yield idx % width, idx // width
+        mask ^= low
+
+def compute_coverage(game_map, width, height, x, y, move, move_type, min_rng, max_rng):
+    """Bitmask of the tiles a unit starting on (x, y) can attack this turn: directs move then strike, indirects fire from (x, y)."""
+    mask = 0
+    if max_rng <= 1:
+        for rx, ry in get_reachable_cells(x, y, move, move_type, game_map, width, height):
+            for tx, ty in ((rx, ry + 1), (rx, ry - 1), (rx + 1, ry), (rx - 1, ry)):
+                if 0 <= tx < width and 0 <= ty < height: mask |= 1 << (ty * width + tx)
+        return mask
+    for dy in range(-max_rng, max_rng + 1):
+        for dx in range(-max_rng, max_rng + 1):
+            tx, ty = x + dx, y + dy
+            if min_rng <= abs(dx) + abs(dy) <= max_rng and 0 <= tx < width and 0 <= ty < height:
+                mask |= 1 << (ty * width + tx)
+    return mask
+
+def coverage(game_map, width, height, map_id, x, y, u_stats):
+    """compute_coverage for a unit type's stats, cached by map id (uncached when map_id is None)."""
+    move, move_type = u_stats.get('move', 3), u_stats.get('type', 'foot')
+    min_rng, max_rng = u_stats.get('range', [1, 1])
+    if map_id is None:
+        return compute_coverage(game_map, width, height, x, y, move, move_type, min_rng, max_rng)
+    key = (map_id, width, height, x, y, move, move_type, min_rng, max_rng)
+    with _coverage_lock:
+        mask = _coverage.get(key)
+        if mask is not None:
+            _coverage.move_to_end(key)
+            return mask
+    mask = compute_coverage(game_map, width, height, x, y, move, move_type, min_rng, max_rng)
+    with _coverage_lock:
+        _coverage[key] = mask
+        while len(_coverage) > COVERAGE_CACHE_SIZE: _coverage.popitem(last=False)
+    return mask
+
+def buildable_attackers(facility, funds, units_rules, table, cost_multiplier=1.0):
+    """Unit types the facility builds that the owner can afford and that can attack something."""
+    out = []
+    for t, s in units_rules.items():
+        if unit_class(t, s) not in PRODUCTION[facility]: continue
+        if round(table.cost.get(t, 0) * cost_multiplier) > funds: continue
+        if s.get('range', [1, 1])[1] < 1 or not any(table.base.get(t, {}).values()): continue
+        out.append(t)
+    return out
+
+def find_production_threats(game_map, width, height, map_id, facilities, victims, units_rules, damage, live_mask=0):
+    """
+    facilities: (owner slot, facility type, x, y, buildable unit types) per enemy facility that can build now.
+    victims: (x, y) -> our unit. damage(unit type, owner slot, victim) -> damage_pct.
+    live_mask: tiles the units already on the board can attack.
+    Returns (hits, exposed): the most damaging buildable type per (facility, victim) it can hurt, as
+    (facility entry, unit type, victim, damage), and the bitmask of victim tiles only production threatens.
+    """
+    victim_mask = tile_mask(victims, width)
+    covered = 0
+    hits = []
+    for entry in facilities:
+        owner, _, x, y, types = entry
+        best = {} # victim id -> (damage, unit type, victim)
+        for t in types:
+            hit = coverage(game_map, width, height, map_id, x, y, units_rules[t]) & victim_mask
+            for tile in iter_tiles(hit, width):
+                victim = victims[tile]
+                dmg = damage(t, owner, victim)
+                if dmg > 0 and dmg > best.get(victim['id'], (0,))[0]:
+                    best[victim['id']] = (dmg, t, victim)
+        for dmg, t, victim in best.values():
+            covered |= 1 << (victim['position']['y'] * width + victim['position']['x'])
+            hits.append((entry, t, victim, dmg))
+    return hits, covered & ~live_mask
@@ -0,0 +1,237 @@
+"""
+Frozen reference implementations of the core analysis semantics.
+
+These are the original straightforward versions of get_reachable_cells, calculate_damage, analyze_threats and
+analyze_captures, kept exactly as they behaved before any optimization, plus plain definitions of what the
+multi-turn capture code computes: turns to each property by walking forward one turn at a time
+(distance_fields.py searches backwards from the properties), and the best capture assignment by textbook
+min-cost flow (capture_planner.py uses the Hungarian algorithm). The optimized engines in the rest of api/ must
+reproduce their results; differential.py checks that on random boards.
+
+Do not optimize or "fix" anything in this file. A deliberate change of semantics goes into the engines together
+with a matching change here, in the same commit, so the harness keeps comparing like with like.
+Only the movement cost and terrain character tables are shared with game_logic: they are data, not behaviour.
+"""
+import math
+from collections import deque
+
+from game_logic import MOVE_COSTS, TERRAIN_MAP
+
+CAPTURABLE = ['city', 'base', 'airport', 'port', 'hq', 'lab', 'comTower']
+CAPTURE_HORIZON = 5
+
+def get_terrain_type(cell):
+    if isinstance(cell, dict):
+        t = cell.get('type', 'plain')
+        if t == 'forest': return 'wood'
+        if t == 'beach': return 'shoal'
+        if t == 'bridge': return 'road'
+        if t == 'lab': return 'city'
+        if t == 'comTower': return 'city'
+        return t
+    return TERRAIN_MAP.get(cell, 'plain')
+
+def get_reachable_cells(start_x, start_y, move_points, move_type, grid, width, height, blocking_cells=None):
+    """Set of (x, y) the unit can reach; blocking_cells can't be entered at all."""
+    if blocking_cells is None: blocking_cells = set()
+    visited = {(start_x, start_y): move_points}
+    queue = deque([(start_x, start_y, move_points)])
+    valid_destinations = {(start_x, start_y)}
+    costs = MOVE_COSTS.get(move_type, MOVE_COSTS['foot'])
+
+    while queue:
+        cx, cy, current_mp = queue.popleft()
+        for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+            nx, ny = cx + dx, cy + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                cost = costs.get(get_terrain_type(grid[ny][nx]), 1)
+                if (nx, ny) in blocking_cells: cost = 999
+                if cost <= current_mp:
+                    new_mp = current_mp - cost
+                    if new_mp > visited.get((nx, ny), -1):
+                        visited[(nx, ny)] = new_mp
+                        valid_destinations.add((nx, ny))
+                        queue.append((nx, ny, new_mp))
+    return valid_destinations
+
+def calculate_damage(attacker_type, defender_type, attacker_hp, defender_hp, defender_terrain, rules):
+    """Damage percentage without luck or CO modifiers. HP on the 0-10 or 0-100 scale."""
+    a_hp = attacker_hp if attacker_hp <= 10 else attacker_hp / 10
+    base_dmg = rules.get("matchups", {}).get(attacker_type, {}).get(defender_type, 0)
+    if base_dmg == 0: return 0
+
+    t_type = get_terrain_type(defender_terrain) if isinstance(defender_terrain, dict) else defender_terrain
+    terrain_stars = rules.get("terrain_defense", {}).get(t_type, 0)
+    if rules.get("units", {}).get(defender_type, {}).get("type", "ground") == "air":
+        terrain_stars = 0
+
+    attack_power = base_dmg * math.ceil(a_hp) / 10.0
+    defense_factor = (100 - (terrain_stars * 10)) / 100.0
+    return round(attack_power * defense_factor, 1)
+
+def _teams(metadata):
+    teams = {}
+    for team_name, team_data in (metadata or {}).get('teams', {}).items():
+        for p in team_data.get('players', []):
+            teams[p['slot']] = team_name
+    return teams
+
+def _team(teams, slot):
+    return teams.get(slot, str(slot)) if teams else str(slot)
+
+def analyze_threats(game_map, units, rules, metadata, target_slot):
+    """Every (enemy, our unit) pair the enemy can hit this turn, with plain damage, sorted by damage descending."""
+    height = len(game_map)
+    width = len(game_map[0]) if height else 0
+    teams = _teams(metadata)
+    my_team = _team(teams, target_slot)
+    enemy_units = [u for u in units if _team(teams, u['playerSlot']) != my_team]
+    my_unit_positions = {(u['position']['x'], u['position']['y']): u for u in units if u['playerSlot'] == target_slot}
+    blocking = {(u['position']['x'], u['position']['y']) for u in units}
+
+    threats = []
+    for enemy in enemy_units:
+        e_type = enemy['type']
+        ex, ey = enemy['position']['x'], enemy['position']['y']
+        e_stats = rules.get("units", {}).get(e_type, {})
+        min_rng, max_rng = e_stats.get('range', [1, 1])
+
+        attackable = set()
+        if max_rng == 1:
+            reachable = get_reachable_cells(ex, ey, e_stats.get('move', 3), e_stats.get('type', 'foot'), game_map, width, height, blocking)
+            for rx, ry in reachable:
+                for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+                    if (rx + dx, ry + dy) in my_unit_positions:
+                        attackable.add((rx + dx, ry + dy))
+        else:
+            # Indirects fire from where they stand
+            for dy in range(-max_rng, max_rng + 1):
+                for dx in range(-max_rng, max_rng + 1):
+                    if min_rng <= abs(dx) + abs(dy) <= max_rng and (ex + dx, ey + dy) in my_unit_positions:
+                        attackable.add((ex + dx, ey + dy))
+
+        for tx, ty in attackable:
+            victim = my_unit_positions[(tx, ty)]
+            dmg = calculate_damage(e_type, victim['type'], enemy['stats']['hp'], victim['stats']['hp'], game_map[ty][tx], rules)
+            threats.append({
+                "attacker": {"type": e_type, "id": enemy['id'], "pos": [ex, ey], "player": enemy['playerSlot']},
+                "victim": {"type": victim['type'], "id": victim['id'], "pos": [tx, ty]},
+                "damage_pct": dmg
+            })
+    threats.sort(key=lambda x: x['damage_pct'], reverse=True)
+    return threats
+
+def analyze_captures(game_map, units, rules, metadata, target_slot):
+    """Properties each of our infantry/mechs can end its move on this turn (enemies block, no ending on units)."""
+    height = len(game_map)
+    width = len(game_map[0]) if height else 0
+    teams = _teams(metadata)
+    my_team = _team(teams, target_slot)
+    blocking = {(u['position']['x'], u['position']['y']) for u in units if _team(teams, u['playerSlot']) != my_team}
+    occupied = {(u['position']['x'], u['position']['y']) for u in units}
+
+    captures = []
+    for u in units:
+        if u['playerSlot'] != target_slot or u['type'] not in ['infantry', 'mech']: continue
+        ux, uy = u['position']['x'], u['position']['y']
+        u_stats = rules.get("units", {}).get(u['type'], {})
+        reachable = get_reachable_cells(ux, uy, u_stats.get('move', 3), u_stats.get('type', 'foot'), game_map, width, height, blocking)
+        for rx, ry in reachable:
+            if (rx, ry) in occupied and (rx, ry) != (ux, uy): continue
+            cell = game_map[ry][rx]
+            if cell.get('type') in CAPTURABLE and cell.get('player', -1) != target_slot:
+                captures.append({
+                    "unit_id": u['id'],
+                    "pos": [rx, ry],
+                    "property_type": cell.get('type'),
+                    "current_owner": cell.get('player', -1),
+                    "turns_to_reach": 1
+                })
+    return captures
+
+def _reachable_from(starts, move_points, move_type, grid, width, height, blocking_cells):
+    """Every tile some unit starting on one of starts can reach this turn."""
+    out = set()
+    for x, y in starts:
+        out |= get_reachable_cells(x, y, move_points, move_type, grid, width, height, blocking_cells)
+    return out
+
+def capture_turns_to_reach(game_map, units, rules, metadata, target_slot, max_turns=CAPTURE_HORIZON):
+    """
+    {(unit id, (px, py)): turns} for each of our infantry/mechs and each property we don't own that isn't under an
+    enemy unit: the first turn (1 = this one) on which the unit can stand on it, moving a full turn at a time with
+    enemies blocking. Other units' tiles count as places to stop. Properties beyond max_turns are left out.
+    """
+    height = len(game_map)
+    width = len(game_map[0]) if height else 0
+    teams = _teams(metadata)
+    my_team = _team(teams, target_slot)
+    blocking = {(u['position']['x'], u['position']['y']) for u in units if _team(teams, u['playerSlot']) != my_team}
+    properties = [(x, y) for y, row in enumerate(game_map) for x, cell in enumerate(row)
+                  if cell.get('type') in CAPTURABLE and cell.get('player', -1) != target_slot and (x, y) not in blocking]
+
+    turns = {}
+    for u in units:
+        if u['playerSlot'] != target_slot or u['type'] not in ['infantry', 'mech']: continue
+        u_stats = rules.get("units", {}).get(u['type'], {})
+        frontier = {(u['position']['x'], u['position']['y'])}
+        for t in range(1, max_turns + 1):
+            frontier = _reachable_from(frontier, u_stats.get('move', 3), u_stats.get('type', 'foot'), game_map, width, height, blocking)
+            for p in properties:
+                if p in frontier and (u['id'], p) not in turns: turns[(u['id'], p)] = t
+    return turns
+
+def capture_turns(hp, capture_rate=1.0):
+    """Turns on the tile to take a 20-point property, removing displayed HP (times capture_rate) per turn."""
+    d_hp = math.ceil(hp if hp <= 10 else hp / 10)
+    per_turn = math.floor(d_hp * capture_rate)
+    if per_turn <= 0: return None
+    return math.ceil(20 / per_turn)
+
+def best_capture_assignment(game_map, units, rules, metadata, target_slot, max_turns=CAPTURE_HORIZON):
+    """
+    (capturers assigned, total turns) of the best plan: as many of our infantry/mechs as possible each on a distinct
+    reachable property, and among those the least total of turns to reach + turns to capture - 1.
+    Successive shortest paths (Bellman-Ford) on the capturer -> property flow network; no CO capture bonus.
+    """
+    turns = capture_turns_to_reach(game_map, units, rules, metadata, target_slot, max_turns)
+    hp = {u['id']: u['stats']['hp'] for u in units}
+    rows = sorted({uid for uid, _ in turns})
+    cols = sorted({p for _, p in turns})
+    # Nodes: 0 source, 1 sink, then rows, then columns
+    n_nodes = 2 + len(rows) + len(cols)
+    edges = [] # [to, capacity, cost, index of reverse edge]
+    graph = [[] for _ in range(n_nodes)]
+    def add(a, b, cost):
+        graph[a].append(len(edges)); edges.append([b, 1, cost, len(edges) + 1])
+        graph[b].append(len(edges)); edges.append([a, 0, -cost, len(edges) - 1])
+    for r, uid in enumerate(rows):
+        add(0, 2 + r, 0)
+        ct = capture_turns(hp[uid])
+        for c, p in enumerate(cols):
+            if (uid, p) in turns and ct is not None: add(2 + r, 2 + len(rows) + c, turns[(uid, p)] + ct - 1)
+    for c in range(len(cols)): add(2 + len(rows) + c, 1, 0)
+
+    assigned = total = 0
+    while True:
+        dist = [math.inf] * n_nodes
+        via = [None] * n_nodes
+        dist[0] = 0
+        for _ in range(n_nodes):
+            changed = False
+            for a in range(n_nodes):
+                if dist[a] == math.inf: continue
+                for e in graph[a]:
+                    b, cap, cost, _ = edges[e]
+                    if cap and dist[a] + cost < dist[b]:
+                        dist[b], via[b], changed = dist[a] + cost, e, True
+            if not changed: break
+        if dist[1] == math.inf: return assigned, total
+        node = 1
+        while node != 0:
+            e = via[node]
+            edges[e][1] -= 1
+            edges[edges[e][3]][1] += 1
+            node = edges[edges[e][3]][0]
+        assigned += 1
+        total += dist[1]
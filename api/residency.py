@@ -0,0 +1,141 @@
+"""
+Memory accounting for everything kept hot per game: cached results and encoded bodies (response_cache), the
+GameAnalyzer of the last on-demand request (snapshots), raw map text in long-running workers.
+
+Each cache keeps its own data and reports every artifact here with its approximate size and a callback that drops
+it. When the total goes over WARS_ORACLE_MEMORY_BUDGET_MB, artifacts are evicted least recently used first until it
+fits again, so a large board's analyzer makes room by pushing out several small bodies rather than just one entry.
+Per-game footprint and eviction counts are served at /api/debug/residency.
+
+Callers must not hold their own cache lock when calling track(): eviction runs other caches' callbacks, which take
+their locks. Callbacks should check that the artifact they drop is still the one that was tracked.
+"""
+import os
+import sys
+import types
+import threading
+from itertools import islice
+from collections import deque, OrderedDict
+
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("WARS_ORACLE_MEMORY_BUDGET_MB", "256")) * 1024 * 1024)
+
+# Containers larger than this are measured on their first SAMPLE_SIZE items and scaled up
+SAMPLE_SIZE = 32
+
+_ATOMS = (str, bytes, bytearray, int, float, complex, bool, type(None), range)
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+def estimate_size(obj, exclude=()):
+    """
+    Approximate deep size of obj in bytes. Objects in exclude (shared ones such as the rules) and anything reachable
+    only through them are not counted; each object is counted once.
+    """
+    return _size(obj, {id(o) for o in exclude})
+
+def _size(obj, seen):
+    if id(obj) in seen: return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, _ATOMS) or isinstance(obj, _OPAQUE): return size
+    if isinstance(obj, dict):
+        n = len(obj)
+        sample = list(islice(obj.items(), SAMPLE_SIZE))
+        children = sum(_size(k, seen) + _size(v, seen) for k, v in sample)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        n = len(obj)
+        sample = list(islice(obj, SAMPLE_SIZE))
+        children = sum(_size(v, seen) for v in sample)
+    elif hasattr(obj, '__dict__'):
+        return size + _size(vars(obj), seen)
+    else:
+        return size
+    if sample and n > len(sample): children = children * n / len(sample)
+    return size + int(children)
+
+class ResidencyManager:
+    """Size-aware LRU over (owner, artifact) keys. The owner is a game id, or ("map", maps_id) for shared terrain."""
+    def __init__(self, budget_bytes=MEMORY_BUDGET_BYTES):
+        self.budget = budget_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # (owner, artifact) -> [size, on_evict]
+        self._evictions = {} # owner -> artifacts evicted so far
+        self.used = 0
+        self.peak = 0
+
+    def track(self, owner, artifact, size, on_evict):
+        """
+        Record (or re-measure) an artifact as just used. on_evict() drops it from its cache.
+        Evicts other artifacts as needed; one bigger than the whole budget is evicted straight away.
+        """
+        key = (owner, artifact)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self.used -= old[0]
+            self._entries[key] = [size, on_evict]
+            self.used += size
+            self.peak = max(self.peak, self.used)
+            evicted = self._evict_over_budget()
+        for callback in evicted: callback()
+
+    def touch(self, owner, artifact):
+        """Mark an artifact as used (a cache hit)."""
+        with self._lock:
+            if (owner, artifact) in self._entries: self._entries.move_to_end((owner, artifact))
+
+    def discard(self, owner, kind=None):
+        """Stop tracking an owner's artifacts (those whose artifact[0] == kind, if given) without calling on_evict."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == owner and (kind is None or k[1][0] == kind)]:
+                self.used -= self._entries.pop(key)[0]
+
+    def forget(self, owner, artifact):
+        """Stop tracking one artifact its cache has dropped by itself."""
+        with self._lock:
+            entry = self._entries.pop((owner, artifact), None)
+            if entry is not None: self.used -= entry[0]
+
+    def _evict_over_budget(self):
+        """Pops least recently used artifacts until within budget. Returns their callbacks, to run unlocked."""
+        callbacks = []
+        while self.used > self.budget and self._entries:
+            (owner, _), (size, on_evict) = self._entries.popitem(last=False)
+            self.used -= size
+            self._evictions[owner] = self._evictions.get(owner, 0) + 1
+            callbacks.append(on_evict)
+        return callbacks
+
+    def stats(self):
+        with self._lock:
+            games = {}
+            for (owner, artifact), (size, _) in self._entries.items():
+                g = games.setdefault(owner, {"bytes": 0, "artifacts": {}, "evictions": self._evictions.get(owner, 0)})
+                g['bytes'] += size
+                g['artifacts'][artifact[0]] = g['artifacts'].get(artifact[0], 0) + size
+            for owner, count in self._evictions.items():
+                games.setdefault(owner, {"bytes": 0, "artifacts": {}, "evictions": count})
+            return {
+                "budget_bytes": self.budget,
+                "used_bytes": self.used,
+                "peak_bytes": self.peak,
+                "artifacts": len(self._entries),
+                "evictions": sum(self._evictions.values()),
+                "games": [{"owner": owner if not isinstance(owner, tuple) else f"{owner[0]}:{owner[1]}", **g}
+                          for owner, g in sorted(games.items(), key=lambda kv: kv[1]['bytes'], reverse=True)]
+            }
+
+manager = ResidencyManager()
+
+def track(owner, artifact, size, on_evict):
+    manager.track(owner, artifact, size, on_evict)
+
+def touch(owner, artifact):
+    manager.touch(owner, artifact)
+
+def discard(owner, kind=None):
+    manager.discard(owner, kind)
+
+def forget(owner, artifact):
+    manager.forget(owner, artifact)
+
+def residency_stats():
+    return manager.stats()
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import deque, OrderedDict
+
+import residency
+
+# How long a computed analysis/context is served before we scrape again.
+# Turn events replace a game's entry as soon as the turn changes; the watcher refreshes it while nothing changes.
+CACHE_TTL_SECONDS = int(os.environ.get("WARS_ORACLE_CACHE_TTL", "120"))
+
+# Recent analyses kept per game so /analysis?since=<fingerprint> can answer with a diff.
+HISTORY_LENGTH = int(os.environ.get("WARS_ORACLE_HISTORY_LENGTH", "8"))
+
+# When set, entries live in one JSON file per game under this directory, so separate processes
+# (the API and api/watcher.py) share them. Unset = in-process only.
+CACHE_DIR = os.environ.get("WARS_ORACLE_CACHE_DIR")
+
+_lock = threading.Lock()
+_games = {} # game_id -> entry
+_history = {} # game_id -> deque of {"fingerprint", "analysis": {slot: analysis}}, oldest first
+_file_cache = {} # game_id -> ((mtime_ns, size), entry, history) for the directory backend
+_parsed = [] # _file_cache items filled under _lock and not yet reported to residency
+
+# Serialized (and compressed) response bodies, so repeated hits on a cached result never re-encode it.
+# In-process only, even with CACHE_DIR; keyed by snapshot fingerprint, so they can never go stale.
+ENCODED_LIMIT = int(os.environ.get("WARS_ORACLE_ENCODED_LIMIT", "256"))
+_encoded = OrderedDict() # (game_id, fingerprint, kind, slot, format, encoding) -> (body bytes, content-encoding)
+
+# Everything held in memory here is reported to residency with its size: results and history per game
+# (in-process backend), parsed files (directory backend) and encoded bodies. Calls to residency happen after
+# _lock is released, since its evictions come back here through the _drop_* callbacks.
+
+def snapshot_fingerprint(snapshot):
+    """Short stable hash of everything the analysis depends on (map, units, metadata)."""
+    payload = json.dumps([snapshot['map_id'], snapshot['units'], snapshot['metadata']], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+def _new_entry(fingerprint, metadata, kept_fresh=False):
+    # kept_fresh: published by a turn event or the watcher, which replace it when the board changes.
+    # Entries started by on-demand requests have nothing watching them and are only reused by fingerprint.
+    return {"fingerprint": fingerprint, "created": time.time(), "metadata": metadata, "analysis": {}, "context": {},
+            "kept_fresh": kept_fresh}
+
+# Storage. Slots are ints or None, which JSON object keys can't carry, so files store [slot, value] pairs.
+
+def _game_path(game_id):
+    return os.path.join(CACHE_DIR, f"{game_id}.json")
+
+def _read(game_id):
+    """(entry or None, history deque) for a game. Caller holds _lock."""
+    if not CACHE_DIR:
+        return _games.get(game_id), _history.get(game_id, deque(maxlen=HISTORY_LENGTH))
+    path = _game_path(game_id)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, deque(maxlen=HISTORY_LENGTH)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _file_cache.get(game_id)
+    if cached and cached[0] == stamp: return cached[1], cached[2]
+    try:
+        with open(path) as f: data = json.load(f)
+    except (OSError, ValueError):
+        return None, deque(maxlen=HISTORY_LENGTH)
+    entry = data.get("entry")
+    if entry is not None:
+        entry["analysis"] = {slot: v for slot, v in entry["analysis"]}
+        entry["context"] = {slot: v for slot, v in entry["context"]}
+    history = deque(({"fingerprint": h["fingerprint"], "analysis": {slot: v for slot, v in h["analysis"]}}
+                     for h in data.get("history", [])), maxlen=HISTORY_LENGTH)
+    _file_cache[game_id] = cached = (stamp, entry, history)
+    _parsed.append((game_id, cached))
+    return entry, history
+
+def _write(game_id, entry, history):
+    """Store a game's entry and history. Caller holds _lock."""
+    if not CACHE_DIR:
+        if entry is None: _games.pop(game_id, None)
+        else: _games[game_id] = entry
+        _history[game_id] = history
+        return
+    data = {
+        "entry": None if entry is None else {**entry, "analysis": list(entry["analysis"].items()),
+                                             "context": list(entry["context"].items())},
+        "history": [{"fingerprint": h["fingerprint"], "analysis": list(h["analysis"].items())} for h in history]
+    }
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _game_path(game_id)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f: json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp, path) # readers in other processes see the old file or the new one, never half of one
+    _file_cache.pop(game_id, None)
+    residency.forget(game_id, ("file",))
+
+def _remember(history, fingerprint, slot, analysis):
+    for item in history:
+        if item["fingerprint"] == fingerprint:
+            item["analysis"][slot] = analysis
+            return
+    history.append({"fingerprint": fingerprint, "analysis": {slot: analysis}})
+
+# Residency
+
+def _report_parsed():
+    """Track files parsed by _read since the last call. Caller must not hold _lock."""
+    while _parsed:
+        game_id, cached = _parsed.pop()
+        residency.track(game_id, ("file",), residency.estimate_size(cached), lambda g=game_id, c=cached: _drop_file(g, c))
+
+def _drop_file(game_id, cached):
+    with _lock:
+        if _file_cache.get(game_id) is cached: del _file_cache[game_id]
+
+def _track_result(game_id, kind, slot, value):
+    residency.track(game_id, (kind, slot), residency.estimate_size(value), lambda: _drop_result(game_id, kind, slot, value))
+
+def _drop_result(game_id, kind, slot, value):
+    with _lock:
+        entry = _games.get(game_id)
+        if entry is not None and entry[kind].get(slot) is value: del entry[kind][slot]
+
+def _track_history(game_id, history, entry):
+    # The newest analyses are the entry's own objects, already counted under ("analysis", slot)
+    size = residency.estimate_size(history, exclude=entry["analysis"].values())
+    residency.track(game_id, ("history",), size, lambda: _drop_history(game_id, history))
+
+def _drop_history(game_id, history):
+    with _lock:
+        if _history.get(game_id) is history: del _history[game_id]
+
+def _drop_encoded(key, body):
+    with _lock:
+        if _encoded.get(key) is body: del _encoded[key]
+
+# Public API
+
+def get_game(game_id, max_age=None):
+    """The cached entry for a game, or None if there is none or it is older than max_age (default CACHE_TTL_SECONDS)."""
+    if max_age is None: max_age = CACHE_TTL_SECONDS
+    with _lock:
+        entry, _ = _read(game_id)
+    _report_parsed()
+    if entry is None or time.time() - entry["created"] > max_age: return None
+    return entry
+
+def get_result(game_id, kind, slot):
+    """A cached 'analysis' or 'context' for one player slot (None = no target player), or None."""
+    entry = get_game(game_id)
+    if entry is None: return None
+    value = entry[kind].get(slot)
+    if value is not None and not CACHE_DIR: residency.touch(game_id, (kind, slot))
+    return value
+
+def publish(game_id, fingerprint, metadata, analyses=None, contexts=None):
+    """Replace a game's entry with freshly computed results for one snapshot (from a turn event or the watcher)."""
+    entry = _new_entry(fingerprint, metadata, kept_fresh=True)
+    entry["analysis"].update(analyses or {})
+    entry["context"].update(contexts or {})
+    with _lock:
+        _, history = _read(game_id)
+        for slot, analysis in (analyses or {}).items():
+            _remember(history, fingerprint, slot, analysis)
+        _write(game_id, entry, history)
+    _report_parsed()
+    if not CACHE_DIR:
+        residency.discard(game_id, "analysis")
+        residency.discard(game_id, "context")
+        for kind in ("analysis", "context"):
+            for slot, value in entry[kind].items(): _track_result(game_id, kind, slot, value)
+        _track_history(game_id, history, entry)
+    return entry
+
+def find_result(game_id, fingerprint, kind, slot):
+    """A result computed from this exact snapshot, whoever stored it and however old, or None."""
+    with _lock:
+        entry, _ = _read(game_id)
+    _report_parsed()
+    if entry is None or entry["fingerprint"] != fingerprint: return None
+    value = entry[kind].get(slot)
+    if value is not None and not CACHE_DIR: residency.touch(game_id, (kind, slot))
+    return value
+
+def store_result(game_id, fingerprint, metadata, kind, slot, value):
+    """
+    Add one on-demand result. It joins the current entry if that was built from the same snapshot,
+    otherwise it starts a new entry (the old one described a different board).
+    """
+    with _lock:
+        entry, history = _read(game_id)
+        replaced = entry is None or entry["fingerprint"] != fingerprint
+        if replaced:
+            entry = _new_entry(fingerprint, metadata)
+        entry[kind][slot] = value
+        if kind == "analysis": _remember(history, fingerprint, slot, value)
+        _write(game_id, entry, history)
+    _report_parsed()
+    if not CACHE_DIR:
+        if replaced:
+            residency.discard(game_id, "analysis")
+            residency.discard(game_id, "context")
+        _track_result(game_id, kind, slot, value)
+        if kind == "analysis": _track_history(game_id, history, entry)
+
+def touch(game_id, fingerprint):
+    """
+    Restart the TTL of a game's kept-fresh entry if it still matches this snapshot. Returns False if it doesn't, is
+    gone, or only holds on-demand results (which may cover some players only): the caller should publish instead.
+    """
+    with _lock:
+        entry, history = _read(game_id)
+        if entry is None or entry["fingerprint"] != fingerprint or not entry.get("kept_fresh"): return False
+        entry["created"] = time.time()
+        _write(game_id, entry, history)
+    _report_parsed()
+    return True
+
+def find_analysis(game_id, fingerprint, slot):
+    """A past analysis for this snapshot and slot, or None if it has aged out of the history."""
+    with _lock:
+        _, history = _read(game_id)
+        found = next((item["analysis"].get(slot) for item in history if item["fingerprint"] == fingerprint), None)
+    _report_parsed()
+    return found
+
+def invalidate(game_id):
+    """Drop the current results. History stays so clients can still get a diff from an older snapshot."""
+    with _lock:
+        entry, history = _read(game_id)
+        if entry is not None: _write(game_id, None, history)
+        for key in [k for k in _encoded if k[0] == game_id]: del _encoded[key]
+    _report_parsed()
+    for kind in ("analysis", "context", "encoded"): residency.discard(game_id, kind)
+
+def get_encoded(key):
+    """A stored (body, content-encoding) for (game_id, fingerprint, kind, slot, format, encoding), or None."""
+    with _lock:
+        body = _encoded.get(key)
+        if body is not None: _encoded.move_to_end(key)
+    if body is not None: residency.touch(key[0], ("encoded",) + key[1:])
+    return body
+
+def store_encoded(key, body):
+    with _lock:
+        _encoded[key] = body
+        _encoded.move_to_end(key)
+        dropped = []
+        while len(_encoded) > ENCODED_LIMIT:
+            dropped.append(_encoded.popitem(last=False)[0])
+    for k in dropped: residency.forget(k[0], ("encoded",) + k[1:])
+    residency.track(key[0], ("encoded",) + key[1:], residency.estimate_size(body), lambda: _drop_encoded(key, body))
@@ -0,0 +1,192 @@
+"""
+Response formats and content encodings for /analysis and /context.
+
+Formats (Accept header, or ?format= which wins):
+    json      application/json, the plain analysis.
+    columnar  application/vnd.wars-oracle.columnar+json: every list of objects (threats, captures, ...) becomes
+              {"columns": [...], "rows": [[...], ...]}. Nested objects are flattened into dotted column names
+              ("attacker.type"). When some entries lack keys others have (optional fields such as via_transport),
+              the table also has "present": one hex bitmap per row, bit i set when column i is present, so a missing
+              key (null cell, bit clear) and an explicit null (bit set) stay distinct. from_columnar undoes it all.
+    msgpack   application/msgpack, the plain analysis. Only offered when the msgpack package is installed.
+Encodings (Accept-Encoding): br when the brotli package is installed, then gzip. Bodies under MIN_COMPRESS_BYTES
+are sent as they are.
+
+Round-trip self-check of the columnar format on sample and random analyses:
+    python api/response_encoding.py [--cases 50]
+"""
+import sys
+import json
+import gzip
+import argparse
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLUMNAR_TYPE = "application/vnd.wars-oracle.columnar+json"
+MIME_TYPES = {"json": "application/json", "columnar": COLUMNAR_TYPE, "msgpack": "application/msgpack"}
+ACCEPT_ALIASES = {"application/x-msgpack": "msgpack"}
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def available_formats():
+    return [f for f in MIME_TYPES if f != "msgpack" or msgpack is not None]
+
+def available_encodings():
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+def parse_quality_list(header):
+    """'a;q=0.5, b' -> [('b', 1.0), ('a', 0.5)], best first; entries with q=0 are dropped. Ties keep header order."""
+    items = []
+    for i, part in enumerate((header or "").split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]: continue
+        q = 1.0
+        for f in fields[1:]:
+            if f.startswith("q="):
+                try: q = float(f[2:])
+                except ValueError: q = 0.0
+        if q > 0: items.append((fields[0].lower(), q, i))
+    items.sort(key=lambda t: (-t[1], t[2]))
+    return [(name, q) for name, q, _ in items]
+
+def negotiate_format(accept, requested=None):
+    """The format to send: ?format= if supported, else the best supported Accept type, else json."""
+    formats = available_formats()
+    if requested in formats: return requested
+    by_type = {MIME_TYPES[f]: f for f in formats}
+    for mime, _ in parse_quality_list(accept):
+        fmt = by_type.get(mime) or ACCEPT_ALIASES.get(mime)
+        if fmt in formats: return fmt
+    return "json"
+
+def negotiate_encoding(accept_encoding):
+    """'br', 'gzip' or None (identity). Among encodings the client rates equally, ours are tried in preference order."""
+    accepted = dict(parse_quality_list(accept_encoding))
+    if "*" in accepted:
+        for enc in available_encodings(): accepted.setdefault(enc, accepted["*"])
+    best = None
+    for enc in available_encodings():
+        if enc in accepted and (best is None or accepted[enc] > accepted[best]): best = enc
+    return best
+
+def _flatten(entry, prefix, out):
+    for k, v in entry.items():
+        # An empty object has no columns of its own, so it is kept whole as a cell
+        if isinstance(v, dict) and v:
+            _flatten(v, f"{prefix}{k}.", out)
+        else:
+            out[prefix + k] = v
+    return out
+
+def to_table(entries):
+    """A list of objects as {"columns", "rows"[, "present"]}; columns are in order of first appearance."""
+    flat = [_flatten(e, "", {}) for e in entries]
+    columns = {}
+    for f in flat:
+        for k in f: columns.setdefault(k, len(columns))
+    table = {"columns": list(columns), "rows": [[f.get(c) for c in columns] for f in flat]}
+    if any(len(f) != len(columns) for f in flat):
+        table["present"] = [format(sum(1 << columns[k] for k in f), "x") for f in flat]
+    return table
+
+def _is_table(value):
+    return isinstance(value, dict) and set(value) in ({"columns", "rows"}, {"columns", "rows", "present"})
+
+def from_table(table):
+    """The list of objects to_table was given."""
+    columns = [c.split(".") for c in table["columns"]]
+    present = table.get("present")
+    entries = []
+    for i, row in enumerate(table["rows"]):
+        bits = int(present[i], 16) if present is not None else -1
+        entry = {}
+        for j, (path, v) in enumerate(zip(columns, row)):
+            if not bits >> j & 1: continue
+            node = entry
+            for k in path[:-1]: node = node.setdefault(k, {})
+            node[path[-1]] = v
+        entries.append(entry)
+    return entries
+
+def to_columnar(value):
+    """Every list of objects inside value (at any depth outside the tables themselves) converted with to_table."""
+    if isinstance(value, dict):
+        return {k: to_columnar(v) for k, v in value.items()}
+    if isinstance(value, list) and value and all(isinstance(e, dict) for e in value):
+        return to_table(value)
+    return value
+
+def from_columnar(value):
+    """Inverse of to_columnar."""
+    if _is_table(value): return from_table(value)
+    if isinstance(value, dict):
+        return {k: from_columnar(v) for k, v in value.items()}
+    return value
+
+def serialize(value, fmt):
+    """Body bytes for a JSON-able value (or a str for text responses, sent as UTF-8 regardless of format)."""
+    if isinstance(value, str): return value.encode()
+    if fmt == "msgpack":
+        # Slots are int keys in memory but strings once they have been through the JSON cache; msgpack needs one kind
+        return msgpack.packb(json.loads(json.dumps(value)))
+    if fmt == "columnar": value = to_columnar(value)
+    return json.dumps(value, separators=(',', ':')).encode()
+
+def compress(body, encoding):
+    """(body, content-encoding actually applied)."""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES: return body, None
+    if encoding == "br": return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+
+def encode(value, fmt, encoding):
+    body = serialize(value, fmt)
+    return compress(body, encoding)
+
+# Self-check
+
+SAMPLE = {
+    "threats": [
+        {"attacker": {"type": "tank", "id": 7, "pos": [1, 2], "player": 1}, "victim": {"type": "infantry", "id": 3, "pos": [1, 3]},
+         "damage_pct": 75.0},
+        {"attacker": {"type": "infantry", "id": 9, "pos": [4, 4], "player": 1}, "victim": {"type": "apc", "id": 4, "pos": [5, 5]},
+         "damage_pct": 14.0, "next_turn": True, "via_transport": {"type": "apc", "id": 11}},
+        {"attacker": {"type": "artillery", "id": None, "pos": [8, 1], "player": 1}, "victim": {"type": "tank", "id": 5, "pos": [8, 3]},
+         "damage_pct": 45.0, "next_turn": True, "via_production": {"facility": "base", "cost": 6000, "only_threat": False}},
+        {"attacker": {"type": "mech", "id": 2, "pos": [0, 0], "player": 1}, "victim": {"type": "mech", "id": 6, "pos": [0, 1]},
+         "damage_pct": 55.0, "via_transport": None, "extra": {}},
+    ],
+    "captures": [],
+    "advice": ["x"],
+}
+
+def _round_trips(value):
+    """to_columnar -> JSON -> from_columnar gives value back (compared after the same JSON round trip)."""
+    plain = json.loads(json.dumps(value))
+    return from_columnar(json.loads(serialize(value, "columnar"))) == plain
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check that the columnar format round-trips analyses.")
+    parser.add_argument("--cases", type=int, default=50, help="random differential.py boards to analyze")
+    args = parser.parse_args()
+    failed = [] if _round_trips(SAMPLE) else ["sample"]
+
+    from differential import random_case, RULES_PATH
+    from analyzer import GameAnalyzer
+    with open(RULES_PATH) as f: base_rules = json.load(f)
+    for i in range(args.cases):
+        case = random_case("columnar", i, base_rules)
+        analyzer = GameAnalyzer(case['map'], case['units'], case['rules'], case['metadata'] or None)
+        for slot in sorted({u['playerSlot'] for u in case['units']}):
+            if not _round_trips(analyzer.get_full_analysis(slot)): failed.append(f"case {i} slot {slot}")
+    print(f"columnar round trip: sample + {args.cases} random boards, {len(failed)} failures {failed[:5]}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,144 @@
+"""
+Scraping one game snapshot and computing results from it.
+
+A snapshot can also be saved as a JSON file and analyzed later (history ingestion, batch runs):
+    python api/snapshots.py <game_id> [-o FILE]
+
+The GameAnalyzer of the last on-demand request per game is kept (within the residency budget) so another
+player's analysis or context for the same board reuses its pathfinding.
+
+The scraping modules (and requests behind them) are imported on first use, so offline users of this module
+(batch_analyze, history ingest) run without the web dependencies.
+"""
+import sys
+import json
+import argparse
+import threading
+
+import residency
+
+from map_converter import parse_map_csv
+
+_analyzers = {} # game_id -> (snapshot fingerprint, GameAnalyzer), analyzers not currently checked out
+_analyzers_lock = threading.Lock()
+
+def load_snapshot(game_id, priority=None, map_cache=None):
+    """
+    Scrapes everything the analysis needs for one game, at the given fetch_scheduler priority (default INTERACTIVE).
+    map_cache (maps_id -> raw map CSV) lets long-running callers skip refetching terrain, which never changes.
+    Returns (snapshot, None), or (None, (error message, status)) when the game can't be loaded.
+    Running out of fetch budget at any step is a 503: a partly scraped game is never returned as a snapshot.
+    """
+    from fetch_scheduler import INTERACTIVE, FetchRejected, FetchDropped
+    if priority is None: priority = INTERACTIVE
+    try:
+        return _scrape_snapshot(game_id, priority, map_cache)
+    except (FetchRejected, FetchDropped) as e:
+        return None, (f"AWBW request budget exhausted: {e}", 503)
+
+def _scrape_snapshot(game_id, priority, map_cache):
+    from fetch_map import fetch_map_id, fetch_awbw_map
+    from fetch_game_metadata import fetch_game_metadata
+    from unit_converter import fetch_units
+
+    map_id = fetch_map_id(game_id, priority)
+    if not map_id: return None, ("Could not determine Map ID", 404)
+
+    raw_map = map_cache.get(map_id) if map_cache is not None else None
+    if raw_map is None:
+        raw_map = fetch_awbw_map(map_id, priority)
+        if not raw_map: return None, ("Could not fetch map data", 500)
+        if map_cache is not None:
+            map_cache[map_id] = raw_map
+            residency.track(("map", map_id), ("raw_map",), residency.estimate_size(raw_map), lambda: map_cache.pop(map_id, None))
+    elif map_cache is not None:
+        residency.touch(("map", map_id), ("raw_map",))
+
+    metadata = fetch_game_metadata(game_id, priority)
+    if not metadata: return None, ("Could not fetch metadata", 500)
+    ownership = metadata.get('ownership', {})
+    game_map = parse_map_csv(raw_map, ownership)
+    units = fetch_units(game_id, priority)
+    return {"game_id": game_id, "map_id": map_id, "map": game_map, "units": units, "metadata": metadata}, None
+
+def active_slots(metadata):
+    return [p['slot'] for team in metadata['teams'].values() for p in team['players'] if not p.get('eliminated')]
+
+def make_analyzer(snapshot, rules):
+    from analyzer import GameAnalyzer
+    return GameAnalyzer(snapshot['map'], snapshot['units'], rules, snapshot['metadata'], map_id=snapshot['map_id'])
+
+def checkout_analyzer(snapshot, rules, fingerprint):
+    """
+    The kept analyzer for this game if it was built from the same snapshot, else a new one. It is removed from the
+    cache while in use, so concurrent requests never share one; hand it back with retain_analyzer().
+    """
+    game_id = snapshot['game_id']
+    with _analyzers_lock:
+        kept = _analyzers.get(game_id)
+        if kept is not None and kept[0] == fingerprint: del _analyzers[game_id]
+        else: kept = None
+    if kept is None: return make_analyzer(snapshot, rules)
+    residency.forget(game_id, ("analyzer",))
+    return kept[1]
+
+def retain_analyzer(game_id, fingerprint, analyzer):
+    """Keep an analyzer after use, measured with everything it has computed. The rules are shared, so not counted."""
+    with _analyzers_lock:
+        _analyzers[game_id] = kept = (fingerprint, analyzer)
+    size = residency.estimate_size(analyzer, exclude=(analyzer.rules,))
+    residency.track(game_id, ("analyzer",), size, lambda: _drop_analyzer(game_id, kept))
+
+def _drop_analyzer(game_id, kept):
+    with _analyzers_lock:
+        if _analyzers.get(game_id) is kept: del _analyzers[game_id]
+
+def discard_analyzer(game_id):
+    """Drop a game's kept analyzer (its board just changed)."""
+    with _analyzers_lock:
+        _analyzers.pop(game_id, None)
+    residency.forget(game_id, ("analyzer",))
+
+def compute_analyses(snapshot, rules, analyzer=None, sections=None, focus_fire_nodes=None):
+    """get_full_analysis (optionally only some sections, see there) for every live player, keyed by slot."""
+    if analyzer is None: analyzer = make_analyzer(snapshot, rules)
+    return {slot: analyzer.get_full_analysis(slot, sections, focus_fire_nodes) for slot in active_slots(snapshot['metadata'])}
+
+def compute_results(snapshot, rules):
+    """
+    Analysis for every live player and context for every player plus the neutral view (slot None).
+    One GameAnalyzer serves every slot so reachability is only computed once, and each context is rendered from
+    that slot's analysis rather than running get_full_analysis (and its anytime focus-fire search) again.
+    Returns (analyses, contexts), each keyed by slot.
+    """
+    from context_generator import generate_context
+
+    metadata = snapshot['metadata']
+    analyzer = make_analyzer(snapshot, rules)
+    slots = active_slots(metadata)
+    analyses = compute_analyses(snapshot, rules, analyzer)
+    contexts = {slot: generate_context(snapshot['map'], snapshot['units'], rules, metadata, slot,
+                                       map_id=snapshot['map_id'], analyzer=analyzer, analysis=analyses.get(slot))
+                for slot in slots + [None]}
+    return analyses, contexts
+
+def read_snapshot_file(path):
+    with open(path) as f: return json.load(f)
+
+def write_snapshot_file(snapshot, path):
+    with open(path, "w") as f: json.dump(snapshot, f, separators=(',', ':'))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Save one game snapshot as JSON.")
+    parser.add_argument("game_id", type=int)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+    from fetch_scheduler import BATCH
+    snapshot, error = load_snapshot(args.game_id, BATCH)
+    if error:
+        print(error[0], file=sys.stderr)
+        sys.exit(1)
+    if args.output:
+        write_snapshot_file(snapshot, args.output)
+    else:
+        json.dump(snapshot, sys.stdout, separators=(',', ':'))
@@ -0,0 +1,188 @@
+"""
+Per-map static distance tables (landmark / ALT lower bounds), persisted as raw files and memory-mapped on load.
+
+Terrain never changes for a given maps_id, so for each movement type we pick a few landmark tiles and store
+terrain-only movement costs from and to every landmark. By the triangle inequality these give admissible
+lower bounds on the movement cost between any two tiles, with units ignored (units only ever make paths longer).
+
+Tables are written to api/tables/<maps_id>/ by default and committed, so they ship with the deployment like
+compiled_tables.json: serverless instances start with an empty /tmp and can't build them per request. Each table
+records the MOVE_COSTS and terrain it was built from and is ignored once either changes; rebuild after editing
+MOVE_COSTS. Long-running hosts can point WARS_ORACLE_TABLE_DIR at a writable directory instead.
+
+Usage:
+    python api/static_tables.py <maps_id> [<maps_id> ...]   # precompute and save
+"""
+import os
+import sys
+import json
+import mmap
+import hashlib
+from array import array
+
+from game_logic import MOVE_COSTS, compile_cost_grid, get_terrain_type, move_costs_fingerprint
+
+TABLE_DIR = os.environ.get("WARS_ORACLE_TABLE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables"))
+TABLE_VERSION = 2
+LANDMARKS = 8
+
+UNREACHABLE = 0xFFFF
+IMPASSABLE = 99
+
+def _dijkstra(source, cost_grid, width, height, reverse=False):
+    """
+    Terrain-only movement cost from source to every tile (or, with reverse, from every tile to source).
+    Entry costs are small integers, so a bucket queue replaces the heap.
+    """
+    size = width * height
+    dist = array('H', [UNREACHABLE]) * size
+    dist[source] = 0
+    buckets = {0: [source]}
+    key = 0
+    pending = 1
+    while pending:
+        bucket = buckets.pop(key, None)
+        if not bucket:
+            key += 1
+            continue
+        for idx in bucket:
+            pending -= 1
+            if dist[idx] != key: continue
+            # Forward: stepping onto a neighbour pays its cost. Reverse: the neighbour steps onto idx and pays idx's.
+            step_here = cost_grid[idx]
+            if reverse and step_here >= IMPASSABLE and idx != source: continue
+            x, y = idx % width, idx // width
+            for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                if 0 <= nx < width and 0 <= ny < height:
+                    n = ny * width + nx
+                    step = step_here if reverse else cost_grid[n]
+                    if step >= IMPASSABLE: continue
+                    nd = key + step
+                    if nd < dist[n] and nd < UNREACHABLE:
+                        dist[n] = nd
+                        buckets.setdefault(nd, []).append(n)
+                        pending += 1
+        key += 1
+    return dist
+
+def _pick_landmarks(cost_grid, width, height, count):
+    """Farthest-point landmarks over passable tiles: each new landmark is the tile furthest from those chosen."""
+    passable = [i for i in range(width * height) if cost_grid[i] < IMPASSABLE]
+    if not passable: return []
+    landmarks = [passable[0]]
+    nearest = list(_dijkstra(passable[0], cost_grid, width, height))
+    while len(landmarks) < count:
+        # Prefer unreached tiles (another island) first, then the most distant one
+        far = max(passable, key=lambda i: nearest[i])
+        if far in landmarks: break
+        landmarks.append(far)
+        d = _dijkstra(far, cost_grid, width, height)
+        nearest = [min(a, b) for a, b in zip(nearest, d)]
+    return landmarks
+
+def terrain_fingerprint(grid):
+    """Digest of the terrain as movement sees it (after get_terrain_type's normalisation)."""
+    rows = ("".join(get_terrain_type(cell) + "," for cell in row) for row in grid)
+    return hashlib.sha1("\n".join(rows).encode()).hexdigest()
+
+def build_static_tables(map_id, grid, table_dir=TABLE_DIR, landmarks=LANDMARKS):
+    """Precompute and save ALT tables for every movement type of one map."""
+    height = len(grid)
+    width = len(grid[0]) if height > 0 else 0
+    out_dir = os.path.join(table_dir, str(map_id))
+    os.makedirs(out_dir, exist_ok=True)
+
+    meta = {"version": TABLE_VERSION, "width": width, "height": height, "byteorder": sys.byteorder,
+            "move_costs": move_costs_fingerprint(), "terrain": terrain_fingerprint(grid), "classes": {}}
+    for move_type in MOVE_COSTS:
+        cost_grid = compile_cost_grid(grid, move_type, width, height)
+        chosen = _pick_landmarks(cost_grid, width, height, landmarks)
+        data = array('H')
+        for l in chosen:
+            data.extend(_dijkstra(l, cost_grid, width, height)) # from landmark
+            data.extend(_dijkstra(l, cost_grid, width, height, reverse=True)) # to landmark
+        with open(os.path.join(out_dir, f"{move_type}.alt"), "wb") as f:
+            data.tofile(f)
+        meta["classes"][move_type] = {"landmarks": chosen}
+
+    # meta.json goes last: its presence marks the tables as complete
+    tmp = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp, "w") as f: json.dump(meta, f)
+    os.replace(tmp, os.path.join(out_dir, "meta.json"))
+    return load_static_tables(map_id, grid, table_dir)
+
+class StaticTables:
+    """Memory-mapped ALT tables for one map."""
+    def __init__(self, meta, out_dir):
+        self.width = meta["width"]
+        self.height = meta["height"]
+        self.size = self.width * self.height
+        self._tables = {} # move_type -> (landmark count, uint16 memoryview)
+        self._maps = []
+        for move_type, info in meta["classes"].items():
+            path = os.path.join(out_dir, f"{move_type}.alt")
+            count = len(info["landmarks"])
+            if count == 0 or not os.path.getsize(path): continue
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(mm)
+            self._tables[move_type] = (count, memoryview(mm).cast('H'))
+
+    def lower_bound(self, move_type, ax, ay, bx, by):
+        """
+        Admissible lower bound on the MP cost of moving from (ax, ay) to (bx, by).
+        Returns UNREACHABLE when the terrain alone makes the move impossible, 0 when nothing is known.
+        """
+        table = self._tables.get(move_type)
+        if table is None: return 0
+        count, data = table
+        a = ay * self.width + ax
+        b = by * self.width + bx
+        size = self.size
+        best = 0
+        for l in range(count):
+            base = 2 * l * size
+            fa, fb = data[base + a], data[base + b]
+            ta, tb = data[base + size + a], data[base + size + b]
+            # d(L,b) <= d(L,a) + d(a,b)  and  d(a,L) <= d(a,b) + d(b,L)
+            if fa != UNREACHABLE:
+                if fb == UNREACHABLE: return UNREACHABLE
+                if fb - fa > best: best = fb - fa
+            if tb != UNREACHABLE:
+                if ta == UNREACHABLE: return UNREACHABLE
+                if ta - tb > best: best = ta - tb
+        return best
+
+def load_static_tables(map_id, grid, table_dir=TABLE_DIR):
+    """Map the saved tables for map_id, or None if they are missing or were built from other costs or terrain."""
+    height = len(grid)
+    width = len(grid[0]) if height > 0 else 0
+    out_dir = os.path.join(table_dir, str(map_id))
+    try:
+        with open(os.path.join(out_dir, "meta.json")) as f: meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != TABLE_VERSION or meta.get("byteorder") != sys.byteorder: return None
+    if meta.get("width") != width or meta.get("height") != height: return None
+    if meta.get("move_costs") != move_costs_fingerprint() or meta.get("terrain") != terrain_fingerprint(grid): return None
+    try:
+        return StaticTables(meta, out_dir)
+    except (OSError, ValueError):
+        return None
+
+if __name__ == '__main__':
+    from fetch_map import fetch_awbw_map
+    from fetch_scheduler import BATCH
+    from map_converter import parse_map_csv
+
+    if len(sys.argv) < 2:
+        print("usage: python api/static_tables.py <maps_id> [<maps_id> ...]")
+        sys.exit(1)
+    for arg in sys.argv[1:]:
+        raw_map = fetch_awbw_map(int(arg), BATCH)
+        if not raw_map:
+            print(f"map {arg}: could not fetch map data")
+            continue
+        grid = parse_map_csv(raw_map)
+        build_static_tables(int(arg), grid)
+        print(f"map {arg}: tables written to {os.path.join(TABLE_DIR, arg)}")
@@ -0,0 +1,64 @@
+from game_logic import get_terrain_type, compile_cost_grid
+
+FOOT_UNITS = {"infantry", "mech"}
+GROUND_MOVE_TYPES = {"foot", "mech", "tread", "tires"}
+
+# Transport type -> what it carries: a set of unit types, or "ground" for any land unit
+CARRIERS = {
+    "apc": FOOT_UNITS,
+    "transportCopter": FOOT_UNITS,
+    "blackBoat": FOOT_UNITS,
+    "lander": "ground",
+}
+
+# Ships can only load and unload from a shoal or a port
+SHORE_ONLY = {"lander", "blackBoat"}
+SHORE_TERRAIN = {"shoal", "port"}
+
+def can_carry(transport_type, passenger_type, passenger_move_type):
+    carries = CARRIERS.get(transport_type)
+    if carries is None: return False
+    if carries == "ground": return passenger_move_type in GROUND_MOVE_TYPES
+    return passenger_type in carries
+
+class TransportDrops:
+    """
+    Tiles a passenger can be unloaded onto this turn, per transport and passenger movement type.
+
+    A transport's destinations are searched once, and the unload ring around them is built once per passenger
+    movement type, so every passenger that can board the same transport shares both.
+    """
+    def __init__(self, game_map, width, height, occupied):
+        self.game_map = game_map
+        self.width = width
+        self.height = height
+        self.occupied = occupied # (x, y) -> unit
+        self._cost_grids = {} # move_type -> flat cost grid
+        self._drops = {} # (transport id, passenger move type) -> set of (x, y)
+
+    def _cost_grid(self, move_type):
+        if move_type not in self._cost_grids:
+            self._cost_grids[move_type] = compile_cost_grid(self.game_map, move_type, self.width, self.height)
+        return self._cost_grids[move_type]
+
+    def drops(self, transport, destinations, passenger_move_type):
+        """
+        Free tiles next to any of the transport's destinations that the passenger could stand on.
+        destinations: tiles the transport can end its move on (its own tile included).
+        """
+        key = (transport['id'], passenger_move_type)
+        if key not in self._drops:
+            cost_grid = self._cost_grid(passenger_move_type)
+            start = (transport['position']['x'], transport['position']['y'])
+            shore_only = transport['type'] in SHORE_ONLY
+            tiles = set()
+            for tx, ty in destinations:
+                if shore_only and get_terrain_type(self.game_map[ty][tx]) not in SHORE_TERRAIN: continue
+                for nx, ny in ((tx, ty + 1), (tx, ty - 1), (tx + 1, ty), (tx - 1, ty)):
+                    if not (0 <= nx < self.width and 0 <= ny < self.height): continue
+                    if cost_grid[ny * self.width + nx] >= 99: continue
+                    # The transport's own starting tile is free once it has moved (it must have, to be adjacent to it)
+                    if (nx, ny) in self.occupied and (nx, ny) != start: continue
+                    tiles.add((nx, ny))
+            self._drops[key] = tiles
+        return self._drops[key]
@@ -1,7 +1,8 @@
-import requests
 import re
 import json
 
+from fetch_scheduler import INTERACTIVE, fetch_text, FetchRejected, FetchDropped
+
 UNIT_NAME_MAP = {
     "Infantry": "infantry", "Mech": "mech", "Recon": "recon", "Tank": "tank",
     "Md.Tank": "mediumTank", "Neotank": "neoTank", "APC": "apc",
@@ -12,10 +13,10 @@ UNIT_NAME_MAP = {
     "Sub": "sub", "Black Boat": "blackBoat", "Stealth": "stealth"
 }
 
-def fetch_units(game_id):
+def fetch_units(game_id, priority=INTERACTIVE):
     try:
         url = f"https://awbw.amarriner.com/game.php?games_id={game_id}"
-        html = requests.get(url).text
+        html = fetch_text(url, priority)
         m_info = re.search(r"unitsInfo\s*=\s*(\{[\s\S]*?\});", html)
         m_players = re.search(r"playersInfo\s*=\s*(\{[\s\S]*?\});", html)
         
@@ -42,5 +43,7 @@ def fetch_units(game_id):
                 "stats": {"hp": int(float(u['units_hit_points']) * 10), "fuel": int(u['units_fuel'])}
             })
         return ww_units
+    # Out of fetch budget is not "no units": let the caller answer 503
+    except (FetchRejected, FetchDropped): raise
     except: return []
 
@@ -0,0 +1,173 @@
+"""
+Long-running worker that keeps watched games' analysis and context hot in the response cache.
+
+Each game is polled on its own schedule. Right after a change, and around the time the current turn is expected
+to end (judged from how long that game's turns have taken so far), polls run every MIN_INTERVAL seconds. While
+nothing changes the interval backs off towards MAX_INTERVAL, just under the cache TTL: an entry is only trusted while
+the watcher keeps confirming it, so it must be re-polled before it expires. A snapshot whose fingerprint matches the
+entry the watcher published only refreshes its TTL; anything else (including an entry on-demand requests stored for
+the same snapshot) is recomputed for every player and published. Raise WARS_ORACLE_CACHE_TTL to let quiet games be
+polled less often.
+
+For the API to see the results both processes need the same WARS_ORACLE_CACHE_DIR (the directory-backed
+response cache). The watch list can also come from a file with one game id per line, re-read every pass, which
+stands in for a real work queue when testing locally. With WARS_ORACLE_HISTORY_DB set, every published snapshot is
+also archived (history.py).
+
+Usage:
+    WARS_ORACLE_CACHE_DIR=/tmp/wars-oracle/cache python api/watcher.py <game_id> [<game_id> ...] [--watch-file FILE] [--once]
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+
+import history
+import response_cache
+from fetch_scheduler import PREWARM
+from snapshots import load_snapshot, compute_results
+
+MIN_INTERVAL = float(os.environ.get("WARS_ORACLE_WATCH_MIN_INTERVAL", "30"))
+# Poll again before the entry expires, or user requests would start computing
+TTL_MARGIN = 0.9
+MAX_INTERVAL = TTL_MARGIN * response_cache.CACHE_TTL_SECONDS
+# A short TTL wins over the configured minimum, or entries would expire between polls
+MIN_INTERVAL = min(MIN_INTERVAL, MAX_INTERVAL)
+BACKOFF = 1.5
+# Fraction of the expected turn length around its end that is polled at MIN_INTERVAL
+TURN_END_WINDOW = 0.25
+TURN_SAMPLES = 8
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+class WatchedGame:
+    """Polling state for one game."""
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.fingerprint = None
+        self.turn_owner = None
+        self.turn_started = None
+        self.turn_lengths = [] # seconds, most recent last
+        self.interval = MIN_INTERVAL
+        self.next_poll = None
+
+    def expected_turn_end(self):
+        if self.turn_started is None or not self.turn_lengths: return None
+        lengths = sorted(self.turn_lengths)
+        return self.turn_started + lengths[len(lengths) // 2]
+
+    def observe(self, metadata, changed, now):
+        """Update turn timing from a snapshot and return the delay until the next poll."""
+        owner = metadata.get('current_turn_username')
+        if owner != self.turn_owner:
+            if self.turn_owner is not None and self.turn_started is not None:
+                self.turn_lengths = (self.turn_lengths + [now - self.turn_started])[-TURN_SAMPLES:]
+            self.turn_owner = owner
+            self.turn_started = now
+
+        if changed:
+            self.interval = MIN_INTERVAL
+        else:
+            self.interval = min(MAX_INTERVAL, self.interval * BACKOFF)
+
+        delay = self.interval
+        expected = self.expected_turn_end()
+        if expected is not None:
+            window = TURN_END_WINDOW * (expected - self.turn_started)
+            if expected - window <= now:
+                delay = MIN_INTERVAL # inside the window, or the turn is overdue
+            elif now + delay > expected - window:
+                delay = max(MIN_INTERVAL, expected - window - now) # wake up when the window opens
+        return delay
+
+def poll(game, rules, map_cache, now=None):
+    """Fetch one snapshot and publish new results if it changed. Returns the delay until the next poll."""
+    if now is None: now = time.time()
+    snapshot, error = load_snapshot(game.game_id, PREWARM, map_cache)
+    if error:
+        print(f"[watcher] game {game.game_id}: {error[0]}")
+        game.interval = min(MAX_INTERVAL, game.interval * BACKOFF)
+        return game.interval
+
+    fingerprint = response_cache.snapshot_fingerprint(snapshot)
+    changed = fingerprint != game.fingerprint
+    if changed or not response_cache.touch(game.game_id, fingerprint):
+        start = time.perf_counter()
+        analyses, contexts = compute_results(snapshot, rules)
+        response_cache.publish(game.game_id, fingerprint, snapshot['metadata'], analyses, contexts)
+        history.record(snapshot, analyses, fingerprint)
+        print(f"[watcher] game {game.game_id}: published {fingerprint} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    game.fingerprint = fingerprint
+    return game.observe(snapshot['metadata'], changed, now)
+
+def read_watch_file(path):
+    try:
+        with open(path) as f:
+            return {int(line) for line in (l.strip() for l in f) if line and not line.startswith('#')}
+    except (OSError, ValueError) as e:
+        print(f"[watcher] could not read {path}: {e}")
+        return set()
+
+def run(game_ids, watch_file=None, once=False):
+    with open(RULES_PATH) as f: rules = json.load(f)
+    map_cache = {}
+    games = {}
+    due = [] # heap of (next poll time, game_id); entries that don't match the game's next_poll are stale
+
+    def schedule(game, when):
+        game.next_poll = when
+        heapq.heappush(due, (when, game.game_id))
+
+    def sync_watch_list():
+        wanted = set(game_ids) | (read_watch_file(watch_file) if watch_file else set())
+        for gid in wanted - set(games):
+            games[gid] = WatchedGame(gid)
+            schedule(games[gid], time.time())
+        for gid in set(games) - wanted:
+            del games[gid]
+
+    sync_watch_list()
+    if not games:
+        print("[watcher] nothing to watch")
+        return
+
+    if once:
+        for game in games.values(): poll(game, rules, map_cache)
+        return
+
+    while True:
+        sync_watch_list()
+        if not due:
+            time.sleep(MIN_INTERVAL)
+            continue
+        when, gid = due[0]
+        game = games.get(gid)
+        if game is None or game.next_poll != when:
+            heapq.heappop(due)
+            continue
+        wait = when - time.time()
+        if wait > 0:
+            time.sleep(min(wait, MIN_INTERVAL)) # re-check the watch file at least this often
+            continue
+        heapq.heappop(due)
+        try:
+            delay = poll(game, rules, map_cache)
+        except Exception as e:
+            print(f"[watcher] game {gid}: poll failed: {e}")
+            delay = MAX_INTERVAL
+        schedule(game, time.time() + delay)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Keep watched games' analysis hot in the response cache.")
+    parser.add_argument("game_ids", nargs="*", type=int)
+    parser.add_argument("--watch-file", help="file with one game id per line, re-read every pass")
+    parser.add_argument("--once", action="store_true", help="poll every game once and exit")
+    args = parser.parse_args()
+    if not args.game_ids and not args.watch_file:
+        parser.print_usage()
+        sys.exit(1)
+    if not response_cache.CACHE_DIR:
+        print("[watcher] WARS_ORACLE_CACHE_DIR is not set; results stay inside this process")
+    run(args.game_ids, args.watch_file, args.once)
@@ -1,4 +1,8 @@
 def render_ascii_map(game_map, units_by_player):
+    return overlay_units(render_terrain_rows(game_map), units_by_player)
+
+def render_terrain_rows(game_map):
+    """The map without units, one string per row. Depends only on terrain and ownership, so callers may reuse it."""
     TERRAIN_CHARS = {
         "plain": ".", "mountain": "^", "forest": "T", "river": "~", "road": "=", 
         "bridge": "=", "sea": "~", "beach": ",", "shoal": ",", 
@@ -26,6 +30,12 @@ def render_ascii_map(game_map, units_by_player):
                 # else keep as is (terrain chars)
                 
             grid[y][x] = char
+    return ["".join(row) for row in grid]
+
+def overlay_units(terrain_rows, units_by_player):
+    height = len(terrain_rows)
+    width = len(terrain_rows[0])
+    grid = {} # only the rows that have units are split into characters
 
     UNIT_CHARS = {
         "infantry": "i", "mech": "m", "recon": "r", "tank": "t",
@@ -41,12 +51,13 @@ def render_ascii_map(game_map, units_by_player):
             utype = u['type']
             char = UNIT_CHARS.get(utype, '?')
             if 0 <= y < height and 0 <= x < width:
+                if y not in grid: grid[y] = list(terrain_rows[y])
                 grid[y][x] = char
 
     lines = []
     lines.append("   " + "".join([str((i//10)%10) if i%10==0 else " " for i in range(width)]))
     lines.append("   " + "".join([str(i%10) for i in range(width)]))
     for y in range(height):
-        row_str = "".join(grid[y])
+        row_str = "".join(grid[y]) if y in grid else terrain_rows[y]
         lines.append(f"{y:2d} {row_str}")
     return "\n".join(lines)
@@ -7,6 +7,7 @@ import { URL } from "node:url";
  * - Listens for `NextTurn` messages
  * - Posts a short notification to a Discord webhook
  * - Optionally stores the observed turn in Firestore (no blob store needed)
+ * - Optionally pings the Wars Oracle API so it pre-warms analysis for the new turn
  *
  * Intended to run as a long-lived worker (Node 18+/serverless background/Cloud Run/Fly).
  * Vercel/Firebase request-scoped functions are not suitable for maintaining the socket.
@@ -42,6 +43,8 @@ const firestoreProjectId =
 const firestoreCollection =
   process.env.FIRESTORE_COLLECTION || "awbw_turns";
 const replayFetchTemplate = process.env.REPLAY_FETCH_URL_TEMPLATE;
+const oracleTurnEventTemplate = process.env.ORACLE_TURN_EVENT_URL;
+const oracleTurnEventToken = process.env.ORACLE_TURN_EVENT_TOKEN;
 const port = Number(process.env.PORT || "8080");
 
 if (!gameId || !discordWebhook || !baseUrl) {
@@ -98,6 +101,21 @@ async function postToDiscord(payload: NextTurnEnvelope["NextTurn"]) {
   }
 }
 
+async function notifyOracle(payload: NextTurnEnvelope["NextTurn"]) {
+  if (!oracleTurnEventTemplate) return;
+  const url = oracleTurnEventTemplate.replace("{gameId}", String(gameId));
+  const headers: Record<string, string> = { "Content-Type": "application/json" };
+  if (oracleTurnEventToken) headers["X-Turn-Event-Token"] = oracleTurnEventToken;
+  const res = await fetch(url, {
+    method: "POST",
+    headers,
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok) {
+    throw new Error(`Oracle turn event failed ${res.status}: ${await res.text()}`);
+  }
+}
+
 async function fetchReplayIfConfigured(turnKey: string) {
   if (!replayFetchTemplate) return undefined;
   const url = replayFetchTemplate
@@ -192,6 +210,9 @@ async function startRelay(backoffMs = 0): Promise<void> {
       await storeTurn(turnKey, NextTurn);
       await postToDiscord(NextTurn);
       lastTurnKey = turnKey;
+      notifyOracle(NextTurn).catch((err) =>
+        console.warn("[turn-relay] oracle turn event skipped/failed", err)
+      );
       console.log(
         `[turn-relay] notified turn ${NextTurn.nextTurnStart} pid ${NextTurn.nextPId}`
       );